@@ -0,0 +1,200 @@
+"""Regresión golden: compara los motores rápidos con la implementación fila por fila.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.golden [archivo ...] [--synthetic 20 200] [--noise 0.1] [--show 20]
+
+Por defecto recorre uploads/*.XLS, uploads/prueba.xlsx, los libros de
+attached_assets/ y libros sintéticos, más uno con horas extra (ana, agustin
+taba) y la primera semana empezando el día 2 (como 01Static.XLS). Para cada
+empleado compara campo por
+campo el dict de get_employee_stats armado con los count_* (referencia) contra
+cada motor de ENGINES, y muestra los tiempos de cada uno lado a lado. También
+verifica que los totales semanales de get_overtime_tables sumen lo mismo que los diarios.
+Termina con código 1 si encuentra alguna diferencia.
+"""
+import argparse
+import glob
+import math
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic_workbook import employee_names, generate_workbook
+from utils.excel_processor import ExcelProcessor
+
+FLOAT_TOLERANCE = 1e-6
+
+# Semanas de get_weeks_in_month con la primera empezando después del día 1 (como en 01Static.XLS)
+SHIFTED_WEEKS = [(2, 7), (8, 14), (15, 21), (22, 31)]
+
+
+def reference_engine(processor, names):
+    return {name: processor._reference_employee_stats(name) for name in names}
+
+
+def fused_engine(processor, names):
+    return {name: processor.get_employee_stats(name) for name in names}
+
+
+def bulk_engine(processor, names):
+    return processor.get_all_employee_stats(names)
+
+
+# Motores a comparar contra la referencia: nombre -> función(processor, nombres)
+ENGINES = {
+    'get_employee_stats': fused_engine,
+    'get_all_employee_stats': bulk_engine,
+}
+
+
+def default_files():
+    files = sorted(glob.glob('uploads/*.XLS')) + ['uploads/prueba.xlsx']
+    files += sorted(glob.glob('attached_assets/*.xls*'))
+    return [file for file in files if Path(file).exists()]
+
+
+def synthetic_files(sizes, noise, workdir):
+    files = []
+    for size in sizes:
+        path = Path(workdir) / f"golden_{size}_{noise}.xlsx"
+        if not path.exists():
+            generate_workbook(path, employees=size, noise=noise, seed=size)
+        files.append(str(path))
+    return files
+
+
+def shifted_weeks_file(size, noise, workdir):
+    """Libro sintético con los horarios de horas extra: ana y agustin taba (hoja 4.5.6, bloque AN)"""
+    path = Path(workdir) / f"golden_overtime_{size}_{noise}.xlsx"
+    if not path.exists():
+        names = employee_names(max(size, 6))
+        names[1], names[5] = 'ana', 'agustin taba'
+        generate_workbook(path, noise=noise, seed=size, names=names)
+    return str(path)
+
+
+def overtime_diffs(processor):
+    """Diferencias entre los totales diarios y semanales de get_overtime_tables, por empleado"""
+    daily, weekly = processor.get_overtime_tables()
+    diffs = []
+    for column in ('regular_minutes', 'overtime_minutes'):
+        by_day = daily.groupby('employee')[column].sum()
+        by_week = weekly.groupby('employee')[column].sum()
+        for name, total in by_day.items():
+            if total != by_week.get(name, 0):
+                diffs.append(('get_overtime_tables', name, f"{column} (semanas)", int(total), int(by_week.get(name, 0))))
+    return diffs
+
+
+def values_equal(expected, actual):
+    """Igualdad recursiva; los floats se comparan con tolerancia y NaN == NaN"""
+    if isinstance(expected, bool) or isinstance(actual, bool):
+        return expected == actual
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        if math.isnan(expected) or math.isnan(actual):
+            return math.isnan(expected) and math.isnan(actual)
+        return abs(expected - actual) <= FLOAT_TOLERANCE
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        return expected.keys() == actual.keys() and all(values_equal(expected[k], actual[k]) for k in expected)
+    if isinstance(expected, (list, tuple)) and isinstance(actual, (list, tuple)):
+        return len(expected) == len(actual) and all(values_equal(e, a) for e, a in zip(expected, actual))
+    return expected == actual
+
+
+def diff_stats(expected, actual):
+    """Lista de (campo, esperado, obtenido) para cada campo distinto"""
+    missing = object()
+    diffs = []
+    for field in list(expected) + [field for field in actual if field not in expected]:
+        value, other = expected.get(field, missing), actual.get(field, missing)
+        if value is missing or other is missing or not values_equal(value, other):
+            diffs.append((field,
+                          '<falta>' if value is missing else value,
+                          '<falta>' if other is missing else other))
+    return diffs
+
+
+def timed(engine, processor, names):
+    start = time.perf_counter()
+    result = engine(processor, names)
+    return result, time.perf_counter() - start
+
+
+def compare_file(file, engines, weeks=None):
+    """Devuelve (empleados, {motor: segundos}, [(motor, empleado, campo, esperado, obtenido)]).
+
+    weeks: semanas a usar en lugar de las que calcula get_weeks_in_month.
+    """
+    processor = ExcelProcessor(file, snapshot_dir=False)
+    if weeks is not None:
+        processor._cached_weeks = list(weeks)
+    names = list(processor.process_attendance_summary()['employee_name'].unique())
+
+    expected, elapsed = timed(reference_engine, processor, names)
+    timings = {'referencia': elapsed}
+    diffs = []
+    for engine_name, engine in engines.items():
+        # Cada motor calcula desde cero, sin la caché de estadísticas del anterior
+        processor._stats_cache.clear()
+        actual, timings[engine_name] = timed(engine, processor, names)
+        for name in names:
+            if name not in actual:
+                diffs.append((engine_name, name, '<empleado>', 'presente', '<falta>'))
+                continue
+            for field, value, other in diff_stats(expected[name], actual[name]):
+                diffs.append((engine_name, name, field, value, other))
+    diffs += overtime_diffs(processor)
+    return len(names), timings, diffs
+
+
+def _short(value, width=70):
+    text = repr(value)
+    return text if len(text) <= width else text[:width - 3] + '...'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*', help="Archivos Excel (por defecto uploads/ y attached_assets/)")
+    parser.add_argument('--synthetic', type=int, nargs='*', default=[20, 200],
+                        help="Tamaños de libros sintéticos a agregar")
+    parser.add_argument('--noise', type=float, default=0.1)
+    parser.add_argument('--show', type=int, default=20, help="Diferencias a mostrar por archivo")
+    parser.add_argument('--workdir', default=str(Path(tempfile.gettempdir()) / 'attendance-benchmarks'))
+    args = parser.parse_args()
+
+    Path(args.workdir).mkdir(parents=True, exist_ok=True)
+    files = (args.files or default_files()) + synthetic_files(args.synthetic, args.noise, args.workdir)
+    # (archivo, etiqueta, semanas): el libro con horas extra se compara con la primera semana desde el día 2
+    cases = [(file, Path(file).name, None) for file in files]
+    if args.synthetic:
+        file = shifted_weeks_file(args.synthetic[0], args.noise, args.workdir)
+        cases.append((file, f"{Path(file).stem} (sem. desde 2)", SHIFTED_WEEKS))
+
+    columns = ['referencia'] + list(ENGINES)
+    header = f"{'archivo':<32} {'empl.':>5} " + ' '.join(f"{column[:22]:>22}" for column in columns)
+    print(header + f" {'diferencias':>11}")
+    total_diffs = 0
+    for file, label, weeks in cases:
+        employees, timings, diffs = compare_file(file, ENGINES, weeks)
+        reference = timings['referencia']
+        cells = [f"{reference:>21.3f}s"]
+        for engine_name in ENGINES:
+            elapsed = timings[engine_name]
+            speedup = reference / elapsed if elapsed else float('inf')
+            cells.append(f"{elapsed:>12.3f}s ({speedup:>5.1f}x)")
+        print(f"{label[:32]:<32} {employees:>5} " + ' '.join(cells) + f" {len(diffs):>11}")
+        for engine_name, name, field, value, other in diffs[:args.show]:
+            print(f"    [{engine_name}] {name} · {field}\n"
+                  f"        referencia: {_short(value)}\n"
+                  f"        obtenido:   {_short(other)}")
+        if len(diffs) > args.show:
+            print(f"    ... {len(diffs) - args.show} diferencias más")
+        total_diffs += len(diffs)
+
+    print(f"\n{total_diffs} diferencias en {len(cases)} casos")
+    sys.exit(1 if total_diffs else 0)
+
+
+if __name__ == '__main__':
+    main()
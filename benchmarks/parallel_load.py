@@ -0,0 +1,63 @@
+"""Benchmark de decodificación de hojas: secuencial vs pool de procesos.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.parallel_load [archivo ...] [--workers N] [--repeat R]
+
+Para cada archivo mide el tiempo de pared de cargar las primeras k hojas de
+asistencia (k = 1..n) en secuencia y en paralelo, y muestra el speedup. Ambos
+modos abren el libro desde cero en cada medición: en paralelo cada proceso lo
+abre por su cuenta, así que en secuencia tampoco se reutiliza el ya abierto.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import time
+
+from utils.excel_processor import ExcelProcessor
+
+
+def time_load(processor, sheets, workers, repeat):
+    """Mejor tiempo de abrir el libro y cargar las hojas indicadas con una caché vacía"""
+    best = None
+    for _ in range(repeat):
+        processor._dataframe_cache.clear()
+        processor.workers = workers
+        if processor._excel_file is not None:
+            processor._excel_file.close()
+            processor._excel_file = None
+        start = time.perf_counter()
+        processor._load_sheets(sheets)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(files, workers, repeat):
+    for file in files:
+        with contextlib.redirect_stdout(io.StringIO()):
+            processor = ExcelProcessor(file, snapshot_dir=False)
+        exceptional_index = processor.sheet_names.index('Exceptional')
+        sheets = processor.sheet_names[exceptional_index + 1:]
+
+        print(f"\n{file} ({len(sheets)} hojas de asistencia, {workers} workers)")
+        print(f"{'hojas':>6} {'secuencial (s)':>15} {'paralelo (s)':>13} {'speedup':>8}")
+        for count in range(1, len(sheets) + 1):
+            sequential = time_load(processor, sheets[:count], 1, repeat)
+            parallel = time_load(processor, sheets[:count], workers, repeat)
+            print(f"{count:>6} {sequential:>15.3f} {parallel:>13.3f} {sequential / parallel:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*', help="Archivos Excel (por defecto uploads/*)")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob('uploads/*.xls*') + glob.glob('uploads/*.XLS'))
+    run(files, args.workers, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Suite de benchmarks de ExcelProcessor sobre libros sintéticos.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.suite [--sizes 20 200 2000] [--noise 0.1] [--export-sample 10]
+
+Para cada tamaño genera (o reutiliza) un libro sintético y mide la
+construcción del procesador (decodificando el libro y desde snapshot),
+process_attendance_summary, get_employee_stats de todos los empleados, la
+preparación del resumen mensual (get_all_employee_stats), el precálculo en
+segundo plano (start_precompute) y las exportaciones
+CSV/PDF sobre una muestra de empleados.
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic_workbook import generate_workbook
+from utils.excel_processor import ExcelProcessor
+
+
+def timed(function, *args, **kwargs):
+    """Ejecuta la función y devuelve (resultado, segundos)"""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def workbook_for(size, noise, workdir):
+    """Libro sintético de size empleados, generado una sola vez por parámetros"""
+    path = Path(workdir) / f"synthetic_{size}_{noise}.xlsx"
+    if not path.exists():
+        generate_workbook(path, employees=size, noise=noise)
+    return path
+
+
+def run_size(size, noise, workdir, export_sample):
+    """Mide cada etapa para un tamaño; devuelve lista de (etapa, segundos, llamadas)"""
+    path = workbook_for(size, noise, workdir)
+    results = []
+
+    processor, elapsed = timed(ExcelProcessor, path, snapshot_dir=False)
+    results.append(('construcción (decodificando)', elapsed, 1))
+
+    snapshot_dir = Path(workdir) / f"snapshots_{size}"
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+    ExcelProcessor(path, snapshot_dir=snapshot_dir)
+    _, elapsed = timed(ExcelProcessor, path, snapshot_dir=snapshot_dir)
+    results.append(('construcción (snapshot)', elapsed, 1))
+
+    summary, elapsed = timed(processor.process_attendance_summary)
+    results.append(('process_attendance_summary', elapsed, 1))
+    names = list(summary['employee_name'].unique())
+
+    # Cada etapa de estadísticas parte con la caché vacía
+    start = time.perf_counter()
+    for name in names:
+        processor.get_employee_stats(name)
+    results.append(('get_employee_stats (todos)', time.perf_counter() - start, len(names)))
+
+    processor._stats_cache.clear()
+    _, elapsed = timed(processor.get_all_employee_stats, names)
+    results.append(('resumen mensual (get_all_employee_stats)', elapsed, 1))
+
+    background = ExcelProcessor(path, snapshot_dir=snapshot_dir)
+    start = time.perf_counter()
+    background.start_precompute(names).join()
+    results.append(('precálculo en segundo plano', time.perf_counter() - start, 1))
+
+    sample = names[:export_sample]
+    with tempfile.TemporaryDirectory() as export_dir:
+        for extension, export in (('csv', processor.export_to_csv), ('pdf', processor.export_to_pdf)):
+            start = time.perf_counter()
+            for number, name in enumerate(sample):
+                export(name, str(Path(export_dir) / f"{number}.{extension}"))
+            results.append((f"export_to_{extension} (muestra)", time.perf_counter() - start, len(sample)))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 200, 2000])
+    parser.add_argument('--noise', type=float, default=0.1)
+    parser.add_argument('--export-sample', type=int, default=10)
+    parser.add_argument('--workdir', default=str(Path(tempfile.gettempdir()) / 'attendance-benchmarks'))
+    args = parser.parse_args()
+
+    Path(args.workdir).mkdir(parents=True, exist_ok=True)
+    for size in args.sizes:
+        print(f"\n{size} empleados")
+        print(f"{'etapa':<42} {'total (s)':>10} {'llamadas':>9} {'por llamada (ms)':>17}")
+        for stage, elapsed, calls in run_size(size, args.noise, args.workdir, args.export_sample):
+            per_call = elapsed / calls * 1000 if calls else 0
+            print(f"{stage:<42} {elapsed:>10.3f} {calls:>9} {per_call:>17.1f}")
+
+
+if __name__ == '__main__':
+    main()
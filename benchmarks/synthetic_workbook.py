@@ -0,0 +1,174 @@
+"""Generador de libros de asistencia sintéticos con el layout que espera ExcelProcessor.
+
+Hojas: Summary (datos desde la fila 5), Shifts, Logs, Exceptional y hojas de
+asistencia de tres empleados ('1.2.3', '4.5.6', ...) con nombres en J3, Y3 y AN3
+y días en las filas 12 a 11 + días del mes.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.synthetic_workbook salida.xlsx --employees 200 --days 31 --noise 0.15
+"""
+import argparse
+import calendar
+import random
+
+from openpyxl import Workbook
+
+from utils.excel_processor import ExcelProcessor
+
+DAY_ABBREVIATIONS = ['Mo', 'Tu', 'We', 'Th', 'Fr', 'Sa', 'Su']
+DEPARTMENTS = ['logistica', 'administraci', 'produccion', 'ventas', 'deposito']
+SHEET_COLUMNS = 44
+ATTENDANCE_HEADER_ROWS = 11
+
+
+def _clock(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _column(letter):
+    """Índice (base 0) de una columna de Excel"""
+    index = 0
+    for char in letter:
+        index = index * 26 + ord(char.upper()) - ord('A') + 1
+    return index - 1
+
+
+def employee_names(employees, ppp_every=10):
+    """Nombres sintéticos; cada ppp_every empleados uno es PPP (horario de 8 a 12)"""
+    names = []
+    for number in range(1, employees + 1):
+        suffix = ' ppp' if ppp_every and number % ppp_every == 0 else ''
+        names.append(f"empleado {number:04d}{suffix}")
+    return names
+
+
+def _punches(rng, is_ppp, noise):
+    """Marcaciones de un día hábil: (entrada, salida almuerzo, regreso almuerzo, salida) o 'absence'"""
+    if rng.random() < noise * 0.3:
+        return 'absence'
+
+    entry = rng.randint(7 * 60 + 40, 7 * 60 + 50)
+    if rng.random() < noise:
+        entry += rng.randint(1, 45)  # llegada tarde
+
+    if is_ppp:
+        exit_time = rng.randint(12 * 60, 12 * 60 + 10)
+        if rng.random() < noise:
+            exit_time -= rng.randint(5, 40)  # salida temprana
+        punches = [_clock(entry), _clock(exit_time), None, None]
+    else:
+        lunch_out = rng.randint(12 * 60, 13 * 60 + 30)
+        lunch_length = rng.randint(10, 20)
+        if rng.random() < noise:
+            lunch_length += rng.randint(1, 30)  # exceso de almuerzo
+        exit_time = rng.randint(17 * 60 + 10, 17 * 60 + 25)
+        if rng.random() < noise:
+            exit_time -= rng.randint(5, 60)  # salida temprana
+        punches = [_clock(entry), _clock(lunch_out), _clock(lunch_out + lunch_length), _clock(exit_time)]
+        if rng.random() < noise * 0.5:
+            punches[1] = punches[2] = None  # sin registro de almuerzo
+
+    if rng.random() < noise * 0.3:
+        punches[rng.choice([0, 3])] = None  # marcación faltante
+    return punches
+
+
+def generate_workbook(path, employees=20, month_days=31, noise=0.1, seed=0, year=2025, month=1, ppp_every=10,
+                      names=None):
+    """Escribe un libro sintético en path y devuelve la lista de empleados.
+
+    noise es la probabilidad (0-1) de cada desvío por día: llegada tarde,
+    salida temprana, exceso de almuerzo; ausencias y marcaciones faltantes
+    ocurren con una fracción de esa probabilidad. names reemplaza los nombres
+    de employee_names (y employees pasa a ser su cantidad), p.ej. para incluir
+    empleados con reglas propias en config/schedules.json.
+    """
+    rng = random.Random(seed)
+    names = list(names) if names is not None else employee_names(employees, ppp_every)
+    employees = len(names)
+    first_weekday = calendar.weekday(year, month, 1)
+    period = f"{year}/{month:02d}/01 ~ {month:02d}/{month_days:02d}"
+
+    workbook = Workbook(write_only=True)
+
+    # Attendance sheets first so the Summary can report the generated absences
+    attendance = []
+    absences = {}
+    for start in range(0, employees, 3):
+        group = names[start:start + 3]
+        rows = [[None] * SHEET_COLUMNS for _ in range(ATTENDANCE_HEADER_ROWS + month_days)]
+        rows[0][0] = 'Attendance Report'
+        rows[1][0] = 'Duration:'
+        rows[1][3] = period
+        for offset, (block, name) in enumerate(zip(ExcelProcessor.EMPLOYEE_BLOCKS, group)):
+            number = start + offset + 1
+            name_col = _column(block['name_col'])
+            rows[2][name_col - 1] = 'Name'
+            rows[2][name_col] = name
+            rows[3][name_col - 1] = 'No.'
+            rows[3][name_col] = number
+            rows[8][_column(block['day_col'])] = 'Attendance List'
+            rows[9][_column(block['day_col'])] = 'dd/ww'
+
+            absences[name] = 0
+            for day in range(1, month_days + 1):
+                row = rows[ATTENDANCE_HEADER_ROWS + day - 1]
+                abbreviation = DAY_ABBREVIATIONS[(first_weekday + day - 1) % 7]
+                row[_column(block['day_col'])] = f"{day:02d} {abbreviation}"
+                if abbreviation in ('Sa', 'Su'):
+                    continue
+
+                punches = _punches(rng, 'ppp' in name, noise)
+                if punches == 'absence':
+                    row[_column(block['lunch_return'])] = 'Absence'
+                    absences[name] += 1
+                    continue
+                for key, value in zip(('entry_col', 'lunch_out', 'lunch_return', 'exit_col'), punches):
+                    row[_column(block[key])] = value
+
+            rows[6][_column(block['day_col'])] = absences[name] or None
+        attendance.append(('.'.join(str(start + i + 1) for i in range(len(group))), rows))
+
+    summary = workbook.create_sheet('Summary')
+    summary.append(['Attendance Summary'])
+    summary.append(['Date:', f"{period}\t( synthetic )"])
+    summary.append(['No.', 'Name', 'Department', 'Work Hrs.', None, 'Late', None, 'Early Leave', None,
+                    'Overtime', None, 'Attend (Required/Actual)', 'Business Trip', 'Absence'])
+    summary.append([None, None, None, 'Required', 'Actual', 'Times', 'Min.', 'Times', 'Min.', 'Regular', 'Special'])
+    for number, name in enumerate(names, start=1):
+        summary.append([number, name, DEPARTMENTS[number % len(DEPARTMENTS)], 76.40,
+                        round(76.40 - absences[name] * 8, 2), None, None, None, None, None, None, None, None,
+                        absences[name] or None])
+
+    workbook.create_sheet('Shifts').append(['Shifts'])
+    workbook.create_sheet('Logs').append(['Logs'])
+
+    exceptional = workbook.create_sheet('Exceptional')
+    exceptional.append(['Exceptionals'])
+    exceptional.append(['Date:', f"{period}\t( synthetic )"])
+    exceptional.append(['No.', 'Name', 'Department', 'Date', 'AM', None, 'PM', None,
+                        'Late in (mm)', 'Early Leave (mm)', 'Total (mm)', 'Remark'])
+    exceptional.append([None, None, None, None, 'In', 'Out', 'In', 'Out'])
+
+    for sheet_name, rows in attendance:
+        sheet = workbook.create_sheet(sheet_name)
+        for row in rows:
+            sheet.append(row)
+
+    workbook.save(path)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--employees', type=int, default=20)
+    parser.add_argument('--days', type=int, default=31)
+    parser.add_argument('--noise', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate_workbook(args.path, args.employees, args.days, args.noise, args.seed)
+
+
+if __name__ == '__main__':
+    main()
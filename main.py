@@ -1,6 +1,14 @@
 import streamlit as st
+import pandas as pd
+from utils.attendance_store import (DB_NAME, ROLLUP_METRICS, append_month, compare_months, list_months,
+                                    rolling_rollups, year_to_date_rollups)
 from utils.excel_processor import ExcelProcessor
+from utils.snapshot import SNAPSHOT_DIR_NAME
+from utils.upload_store import STORE_DIR_NAME, PARSE_ERROR, PARSE_OK, blob_path, set_parse_status, store_upload
 import os
+import io
+import logging
+import hashlib
 import webbrowser
 from pathlib import Path
 
@@ -421,6 +429,13 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Nivel de log configurable; TRACE (5) muestra el detalle fila por fila del procesador
+logging.basicConfig(
+    level=os.environ.get("ATTENDANCE_LOG_LEVEL", "WARNING").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
+
 # Diccionario para mapear el numero del mes a su nombre
 month_names = {
     "01": "Enero", "02": "Febrero", "03": "Marzo", "04": "Abril",
@@ -428,21 +443,60 @@ month_names = {
     "09": "Septiembre", "10": "Octubre", "11": "Noviembre", "12": "Diciembre"
 }
 
-def save_uploaded_file(uploaded_file):
-    """Guardar el archivo subido y devolver su ruta junto con el mes"""
-    save_dir = Path("uploads")
-    save_dir.mkdir(exist_ok=True)
-
-    # Guardamos el archivo en el directorio 'uploads'
-    file_path = save_dir / uploaded_file.name
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    
-    # Obtenemos el mes desde los primeros dos caracteres del nombre del archivo
-    month_code = uploaded_file.name[:2]
-    month_name = month_names.get(month_code, "Mes desconocido")
-    
-    return str(file_path), month_name
+# Archivos subidos: almacén por contenido y snapshots del parseo
+UPLOAD_DIR = Path("uploads")
+UPLOAD_STORE = UPLOAD_DIR / STORE_DIR_NAME
+ATTENDANCE_DB = UPLOAD_STORE / DB_NAME
+
+def save_uploaded_file(uploaded_file, file_bytes, file_hash):
+    """Guardar el archivo subido (una sola vez por contenido) y devolver sus metadatos junto con el mes"""
+    upload = store_upload(UPLOAD_STORE, file_bytes, uploaded_file.name, content_hash=file_hash)
+    month_name = month_names.get(upload['month_code'], "Mes desconocido")
+    return upload, month_name
+
+def get_file_hash(file_bytes):
+    """Hash del contenido del archivo, usado como clave de cache"""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+@st.cache_resource(max_entries=8, show_spinner="Procesando archivo...")
+def load_processor(file_hash, _file_bytes, _filename=None):
+    """Crear el procesador una sola vez por contenido de archivo.
+
+    El cache se comparte entre reruns y sesiones; la clave es el hash del
+    contenido, que también recibe el procesador (los bytes no se vuelven a
+    hashear), y al superar max_entries se descarta el archivo usado hace más tiempo. Tras un reinicio del servidor el
+    procesador se reconstruye desde el snapshot guardado en uploads/.snapshots,
+    con las métricas ya calculadas (también las que deja python -m utils.watcher).
+    Las que falten se precalculan en segundo plano. El ledger del mes se agrega
+    al store multi-mes (uploads/.store/attendance.sqlite).
+    """
+    processor = ExcelProcessor(io.BytesIO(_file_bytes), snapshot_dir=UPLOAD_DIR / SNAPSHOT_DIR_NAME,
+                               content_hash=file_hash)
+    attendance_summary = processor.process_attendance_summary()
+    # Si el libro no se pudo decodificar el ledger queda vacío; el error no se guarda en el cache
+    if processor.get_ledger().empty or attendance_summary.empty:
+        raise ValueError("No se encontraron registros de asistencia en el libro")
+    # Al terminar el precálculo, el mes y sus acumulados se agregan al store multi-mes
+    processor.start_precompute(attendance_summary['employee_name'].unique(),
+                               on_done=lambda done: append_month(ATTENDANCE_DB, done, _filename))
+    return processor, attendance_summary
+
+def show_precompute_progress(processor):
+    """Avance del precálculo; la barra solo se refresca sola mientras no terminó"""
+    progress = processor.get_precompute_progress()
+    if progress['error']:
+        st.caption(f"⚠️ No se pudieron precalcular las métricas: {progress['error']}")
+    elif not progress['finished'] and progress['total']:
+        precompute_progress_bar(processor)
+
+@st.fragment(run_every=1)
+def precompute_progress_bar(processor):
+    """Barra de avance; al terminar se vuelve a correr la app, que ya no dibuja el fragmento"""
+    progress = processor.get_precompute_progress()
+    if progress['finished']:
+        st.rerun()
+    st.progress(progress['done'] / progress['total'],
+                text=f"Precalculando métricas: {progress['done']}/{progress['total']} empleados")
 
 def create_employee_dashboard(processor, employee_name, month_name):
     """Create a detailed dashboard for a single employee"""
@@ -524,15 +578,16 @@ def create_employee_dashboard(processor, employee_name, month_name):
         ('Ingresos con Retraso', len(stats['late_arrivals']) if stats['late_arrivals'] else 0, f"{stats['late_arrival_minutes']:.0f} minutos en total", f"Días con ingreso posterior a 8:10:\n{processor.format_list_in_columns(stats['late_arrivals']) if stats['late_arrivals'] else 'No hay días registrados'}")
     ]
 
-    # Solo agregar "Retiros Durante Horario" si no es PPP ni Ana
-    if not 'ppp' in employee_name.lower() and employee_name.lower() != 'ana':
+    # Solo agregar "Retiros Durante Horario" si el horario lo muestra (no PPP ni Ana)
+    schedule = processor.get_employee_schedule(employee_name)
+    if schedule['show_mid_day_departures']:
         auth_metrics.append(('Retiros Durante Horario', mid_day_departures_count, "Total salidas", f"Salidas durante horario laboral:\n{mid_day_departures_text}"))
 
     for label, value, subtitle, hover_text in auth_metrics:
         status = get_status(value)
         auth_note = "Requiere Autorización"
-        if label == 'Retiros Durante Horario' and employee_name.lower() == 'agustin taba':
-            auth_note = "Horario normal de salida (12:40)"
+        if label == 'Retiros Durante Horario' and schedule['mid_day_note']:
+            auth_note = schedule['mid_day_note']
 
         st.markdown(f"""
             <div class="stat-card">
@@ -559,14 +614,14 @@ def create_missing_records_section(stats, processor, employee_name):
     missing_exit_text = processor.format_list_in_columns(stats['missing_exit_days']) if stats['missing_exit_days'] else "No hay días registrados"
     missing_lunch_text = processor.format_list_in_columns(stats['missing_lunch_days']) if stats['missing_lunch_days'] else "No hay días registrados"
 
-    # Create list of missing records metrics, excluding "Sin Registro de Salida" for Ana
+    # Create list of missing records metrics; "Sin Registro de Salida" depends on the schedule
     missing_records = [
         ('Sin Registro de Entrada', len(stats['missing_entry_days']) if stats['missing_entry_days'] else 0, "Total días sin marcar", missing_entry_text),
         ('Sin Registro de Almuerzo', len(stats['missing_lunch_days']) if stats['missing_lunch_days'] else 0, "Total días sin marcar", missing_lunch_text)
     ]
 
-    # Add "Sin Registro de Salida" only if the employee is not Ana
-    if employee_name.lower() != 'ana':
+    # Add "Sin Registro de Salida" only if the employee's schedule shows it
+    if processor.get_employee_schedule(employee_name)['show_missing_exit']:
         missing_records.append(
             ('Sin Registro de Salida', len(stats['missing_exit_days']) if stats['missing_exit_days'] else 0, "Total días sin marcar", missing_exit_text)
         )
@@ -617,9 +672,9 @@ def create_monthly_summary(processor, attendance_summary):
     missing_lunch_details = {}
     late_arrival_details = {}
 
-    # Get stats for all employees
-    for employee_name in attendance_summary['employee_name'].unique():
-        stats = processor.get_employee_stats(employee_name)
+    # Get stats for all employees in a single sweep
+    all_stats = processor.get_all_employee_stats(attendance_summary['employee_name'].unique())
+    for employee_name, stats in all_stats.items():
 
         # Absences
         emp_absences = len(stats['absence_days']) if stats['absence_days'] else 0
@@ -643,7 +698,7 @@ def create_monthly_summary(processor, attendance_summary):
         total_early_departure_minutes += stats['early_minutes']
 
         # Mid-day departures
-        if not 'ppp' in employee_name.lower():
+        if processor.get_employee_schedule(employee_name)['mid_day_departures']:
             emp_mid_day = stats['mid_day_departures']
             if emp_mid_day > 0:
                 mid_day_details[employee_name] = emp_mid_day
@@ -740,8 +795,9 @@ def create_monthly_summary(processor, attendance_summary):
 def create_weekly_summary(processor, attendance_summary):
     """Create a weekly summary view with animations and transitions"""
 
-    # Get all weeks in the current month
+    # Get all weeks in the current month and their statistics in one pass
     weeks = processor.get_weeks_in_month()
+    all_weekly_stats = processor.get_all_weekly_stats(weeks)
 
     # Create tabs for week selection with smooth transitions
     st.markdown("""
@@ -757,7 +813,7 @@ def create_weekly_summary(processor, attendance_summary):
     for week_idx, (week_tab, (start_date, end_date)) in enumerate(zip(week_tabs, weeks)):
         with week_tab:
             # Get weekly statistics
-            weekly_stats = processor.get_weekly_stats(start_date, end_date)
+            weekly_stats = all_weekly_stats[(start_date, end_date)]
 
             # Display main metrics with staggered animation
             st.markdown("""
@@ -814,6 +870,135 @@ def create_weekly_summary(processor, attendance_summary):
                     </div>
                 """, unsafe_allow_html=True)
 
+# Ventanas de los acumulados: etiqueta -> meses hacia atrás (None = año en curso)
+ROLLUP_WINDOWS = {"Año en curso (YTD)": None, "Últimos 3 meses": 3, "Últimos 6 meses": 6, "Últimos 12 meses": 12}
+ROLLUP_GROUPINGS = {"Empleado": 'employee', "Departamento": 'department', "Mes": 'month', "Semana ISO": 'iso_week'}
+ROLLUP_LABELS = {
+    'employee': 'Empleado', 'department': 'Departamento', 'month': 'Mes', 'iso_year': 'Año ISO',
+    'iso_week': 'Semana ISO', 'months': 'Meses', 'late_minutes': 'Minutos de Retraso',
+    'late_days': 'Llegadas Tarde', 'early_minutes': 'Minutos de Salida Anticipada',
+    'early_days': 'Retiros Anticipados', 'lunch_overtime_minutes': 'Minutos Excedidos en Almuerzo',
+    'lunch_overtime_days': 'Días con Exceso en Almuerzo', 'absences': 'Inasistencias',
+    'missing_entry': 'Sin Registro de Entrada', 'missing_exit': 'Sin Registro de Salida',
+    'missing_lunch': 'Sin Registro de Almuerzo', 'status': 'Estado'
+}
+# Estado de cada fila en la comparación de meses (compare_months)
+COMPARISON_STATUSES = {'both': 'Ambos', 'new': 'Nuevo', 'removed': 'Baja'}
+
+def create_rollup_view():
+    """Acumulados del año en curso y de los últimos 3/6/12 meses, leídos del store multi-mes"""
+    st.markdown("""
+        <div class="stat-group">
+            <h3>📈 Acumulados</h3>
+        </div>
+    """, unsafe_allow_html=True)
+
+    months = list_months(ATTENDANCE_DB)
+    if months.empty:
+        st.info("Todavía no hay meses procesados en el historial")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        window = st.selectbox("Período", list(ROLLUP_WINDOWS))
+    with col2:
+        grouping = st.radio("Agrupar por", list(ROLLUP_GROUPINGS), horizontal=True)
+
+    by = ROLLUP_GROUPINGS[grouping]
+    window_months = ROLLUP_WINDOWS[window]
+    if window_months is None:
+        rollups = year_to_date_rollups(ATTENDANCE_DB, by)
+    else:
+        rollups = rolling_rollups(ATTENDANCE_DB, window_months, by)
+    st.caption(f"Meses guardados: {', '.join(months['month'])}")
+    if rollups.empty:
+        st.info("No hay datos para el período elegido")
+        return
+
+    totals = [
+        ('Minutos de Retraso', int(rollups['late_minutes'].sum()), f"{int(rollups['late_days'].sum())} llegadas tarde"),
+        ('Inasistencias', int(rollups['absences'].sum()), "días de ausencia"),
+        ('Exceso en Almuerzo', int(rollups['lunch_overtime_minutes'].sum()),
+         f"minutos en {int(rollups['lunch_overtime_days'].sum())} días"),
+        ('Salidas Anticipadas', int(rollups['early_minutes'].sum()), f"minutos en {int(rollups['early_days'].sum())} días"),
+        ('Registros Faltantes', int(rollups[['missing_entry', 'missing_exit', 'missing_lunch']].sum().sum()),
+         "entradas, salidas y almuerzos")
+    ]
+    for column, (label, value, subtitle) in zip(st.columns(len(totals)), totals):
+        column.metric(label, value, help=subtitle)
+
+    st.dataframe(rollups.rename(columns=ROLLUP_LABELS), hide_index=True, use_container_width=True)
+
+def highlight_regressions(value):
+    """Rojo si la irregularidad aumentó respecto del mes base, verde si bajó (sin color si falta un mes)"""
+    if pd.isna(value):
+        return ''
+    if value > 0:
+        return 'background-color: rgba(255, 75, 75, 0.25)'
+    if value < 0:
+        return 'background-color: rgba(33, 195, 84, 0.2)'
+    return ''
+
+def create_month_comparison_view():
+    """Compara dos meses del historial con sus acumulados guardados, sin volver a leer los libros"""
+    st.markdown("""
+        <div class="stat-group">
+            <h3>🔀 Comparación entre Meses</h3>
+        </div>
+    """, unsafe_allow_html=True)
+
+    months = list(list_months(ATTENDANCE_DB)['month'])
+    if len(months) < 2:
+        st.info("Se necesitan al menos dos meses procesados para comparar")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        base_month = st.selectbox("Mes base", months, index=len(months) - 2)
+    with col2:
+        target_month = st.selectbox("Mes a comparar", months, index=len(months) - 1)
+    with col3:
+        grouping = st.radio("Comparar por", ["Empleado", "Departamento"], horizontal=True)
+
+    by = ROLLUP_GROUPINGS[grouping]
+    comparison = compare_months(ATTENDANCE_DB, base_month, target_month, by)
+    options = ["Todos"] + sorted(comparison[by].astype(str).unique())
+    selected = st.selectbox(f"Filtrar {grouping.lower()}", options)
+    if selected != "Todos":
+        comparison = comparison[comparison[by].astype(str) == selected]
+
+    # Totales del mes comparado; el delta (en rojo si la irregularidad aumentó) suma solo
+    # a quienes están en ambos meses, así las altas y bajas no cuentan como cambios
+    metric_columns = st.columns(5)
+    for column, metric in zip(metric_columns, ['late_minutes', 'absences', 'lunch_overtime_minutes',
+                                               'early_minutes', 'missing_exit']):
+        column.metric(ROLLUP_LABELS[metric], int(comparison[metric + '_target'].sum()),
+                      delta=int(comparison[metric + '_delta'].sum()), delta_color="inverse")
+
+    in_both = comparison[comparison['status'] == 'both']
+    regressions = in_both[in_both['regressions'] > 0]
+    new_count = int((comparison['status'] == 'new').sum())
+    removed_count = int((comparison['status'] == 'removed').sum())
+    st.caption(f"{len(regressions)} de {len(in_both)} presentes en ambos meses con alguna irregularidad en aumento "
+               f"({base_month} → {target_month}) · {new_count} nuevos · {removed_count} bajas")
+
+    comparison = comparison.assign(status=comparison['status'].map(COMPARISON_STATUSES))
+    keys = [column for column in comparison.columns
+            if column != 'regressions' and not column.endswith(('_base', '_target', '_delta'))]
+    delta_columns = {metric + '_delta': f"{ROLLUP_LABELS[metric]} (Δ)" for metric in ROLLUP_METRICS}
+    deltas = comparison[keys + list(delta_columns) + ['regressions']].rename(
+        columns={**delta_columns, **ROLLUP_LABELS, 'regressions': 'Métricas en Aumento'})
+    st.dataframe(deltas.style.map(highlight_regressions, subset=list(delta_columns.values())),
+                 hide_index=True, use_container_width=True)
+
+    with st.expander("Ver valores de ambos meses"):
+        detail_columns = {}
+        for metric in ROLLUP_METRICS:
+            detail_columns[metric + '_base'] = f"{ROLLUP_LABELS[metric]} ({base_month})"
+            detail_columns[metric + '_target'] = f"{ROLLUP_LABELS[metric]} ({target_month})"
+        details = comparison[keys + list(detail_columns)].rename(columns={**detail_columns, **ROLLUP_LABELS})
+        st.dataframe(details, hide_index=True, use_container_width=True)
+
 def get_status(value, warning_threshold=3, danger_threshold=5):
     """Determina el estado (success, warning, danger) basado en el valor"""
     # Si el valor es una lista, usar su longitud
@@ -827,6 +1012,35 @@ def get_status(value, warning_threshold=3, danger_threshold=5):
         # Si no se puede convertir a número, retornar 'warning' por defecto
         return 'warning'
 
+def create_performance_panel(processor):
+    """Panel opcional en el sidebar con los tiempos por método del procesador"""
+    with st.sidebar.expander("⏱️ Rendimiento", expanded=False):
+        stats = processor.get_performance_stats()
+        if not stats:
+            st.write("Sin mediciones todavía")
+            return
+
+        performance_df = pd.DataFrame([
+            {
+                'Método': name,
+                'Llamadas': values['calls'],
+                'Total (ms)': round(values['total_time'] * 1000, 1),
+                'Máximo (ms)': round(values['max_time'] * 1000, 1),
+                'Hojas parseadas': values['sheet_parses']
+            }
+            for name, values in stats.items()
+        ]).sort_values('Total (ms)', ascending=False)
+        st.dataframe(performance_df, hide_index=True, use_container_width=True)
+
+        cache_stats = processor.get_sheet_cache_stats()
+        st.caption(
+            f"Caché de hojas: {cache_stats['hits']} aciertos, {cache_stats['misses']} lecturas"
+            + (" · cargado desde snapshot" if processor.loaded_from_snapshot else "")
+        )
+        if st.button("Reiniciar mediciones"):
+            processor.reset_performance_stats()
+            st.rerun()
+
 def main():
     st.title("📊 Control de Acceso Gampack")
 
@@ -853,14 +1067,16 @@ def main():
                 st.rerun()
             uploaded_file = st.session_state.current_file
 
-        # Display file history
-        if uploaded_file is not None and uploaded_file.name not in [f['name']for f in st.session_state.file_history]:
-            # Save the file and add to history
-            file_path = save_uploaded_file(uploaded_file)
-            st.session_state.file_history.append({
-                'name': uploaded_file.name,
-                'path': file_path
-            })
+        # Save the file (no disk writes if its content is already stored) and add to history
+        if uploaded_file is not None:
+            file_bytes = uploaded_file.getvalue()
+            file_hash = get_file_hash(file_bytes)
+            upload, month_name = save_uploaded_file(uploaded_file, file_bytes, file_hash)
+            if uploaded_file.name not in [f['name'] for f in st.session_state.file_history]:
+                st.session_state.file_history.append({
+                    'name': uploaded_file.name,
+                    'path': str(blob_path(UPLOAD_STORE, file_hash, upload['suffix']))
+                })
 
         # Show file history with modern styling
         if st.session_state.file_history:
@@ -874,37 +1090,58 @@ def main():
                 )
 
     if uploaded_file:
+        # El estado del almacén refleja solo la decodificación del libro, no los errores de las vistas
         try:
-            file_path, month_name = save_uploaded_file(uploaded_file)
-            processor = ExcelProcessor(uploaded_file)
-            attendance_summary = processor.process_attendance_summary()
+            processor, attendance_summary = load_processor(file_hash, file_bytes, uploaded_file.name)
+        except Exception as e:
+            set_parse_status(UPLOAD_STORE, file_hash, PARSE_ERROR, e)
+            st.error(f"Error procesando el archivo: {str(e)}")
+            st.exception(e)
+            return
+        set_parse_status(UPLOAD_STORE, file_hash, PARSE_OK)
 
+        try:
             # Employee selector and view selector in sidebar
             with st.sidebar:
                 st.subheader("📋 Vistas Disponibles")
+                show_precompute_progress(processor)
 
                 # Contenedor para los botones de resumen
                 resumen_container = st.container()
                 with resumen_container:
                     show_summary = st.button("Ver Resumen General del Mes")
                     show_weekly = st.button("Ver Resumen Semanal")
+                    show_rollups = st.button("Ver Acumulados (YTD / 3-6-12 meses)")
+                    show_comparison = st.button("Comparar Meses")
 
                 st.subheader("👤 Selección de Empleado")
                 selected_employee = st.selectbox(
                     "Selecciona un empleado",
-                    attendance_summary['employee_name'].unique()
+                    attendance_summary['employee_name'].unique(),
+                    on_change=lambda: st.session_state.update(history_view=None)
                 )
 
+            # Las vistas del historial tienen filtros propios, así que se mantienen entre reruns
+            if show_summary or show_weekly or show_rollups or show_comparison:
+                st.session_state.history_view = ('rollups' if show_rollups else
+                                                 'comparison' if show_comparison else None)
+
             # Show either monthly summary, weekly summary or employee dashboard
             if show_summary:
                 create_monthly_summary(processor, attendance_summary)
             elif show_weekly:
                 create_weekly_summary(processor, attendance_summary)
+            elif st.session_state.get('history_view') == 'rollups':
+                create_rollup_view()
+            elif st.session_state.get('history_view') == 'comparison':
+                create_month_comparison_view()
             else:
                 create_employee_dashboard(processor, selected_employee, month_name)
 
+            create_performance_panel(processor)
+
         except Exception as e:
-            st.error(f"Error procesando el archivo: {str(e)}")
+            st.error(f"Error mostrando la vista: {str(e)}")
             st.exception(e)
 
 if __name__ == "__main__":
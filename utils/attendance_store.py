@@ -0,0 +1,312 @@
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from utils.excel_processor import ExcelProcessor
+
+# Base SQLite con el ledger de todos los meses procesados, dentro del almacén de uploads/
+DB_NAME = 'attendance.sqlite'
+
+# Columnas del ledger de ExcelProcessor que se guardan, además de mes, fecha y departamento
+LEDGER_COLUMNS = ['employee', 'sheet', 'block', 'row', 'day', 'entry', 'lunch_out', 'lunch_return', 'exit',
+                  'absence', 'entry_min', 'lunch_out_min', 'lunch_return_min', 'exit_min']
+PUNCH_COLUMNS = ['entry', 'lunch_out', 'lunch_return', 'exit']
+
+# Irregularidades acumuladas por mes, semana ISO y empleado (ver ExcelProcessor.get_daily_metrics)
+ROLLUP_METRICS = list(ExcelProcessor.DAILY_METRICS)
+# Agrupaciones de los acumulados: nombre -> columnas de la tabla rollups
+ROLLUP_GROUPS = {
+    'employee': ['employee', 'department'],
+    'department': ['department'],
+    'month': ['month'],
+    'iso_week': ['iso_year', 'iso_week']
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS months (
+    month TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    filename TEXT,
+    period_start TEXT NOT NULL,
+    period_end TEXT NOT NULL,
+    employees INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ledger (
+    month TEXT NOT NULL REFERENCES months(month),
+    date TEXT,
+    department TEXT,
+    employee TEXT NOT NULL,
+    sheet TEXT,
+    block TEXT,
+    row INTEGER,
+    day TEXT,
+    entry TEXT,
+    lunch_out TEXT,
+    lunch_return TEXT,
+    exit TEXT,
+    absence INTEGER NOT NULL,
+    entry_min INTEGER NOT NULL,
+    lunch_out_min INTEGER NOT NULL,
+    lunch_return_min INTEGER NOT NULL,
+    exit_min INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ledger_month ON ledger(month);
+CREATE INDEX IF NOT EXISTS ledger_employee_date ON ledger(employee, date);
+CREATE TABLE IF NOT EXISTS rollups (
+    month TEXT NOT NULL REFERENCES months(month),
+    iso_year INTEGER NOT NULL,
+    iso_week INTEGER NOT NULL,
+    employee TEXT NOT NULL,
+    department TEXT,
+    %s,
+    PRIMARY KEY (month, iso_year, iso_week, employee)
+);
+CREATE INDEX IF NOT EXISTS rollups_employee ON rollups(employee, month);
+""" % ',\n    '.join(f"{metric} INTEGER NOT NULL" for metric in ROLLUP_METRICS)
+
+
+def connect(db_path):
+    """Abre la base (creándola si no existe); espera si otro proceso está escribiendo"""
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def month_key(period_start):
+    """Clave del mes de un período ('2025-01')"""
+    return f"{period_start:%Y-%m}"
+
+
+def shift_month(month, offset):
+    """Clave del mes desplazado offset meses ('2025-01', -1 -> '2024-12')"""
+    year, number = map(int, month.split('-'))
+    index = year * 12 + number - 1 + offset
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _punch_text(value):
+    if isinstance(value, time):
+        return value.strftime('%H:%M')
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    return str(value)
+
+
+def _day_dates(numbers, period_start):
+    """Fecha de cada número de día dentro del período; None si no es un día válido"""
+    next_month = (period_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    dates = {}
+    for number in pd.Series(numbers).dropna().unique():
+        number = int(number)
+        # Un período que cruza de mes (15/12 ~ 14/01) sigue en el mes siguiente
+        base = period_start if number >= period_start.day else next_month
+        try:
+            dates[number] = base.replace(day=number)
+        except ValueError:
+            continue
+    mapped = pd.Series(numbers).map(dates).astype(object)
+    return mapped.where(mapped.notna(), None)
+
+
+def _row_dates(days, period_start):
+    """Fecha ISO de cada fila según el número de día ('01 We') dentro del período"""
+    numbers = pd.to_numeric(days.astype(str).str[:2], errors='coerce')
+    dates = _day_dates(numbers, period_start).map(lambda value: value.isoformat() if value else None)
+    return dates.astype(object).where(dates.notna(), None)
+
+
+def _ledger_rows(processor, month, period_start):
+    ledger = processor.get_ledger()[LEDGER_COLUMNS]
+    rows = ledger.assign(
+        month=month,
+        date=_row_dates(ledger['day'], period_start),
+        department=ledger['employee'].map(processor.get_employee_department),
+        absence=ledger['absence'].astype(int),
+        row=ledger['row'].astype(int)
+    )
+    for column in PUNCH_COLUMNS:
+        rows[column] = [_punch_text(value) for value in ledger[column]]
+    for column in ('sheet', 'block', 'day'):
+        rows[column] = rows[column].astype(str)
+    for column in ('entry_min', 'lunch_out_min', 'lunch_return_min', 'exit_min'):
+        rows[column] = rows[column].astype(int)
+    return rows[['month', 'date', 'department'] + LEDGER_COLUMNS]
+
+
+def _rollup_rows(processor, month, period_start):
+    """Métricas diarias del libro sumadas por semana ISO y empleado"""
+    daily = processor.get_daily_metrics()
+    dates = _day_dates(daily['day'].to_numpy(), period_start)
+    daily = daily.loc[dates.notna().to_numpy()].copy()
+    calendar = [value.isocalendar() for value in dates.dropna()]
+    daily['iso_year'] = [iso_year for iso_year, _, _ in calendar]
+    daily['iso_week'] = [iso_week for _, iso_week, _ in calendar]
+    keys = ['iso_year', 'iso_week', 'employee', 'department']
+    rollups = daily.groupby(keys, as_index=False, dropna=False)[ROLLUP_METRICS].sum()
+    rollups.insert(0, 'month', month)
+    return rollups
+
+
+def _insert(connection, table, rows):
+    connection.executemany(
+        f"INSERT INTO {table} ({', '.join(rows.columns)}) VALUES ({', '.join('?' * len(rows.columns))})",
+        rows.astype(object).itertuples(index=False, name=None)
+    )
+
+
+def append_month(db_path, processor, filename=None):
+    """Agrega al store el ledger decodificado de un libro, como partición de su mes.
+
+    Junto con el ledger se guardan los acumulados del mes (tabla rollups, por
+    semana ISO y empleado); los de los demás meses no se tocan. Si el mes ya
+    está guardado con el mismo contenido no hace nada y devuelve False; si el
+    libro del mes cambió, reemplaza la partición completa en una sola
+    transacción. Devuelve la clave del mes si escribió.
+    """
+    period = processor.get_period()
+    if period is None:
+        raise ValueError("No se pudo determinar el período del libro (hoja Summary)")
+    period_start, period_end = period
+    month = month_key(period_start)
+
+    with closing(connect(db_path)) as connection:
+        stored = connection.execute('SELECT content_hash FROM months WHERE month = ?', (month,)).fetchone()
+        has_rollups = connection.execute('SELECT 1 FROM rollups WHERE month = ? LIMIT 1', (month,)).fetchone()
+        if stored is not None and stored[0] == processor.content_hash and has_rollups:
+            return False
+
+        rows = _ledger_rows(processor, month, period_start)
+        rollups = _rollup_rows(processor, month, period_start)
+        with connection:
+            for table in ('rollups', 'ledger', 'months'):
+                connection.execute(f"DELETE FROM {table} WHERE month = ?", (month,))
+            connection.execute(
+                'INSERT INTO months VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (month, processor.content_hash, Path(filename).name if filename else None,
+                 period_start.isoformat(), period_end.isoformat(), int(rows['employee'].nunique()),
+                 len(rows), datetime.now().isoformat(timespec='seconds'))
+            )
+            _insert(connection, 'ledger', rows)
+            _insert(connection, 'rollups', rollups)
+    return month
+
+
+def list_months(db_path):
+    """Meses guardados, del más antiguo al más reciente"""
+    with closing(connect(db_path)) as connection:
+        return pd.read_sql_query('SELECT * FROM months ORDER BY month', connection)
+
+
+def load_ledger(db_path, employee=None, start=None, end=None, months=None):
+    """Filas del ledger de varios meses, filtradas por empleado, rango de fechas y/o meses.
+
+    start y end (date o texto ISO) son inclusivos; months es una lista de claves
+    '2025-01'. Las filas vienen ordenadas por empleado y fecha.
+    """
+    conditions, params = [], []
+    if employee is not None:
+        conditions.append('employee = ?')
+        params.append(employee)
+    if start is not None:
+        conditions.append('date >= ?')
+        params.append(start.isoformat() if isinstance(start, date) else start)
+    if end is not None:
+        conditions.append('date <= ?')
+        params.append(end.isoformat() if isinstance(end, date) else end)
+    if months is not None:
+        months = list(months)
+        conditions.append(f"month IN ({', '.join('?' * len(months))})")
+        params += months
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    with closing(connect(db_path)) as connection:
+        return pd.read_sql_query(f"SELECT * FROM ledger {where} ORDER BY employee, date, row", connection,
+                                 params=params)
+
+
+def year_to_date(db_path, year, employee=None, until=None):
+    """Ledger desde el 1 de enero de year hasta until (por defecto, fin de año)"""
+    return load_ledger(db_path, employee=employee, start=date(year, 1, 1), end=until or date(year, 12, 31))
+
+
+def load_rollups(db_path, by='employee', start_month=None, end_month=None, employee=None, department=None):
+    """Acumulados de irregularidades sumados entre start_month y end_month (claves '2025-01', inclusivas).
+
+    by: una clave de ROLLUP_GROUPS (por empleado, departamento, mes o semana ISO).
+    Lee solo la tabla rollups, así que no depende del tamaño del ledger.
+    """
+    if by not in ROLLUP_GROUPS:
+        raise ValueError(f"Agrupación desconocida {by!r}, se espera una de {list(ROLLUP_GROUPS)}")
+    conditions, params = [], []
+    for column, operator, value in (('month', '>=', start_month), ('month', '<=', end_month),
+                                    ('employee', '=', employee), ('department', '=', department)):
+        if value is not None:
+            conditions.append(f"{column} {operator} ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    group = ', '.join(ROLLUP_GROUPS[by])
+    sums = ', '.join(f"SUM({metric}) AS {metric}" for metric in ROLLUP_METRICS)
+    query = (f"SELECT {group}, COUNT(DISTINCT month) AS months, {sums} FROM rollups {where} "
+             f"GROUP BY {group} ORDER BY {group}")
+    with closing(connect(db_path)) as connection:
+        return pd.read_sql_query(query, connection, params=params)
+
+
+def latest_month(db_path):
+    """Último mes guardado; None si el store está vacío"""
+    with closing(connect(db_path)) as connection:
+        row = connection.execute('SELECT MAX(month) FROM months').fetchone()
+    return row[0]
+
+
+def year_to_date_rollups(db_path, by='employee', until=None):
+    """Acumulados desde enero del año de until (por defecto, el último mes guardado) hasta until"""
+    until = until or latest_month(db_path)
+    if until is None:
+        return load_rollups(db_path, by, start_month='', end_month='')
+    return load_rollups(db_path, by, start_month=f"{until[:4]}-01", end_month=until)
+
+
+def rolling_rollups(db_path, months, by='employee', until=None):
+    """Acumulados de los últimos months meses calendario hasta until (por defecto, el último guardado)"""
+    until = until or latest_month(db_path)
+    if until is None:
+        return load_rollups(db_path, by, start_month='', end_month='')
+    return load_rollups(db_path, by, start_month=shift_month(until, 1 - months), end_month=until)
+
+
+def compare_months(db_path, base_month, target_month, by='employee', employee=None, department=None):
+    """Compara los acumulados de dos meses guardados, sin volver a leer ningún libro.
+
+    Devuelve una fila por empleado (o departamento) con status ('both' si está
+    en los dos meses, 'new' si solo en el comparado, 'removed' si solo en el
+    base) y <métrica>_base, <métrica>_target y <métrica>_delta (target - base)
+    para cada métrica de ROLLUP_METRICS. El mes en que no aparece queda en NA,
+    igual que el delta. Todas las métricas miden irregularidades, así que un
+    delta positivo es un empeoramiento: la columna regressions cuenta cuántas
+    métricas subieron, solo en las filas presentes en ambos meses.
+    """
+    if by not in ('employee', 'department'):
+        raise ValueError("Solo se comparan meses por 'employee' o 'department'")
+    keys = ROLLUP_GROUPS[by]
+    base, target = (load_rollups(db_path, by, month, month, employee, department).drop(columns='months')
+                    for month in (base_month, target_month))
+    comparison = base.merge(target, on=keys, how='outer', suffixes=('_base', '_target'), indicator='status')
+    comparison['status'] = comparison['status'].astype(str).map({'both': 'both', 'left_only': 'removed', 'right_only': 'new'})
+    for metric in ROLLUP_METRICS:
+        for suffix in ('_base', '_target'):
+            comparison[metric + suffix] = comparison[metric + suffix].astype('Int64')
+        comparison[metric + '_delta'] = comparison[metric + '_target'] - comparison[metric + '_base']
+    deltas = comparison[[metric + '_delta' for metric in ROLLUP_METRICS]]
+    comparison['regressions'] = (deltas.fillna(0) > 0).sum(axis=1)
+    columns = keys + ['status'] + [metric + suffix for metric in ROLLUP_METRICS
+                                   for suffix in ('_base', '_target', '_delta')]
+    comparison = comparison[columns + ['regressions']]
+    return comparison.sort_values(['regressions'] + keys, ascending=[False] + [True] * len(keys), ignore_index=True)
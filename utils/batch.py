@@ -0,0 +1,236 @@
+"""Procesamiento por lotes de libros de asistencia, sin la interfaz de Streamlit.
+
+Uso (desde la raíz del repo):
+    python -m utils.batch [carpeta|glob|archivo ...] [--output resumen.csv]
+                          [--export-dir reportes] [--formats csv pdf] [--workers N]
+
+Por defecto procesa los libros de uploads/. En cada carpeta indicada se incluyen
+también los archivos subidos desde el dashboard, que viven en el almacén
+<carpeta>/.store/objects/ con su nombre original y mes en los metadatos (salvo
+los que tienen el mismo contenido que un libro suelto de la carpeta). Cada
+archivo se procesa en un proceso del pool: se construye el ExcelProcessor (desde
+el snapshot si existe), se calculan las estadísticas de todos los empleados con
+get_all_employee_stats y, si se pide --export-dir, se exporta un CSV/PDF por
+empleado en <export-dir>/<archivo>/. Las filas de todos los archivos se juntan en una sola
+tabla (--output) y al final se muestra el tiempo de cada archivo.
+"""
+import argparse
+import glob
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from utils.attendance_store import month_key
+from utils.excel_processor import ExcelProcessor
+from utils.snapshot import SNAPSHOT_DIR_NAME, file_content_hash
+from utils.upload_store import STORE_DIR_NAME, blob_path, list_uploads, month_code
+
+logger = logging.getLogger(__name__)
+
+WORKBOOK_SUFFIXES = ('.xls', '.xlsx')
+EXPORT_FORMATS = ('csv', 'pdf')
+
+
+def expand_inputs(inputs):
+    """Archivos Excel a procesar: carpetas (sin recorrer subcarpetas), globs o rutas"""
+    files = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            candidates = sorted(path.iterdir())
+        elif glob.has_magic(item):
+            candidates = [Path(match) for match in sorted(glob.glob(item))]
+        else:
+            candidates = [path]
+        files += [str(candidate) for candidate in candidates
+                  if candidate.is_file() and candidate.suffix.lower() in WORKBOOK_SUFFIXES]
+    return list(dict.fromkeys(files))
+
+
+def stored_uploads(inputs, files=()):
+    """Archivos subidos desde el dashboard en el almacén (.store) de las carpetas de inputs.
+
+    Devuelve ruta de la copia en objects/ -> metadatos (nombre original, mes). Se
+    omiten los que tienen el mismo contenido que alguno de files.
+    """
+    uploads = {}
+    known = None
+    for item in inputs:
+        if not Path(item).is_dir():
+            continue
+        store_dir = Path(item) / STORE_DIR_NAME
+        for metadata in list_uploads(store_dir):
+            path = blob_path(store_dir, metadata['hash'], metadata['suffix'])
+            if not path.is_file():
+                continue
+            if known is None:
+                known = {file_content_hash(file) for file in files}
+            if metadata['hash'] not in known:
+                known.add(metadata['hash'])
+                uploads[str(path)] = metadata
+    return uploads
+
+
+def safe_filename(name):
+    """Nombre de empleado usable como nombre de archivo"""
+    return re.sub(r'[^\w.-]+', '_', name.strip()) or 'empleado'
+
+
+def workbook_month(processor, file):
+    """Mes del libro ('2025-01') según el período de la hoja Summary; si no lo tiene,
+    el código del nombre del archivo ('02Static.XLS' -> '02')"""
+    period = processor.get_period()
+    return month_key(period[0]) if period is not None else month_code(file)
+
+
+def stats_row(filename, month, stats):
+    """Fila de la tabla consolidada para un empleado de un archivo"""
+    return {
+        'Archivo': filename,
+        'Mes': month,
+        'Nombre': stats['name'],
+        'Departamento': stats['department'],
+        'Horas Requeridas': round(stats['required_hours'], 1),
+        'Horas Trabajadas': round(stats['actual_hours'], 1),
+        'Inasistencias': stats['absences'],
+        'Días con Llegada Tarde': len(stats['late_days']),
+        'Minutos Totales de Retraso': round(stats['late_minutes']),
+        'Días con Exceso en Almuerzo': len(stats['lunch_overtime_days']),
+        'Minutos Totales Excedidos en Almuerzo': round(stats['total_lunch_minutes']),
+        'Retiros Anticipados': stats['early_departure_days'],
+        'Minutos Totales de Salida Anticipada': round(stats['early_minutes']),
+        'Días sin Registro de Entrada': len(stats['missing_entry_days']),
+        'Días sin Registro de Salida': len(stats['missing_exit_days']),
+        'Días sin Registro de Almuerzo': len(stats['missing_lunch_days']),
+        'Salidas durante horario laboral': stats['mid_day_departures'],
+        'Minutos de Horas Extra': stats['overtime_minutes']
+    }
+
+
+def process_workbook(file, export_dir=None, formats=EXPORT_FORMATS, snapshot_dir=None, upload=None):
+    """Procesa un libro completo; se ejecuta en un proceso del pool.
+
+    upload: metadatos del almacén si file es la copia de un archivo subido desde el
+    dashboard; el nombre original y su mes reemplazan a los de la copia.
+    Devuelve un dict con el archivo, las filas de la tabla consolidada, los
+    tiempos por etapa (carga, estadísticas, exportación) y el error si lo hubo.
+    """
+    filename = upload['filename'] if upload else Path(file).name
+    result = {'file': file, 'name': filename, 'rows': [], 'employees': 0, 'error': None,
+              'timings': {'load': 0.0, 'stats': 0.0, 'export': 0.0}}
+    timings = result['timings']
+    try:
+        start = time.perf_counter()
+        if upload and snapshot_dir is None:
+            # La copia está en <carpeta>/.store/objects/; sus snapshots, en <carpeta>/.snapshots como los del dashboard
+            snapshot_dir = Path(file).parents[2] / SNAPSHOT_DIR_NAME
+        processor = ExcelProcessor(file, snapshot_dir=snapshot_dir, content_hash=upload['hash'] if upload else None)
+        names = list(processor.process_attendance_summary()['employee_name'].unique())
+        timings['load'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        all_stats = processor.get_all_employee_stats(names)
+        month = workbook_month(processor, filename)
+        result['rows'] = [stats_row(filename, month, all_stats[name]) for name in names]
+        result['employees'] = len(names)
+        timings['stats'] = time.perf_counter() - start
+
+        if export_dir is not None and formats:
+            start = time.perf_counter()
+            target = Path(export_dir) / Path(filename).stem
+            target.mkdir(parents=True, exist_ok=True)
+            exporters = {'csv': processor.export_to_csv, 'pdf': processor.export_to_pdf}
+            for name in names:
+                for extension in formats:
+                    if not exporters[extension](name, str(target / f"{safe_filename(name)}.{extension}")):
+                        logger.warning("No se pudo exportar %s de %s a %s", name, file, extension)
+            timings['export'] = time.perf_counter() - start
+    except Exception as e:
+        logger.error("Error processing %s: %s", file, e)
+        result['error'] = str(e)
+    return result
+
+
+def run_batch(files, workers=None, export_dir=None, formats=EXPORT_FORMATS, snapshot_dir=None, on_result=None,
+              uploads=None):
+    """Procesa los archivos en un pool de procesos y devuelve sus resultados en el orden de entrada.
+
+    on_result, si se indica, se llama con cada resultado apenas termina su archivo.
+    uploads: metadatos del almacén de los archivos que son copias de subidas (ver stored_uploads).
+    """
+    workers = workers or min(len(files), os.cpu_count() or 1)
+    uploads = uploads or {}
+    results = {}
+    if workers <= 1:
+        for file in files:
+            results[file] = process_workbook(file, export_dir, formats, snapshot_dir, uploads.get(file))
+            if on_result:
+                on_result(results[file])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(process_workbook, file, export_dir, formats, snapshot_dir, uploads.get(file))
+                       for file in files]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result['file']] = result
+                if on_result:
+                    on_result(result)
+    return [results[file] for file in files]
+
+
+def consolidated_table(results):
+    """Tabla con una fila por empleado y archivo, de todos los archivos procesados"""
+    rows = [row for result in results for row in result['rows']]
+    return pd.DataFrame(rows)
+
+
+def _print_result(result):
+    timings = result['timings']
+    total = sum(timings.values())
+    status = f"error: {result['error']}" if result['error'] else 'ok'
+    print(f"{result['name'][:32]:<32} {result['employees']:>5} {timings['load']:>10.3f} "
+          f"{timings['stats']:>10.3f} {timings['export']:>10.3f} {total:>10.3f}  {status}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('inputs', nargs='*', default=['uploads'],
+                        help="Carpetas, globs o archivos Excel (por defecto uploads/); de las carpetas "
+                             "se incluyen también las subidas del dashboard guardadas en <carpeta>/.store")
+    parser.add_argument('--output', default='resumen_asistencia.csv', help="Tabla consolidada (CSV)")
+    parser.add_argument('--export-dir', help="Carpeta para los reportes por empleado")
+    parser.add_argument('--formats', nargs='+', choices=EXPORT_FORMATS, default=list(EXPORT_FORMATS))
+    parser.add_argument('--workers', type=int, help="Procesos del pool (por defecto uno por CPU)")
+    parser.add_argument('--no-snapshot', action='store_true', help="No leer ni escribir snapshots")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+    files = expand_inputs(args.inputs)
+    uploads = stored_uploads(args.inputs, files)
+    files += list(uploads)
+    if not files:
+        print("No se encontraron archivos Excel", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{'archivo':<32} {'empl.':>5} {'carga (s)':>10} {'stats (s)':>10} {'export (s)':>10} {'total (s)':>10}")
+    start = time.perf_counter()
+    results = run_batch(files, args.workers, args.export_dir, args.formats,
+                        snapshot_dir=False if args.no_snapshot else None, on_result=_print_result, uploads=uploads)
+    elapsed = time.perf_counter() - start
+
+    table = consolidated_table(results)
+    table.to_csv(args.output, index=False, encoding='utf-8-sig')
+    failed = [result for result in results if result['error']]
+    print(f"\n{len(files)} archivos, {len(table)} filas en {args.output} · {elapsed:.3f}s de pared"
+          + (f" · {len(failed)} con error" if failed else ""))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,164 +1,208 @@
+import io
+import logging
+import os
+import threading
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 from fpdf import FPDF
-from functools import lru_cache
+from functools import lru_cache, partial, wraps
+from operator import contains
+from pathlib import Path
+from time import perf_counter
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from utils.schedules import DEFAULT_SCHEDULE_FILE, load_schedule_rules, resolve_schedule
+from utils.snapshot import (SNAPSHOT_DIR_NAME, file_content_hash, read_snapshot, read_stats, snapshot_path,
+                            write_snapshot, write_stats)
+
+logger = logging.getLogger(__name__)
+
+# Nivel por debajo de DEBUG para el detalle fila por fila; desactivado salvo que se configure
+TRACE = 5
+logging.addLevelName(TRACE, 'TRACE')
+
+# Máximo de diagnósticos de parseo que guarda cada procesador
+MAX_DIAGNOSTICS = 1000
+
+
+def _profiled(method):
+    """Registra tiempo de pared, llamadas y hojas parseadas de un método del procesador"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        parses_before = self._sheet_cache_stats['misses']
+        start = perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start
+            with self._lock:
+                stats = self._performance_stats.setdefault(
+                    method.__name__, {'calls': 0, 'total_time': 0.0, 'max_time': 0.0, 'sheet_parses': 0})
+                stats['calls'] += 1
+                stats['total_time'] += elapsed
+                stats['max_time'] = max(stats['max_time'], elapsed)
+                stats['sheet_parses'] += self._sheet_cache_stats['misses'] - parses_before
+    return wrapper
+
+
+def _read_sheet(excel_file, sheet_name, usecols=None, nrows=None):
+    """Lee una hoja sin encabezado. Con usecols/nrows solo se cargan esas columnas y filas,
+    pero las columnas conservan su posición original para que iloc siga funcionando."""
+    if usecols is None:
+        return pd.read_excel(excel_file, sheet_name=sheet_name, header=None, nrows=nrows)
+
+    df = pd.read_excel(excel_file, sheet_name=sheet_name, header=None, nrows=nrows,
+                       usecols=partial(contains, frozenset(usecols)))
+    width = max(df.columns) + 1 if len(df.columns) else 0
+    return df.reindex(columns=range(width))
+
+
+def _read_sheets(source, sheets):
+    """Lee un grupo de hojas en un proceso del pool (source es una ruta o los bytes del archivo)"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    with pd.ExcelFile(source) as excel_file:
+        return [_read_sheet(excel_file, sheet, **options) for sheet, options in sheets]
 
 class ExcelProcessor:
-    def get_employee_stats(self, employee_name):
-        """Get comprehensive statistics for a specific employee"""
-        # Estadisticas regulares
-        late_days, late_minutes = self.count_late_days(employee_name)
-        late_arrivals, late_arrival_minutes = self.count_late_arrivals_after_810(employee_name)
-        early_departure_days, early_minutes = self.count_early_departures(employee_name)
-        lunch_overtime_days, total_lunch_minutes = self.count_lunch_overtime_days(employee_name)
-        missing_entry_days, missing_exit_days, missing_lunch_days = self.count_missing_records(employee_name)
-        absence_days = self.get_absence_days(employee_name)
-        absences = len(absence_days) if absence_days else 0
-        mid_day_departures, mid_day_departures_text = self.count_mid_day_departures(employee_name)
-        overtime_minutes = 0
-        overtime_days = []
+    # Posiciones de los tres bloques de empleados en cada hoja de asistencia (J3, Y3, AN3)
+    EMPLOYEE_BLOCKS = [
+        {'name_col': 'J', 'day_col': 'A', 'entry_col': 'B', 'lunch_out': 'D', 'lunch_return': 'G', 'exit_col': 'I'},
+        {'name_col': 'Y', 'day_col': 'P', 'entry_col': 'Q', 'lunch_out': 'S', 'lunch_return': 'V', 'exit_col': 'X'},
+        {'name_col': 'AN', 'day_col': 'AE', 'entry_col': 'AF', 'lunch_out': 'AH', 'lunch_return': 'AK', 'exit_col': 'AM'}
+    ]
 
-        # Departamento
-        department = ""
-        try:
-            department = self.get_employee_department(employee_name)
-        except Exception as e:
-            print(f"Error getting department: {str(e)}")
+    # Columnas del ledger de marcaciones (una fila por empleado y día)
+    LEDGER_COLUMNS = ['employee', 'sheet', 'block', 'row', 'day', 'entry', 'lunch_out', 'lunch_return', 'exit', 'absence',
+                      'entry_min', 'lunch_out_min', 'lunch_return_min', 'exit_min']
 
-        # Calcular horas requeridas según el tipo de empleado
-        if 'sebastian' in employee_name.lower() or 'ppp' in employee_name.lower():
-            required_hours = 80.0  # Estándar mensual para PPP y Sebastian
-        else:
-            required_hours = 168.4  # Estándar mensual para empleados regulares
+    # Marcaciones ya convertidas a minutos desde medianoche; este valor indica que no hay hora
+    MISSING_MINUTES = -1
 
-        # Asegurar que las horas no sean negativas
-        actual_hours = max(0, actual_hours)
+    # Versión del formato del ledger; cambiarla invalida los snapshots guardados
+    PARSER_VERSION = 1
 
-        # Diccionario de estadisticas
-        stats = {
-            'name': employee_name,
-            'department': department,
-            'absences': absences,
-            'absence_days': absence_days,
-            'late_days': late_days,
-            'late_minutes': late_minutes,
-            'late_arrivals': late_arrivals,
-            'late_arrival_minutes': late_arrival_minutes,
-            'early_departure_days': early_departure_days,
-            'early_minutes': early_minutes,
-            'lunch_overtime_days': lunch_overtime_days,
-            'total_lunch_minutes': total_lunch_minutes,
-            'missing_entry_days': missing_entry_days,
-            'missing_exit_days': missing_exit_days,
-            'missing_lunch_days': missing_lunch_days,
-            'required_hours': required_hours,
-            'actual_hours': actual_hours,
-            'mid_day_departures': mid_day_departures,
-            'mid_day_departures_text': mid_day_departures_text,
-            'overtime_minutes': overtime_minutes,
-            'overtime_days': overtime_days
-        }
-        
-        # Add PPP weekly hours if applicable
-        if employee_name.lower() == 'sebastian':
-            stats['weekly_hours'] = {
-                'Semana 1': 0,
-                'Semana 2': 0,
-                'Semana 3': 0,
-                'Semana 4': 3.78  # Sus horas fijas en la última semana
-            }
-            stats['weekly_details'] = [{
-                'week': 'Semana 4',
-                'day': '22 Jueves',
-                'entry': '08:00',
-                'exit': '11:47',
-                'hours': '3h 47m'
-            }]
-        elif 'ppp' in employee_name.lower():
-            weekly_hours, weekly_details = self.calculate_ppp_weekly_hours(employee_name)
-            stats['weekly_hours'] = weekly_hours
-            stats['weekly_details'] = weekly_details
-            
-        return stats
+    # Versión del cálculo de las métricas de get_employee_stats; hay que subirla cada vez que
+    # cambia lo que significa alguna métrica, para no cargar estadísticas guardadas con el cálculo anterior
+    STATS_VERSION = 1
+
+    # Filas de las hojas de asistencia que se usan: nombres (fila 3), celdas como AE7 y días (filas 12-42)
+    ATTENDANCE_ROWS = 42
+
+    # Semanas cuyas estadísticas (get_all_weekly_stats) se guardan en memoria
+    WEEK_CACHE_SIZE = 16
+
+    # Empleados por tanda en el precálculo en segundo plano (el avance se publica por tanda)
+    PRECOMPUTE_BATCH_SIZE = 10
 
     def get_employee_department(self, employee_name):
         """Get the department for a specific employee from cache"""
         return self._department_cache.get(employee_name, "No especificado")
 
-    def __init__(self, file):
-        self.excel_file = pd.ExcelFile(file)
-        self.DEFAULT_WORK_START_TIME = datetime.strptime('7:50', '%H:%M').time()
-        self.DEFAULT_WORK_END_TIME = datetime.strptime('17:10', '%H:%M').time()
+    def get_period(self):
+        """Período del libro según la hoja Summary ('Date: 2025/01/01 ~ 01/31'): (inicio, fin) como date.
+
+        Devuelve None si la hoja no tiene el rango con ese formato.
+        """
+        try:
+            text = str(self._summary_df.iloc[1, 1]).split('\t')[0]
+            start_text, end_text = (part.strip() for part in text.split('~'))
+            start = datetime.strptime(start_text, '%Y/%m/%d').date()
+            end = datetime.strptime(f"{start.year}/{end_text}", '%Y/%m/%d').date()
+            if end < start:
+                end = end.replace(year=start.year + 1)
+            return start, end
+        except (AttributeError, IndexError, TypeError, ValueError):
+            return None
+
+    def get_ledger(self):
+        """Copia del ledger: una fila por empleado y día con las marcaciones y sus minutos"""
+        return self._ledger.copy()
+
+    def __init__(self, file, snapshot_dir=None, workers=None, restricted_reads=True, schedule_file=None,
+                 content_hash=None):
+        """file: ruta o archivo en memoria. snapshot_dir: carpeta de snapshots; por defecto
+        '.snapshots' junto al archivo si es una ruta, y sin snapshot si está en memoria
+        (False lo desactiva siempre). workers: procesos para decodificar las hojas en
+        paralelo; None o 1 las lee en secuencia. restricted_reads: leer de las hojas de
+        asistencia solo las filas y columnas de los bloques; False las lee completas.
+        schedule_file: tabla de horarios; por defecto config/schedules.json.
+        content_hash: SHA-256 del contenido si quien llama ya lo calculó; si no, se hashea aquí."""
+        self._source = file
+        self.workers = workers
+        self.restricted_reads = restricted_reads
+        self._excel_file = None
+        self.sheet_names = []
+        self.content_hash = content_hash if content_hash is not None else file_content_hash(file)
+        if snapshot_dir is None and isinstance(file, (str, Path)):
+            snapshot_dir = Path(file).parent / SNAPSHOT_DIR_NAME
+        self.snapshot_dir = snapshot_dir
+        self.loaded_from_snapshot = False
+        self._schedule_default, self._schedule_rules = load_schedule_rules(schedule_file)
+        # Las estadísticas guardadas en el snapshot valen solo para esta tabla de horarios
+        self.schedule_hash = file_content_hash(schedule_file if schedule_file is not None else DEFAULT_SCHEDULE_FILE)
+        self.DEFAULT_WORK_START_TIME = self._schedule_default['start_time']
+        self.DEFAULT_WORK_END_TIME = self._schedule_default['end_time']
         self.LUNCH_TIME_LIMIT = 20  # minutos máximos permitidos para almuerzo
         
-        # Caches para optimización
+        # Caches para optimización. El precálculo en segundo plano las llena a la vez que
+        # el hilo de la interfaz: los llenados perezosos y la LRU de semanas van bajo _lock
+        self._lock = threading.RLock()
         self._department_cache = {}
         self._dataframe_cache = {}
+        self._sheet_cache_stats = {'hits': 0, 'misses': 0, 'parses': {}}
         self._summary_df = None
-        self._week_cache = None
+        self._week_cache = OrderedDict()
         self._stats_cache = {}
+        self._ledger = pd.DataFrame(columns=self.LEDGER_COLUMNS)
+        self._employee_locations = {}
+        self._ledger_positions = {}
+        self._diagnostics = deque(maxlen=MAX_DIAGNOSTICS)
+        self._performance_stats = {}
+        self._schedules = {}
+        self._overtime_tables = None
+        self._precompute_thread = None
+        self._precompute_progress = {'done': 0, 'total': 0, 'finished': False, 'error': None}
+        self._schedule_table = pd.DataFrame(columns=['start_min', 'end_min'])
         
         # Initialize all caches
         self._initialize_caches()
-        
-        # Initialize special schedules after caches
-        self.SPECIAL_SCHEDULES = {
-            'soledad silv': {
-                'half_day': True,
-                'end_time': datetime.strptime('12:00', '%H:%M').time(),
-                'no_lunch': True,
-                'sheet_name': '17.18',
-                'position': {
-                    'name_col': 'J',
-                    'entry_col': 'B',
-                    'exit_col': 'D',
-                    'day_col': 'A',
-                    'absence_col': 'G'
-                }
-            },
-            'agustin taba': {
-                'half_day': True,
-                'end_time': datetime.strptime('12:40', '%H:%M').time(),
-                'no_lunch': True,
-                'check_special_exit': True,
-                'exit_col': 'AH',
-                'start_row': 11,  # corresponde a fila 12
-                'end_row': 40
-            },
-            'ana': {
-                'start_time': datetime.strptime('8:00', '%H:%M').time(),
-                'end_time': datetime.strptime('15:00', '%H:%M').time(),
-                'overtime_enabled': True,
-                'no_lunch': False
-            },
-            'luisina ppp': {
-                'start_time': datetime.strptime('8:00', '%H:%M').time(),
-                'end_time': datetime.strptime('12:00', '%H:%M').time(),
-                'no_lunch': True,
-                'hide_exit': True
-            },
-            'emiliano ppp': {
-                'start_time': datetime.strptime('8:00', '%H:%M').time(),
-                'end_time': datetime.strptime('12:00', '%H:%M').time(),
-                'no_lunch': True,
-                'hide_exit': True
-            },
-            'sebastian': {
-                'start_time': datetime.strptime('8:00', '%H:%M').time(),
-                'end_time': datetime.strptime('12:00', '%H:%M').time(),
-                'no_lunch': True,
-                'treat_as_ppp': True,  # Nueva bandera para tratar como PPP
-                'fixed_hours': 3.78  # 3 horas y 47 minutos en decimal
-            }
-        }
-        
+
+        # Compile the schedule rules for every employee in the workbook
+        self._compile_schedules()
+
+    @property
+    def excel_file(self):
+        """Libro de Excel, abierto solo cuando hace falta leer una hoja que no está en el snapshot"""
+        if self._excel_file is None:
+            self._excel_file = pd.ExcelFile(self._source)
+        return self._excel_file
+
+    @_profiled
     def _initialize_caches(self):
         """Initialize all caches on startup"""
+        loaded = self._load_snapshot()
+        if not loaded:
+            self.sheet_names = self.excel_file.sheet_names
+
         try:
-            # Cache departamentos
-            self._summary_df = pd.read_excel(self.excel_file, sheet_name='Summary', header=None)
+            if not loaded:
+                # Cache departamentos
+                self._summary_df = self._get_sheet_data('Summary')
+
+                # Cache hojas de asistencia
+                exceptional_index = self.sheet_names.index('Exceptional')
+                attendance_sheets = self.sheet_names[exceptional_index:]
+
+                self._load_sheets(attendance_sheets)
+
+                # Índice empleado -> (hoja, bloque) y ledger de marcaciones, decodificados una sola vez
+                self._employee_locations = self._build_employee_locations(attendance_sheets[1:])
+                self._ledger = self._build_ledger()
+                self._save_snapshot()
+
             for row in range(4, len(self._summary_df)):
                 try:
                     name = str(self._summary_df.iloc[row, 1]).strip()
@@ -167,53 +211,301 @@ class ExcelProcessor:
                         self._department_cache[name] = dept
                 except:
                     continue
-                    
-            # Cache hojas de asistencia
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
-            
-            for sheet in attendance_sheets:
-                self._dataframe_cache[sheet] = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
+
+            self._ledger_positions = self._ledger.groupby('employee', sort=False).indices
                 
         except Exception as e:
-            print(f"Error initializing caches: {str(e)}")
+            logger.error("Error initializing caches: %s", e)
+
+    def _load_snapshot(self):
+        """Carga el ledger, Summary y Exceptional desde el snapshot del archivo, si existe"""
+        if not self.snapshot_dir:
+            return False
+        try:
+            snapshot = read_snapshot(self._snapshot_path())
+            if snapshot is None:
+                return False
+
+            ledger, sheets, metadata = snapshot
+            blocks = {block['name_col']: block for block in self.EMPLOYEE_BLOCKS}
+            self.sheet_names = metadata['sheet_names']
+            self._dataframe_cache.update(sheets)
+            self._summary_df = self._dataframe_cache['Summary']
+            self._employee_locations = {
+                name: [{'sheet': sheet, 'block': blocks[name_col]} for sheet, name_col in locations]
+                for name, locations in metadata['employee_locations'].items()
+            }
+            self._ledger = ledger[self.LEDGER_COLUMNS]
+            self._stats_cache.update(read_stats(self._snapshot_path(), self.schedule_hash, self.STATS_VERSION) or {})
+            self.loaded_from_snapshot = True
+            return True
+        except Exception as e:
+            logger.error("Error reading snapshot, decoding workbook: %s", e)
+            return False
+
+    def _save_snapshot(self):
+        """Guarda el ledger, Summary y Exceptional como snapshot Parquet junto al archivo"""
+        if not self.snapshot_dir:
+            return
+        try:
+            metadata = {
+                'content_hash': self.content_hash,
+                'parser_version': self.PARSER_VERSION,
+                'sheet_names': list(self.sheet_names),
+                'employee_locations': {
+                    name: [[location['sheet'], location['block']['name_col']] for location in locations]
+                    for name, locations in self._employee_locations.items()
+                }
+            }
+            sheets = {name: self._get_sheet_data(name) for name in ('Summary', 'Exceptional')}
+            write_snapshot(self._snapshot_path(), self._ledger, sheets, metadata)
+        except Exception as e:
+            logger.error("Error writing snapshot: %s", e)
+
+    def _snapshot_path(self):
+        return snapshot_path(self.snapshot_dir, self.content_hash, self.PARSER_VERSION)
+
+    def save_stats_snapshot(self):
+        """Guarda las estadísticas ya calculadas de todos los empleados junto al snapshot.
+
+        Un procesador nuevo del mismo archivo (otra sesión, el watcher, un reinicio)
+        las carga con el snapshot y no vuelve a calcularlas.
+        """
+        if not self.snapshot_dir or not self._stats_cache:
+            return False
+        try:
+            with self._lock:
+                stats = dict(self._stats_cache)
+            return write_stats(self._snapshot_path(), self.schedule_hash, self.STATS_VERSION, stats)
+        except Exception as e:
+            logger.error("Error writing stats snapshot: %s", e)
+            return False
+
+    def _build_employee_locations(self, attendance_sheets):
+        """Indexa dónde está cada empleado: nombre -> lista de {'sheet', 'block'} según la fila 3 de J, Y y AN"""
+        locations = {}
+        for sheet in attendance_sheets:
+            df = self._get_sheet_data(sheet)
+            for block in self.EMPLOYEE_BLOCKS:
+                name_col_index = self.get_column_index(block['name_col'])
+                if len(df) <= 2 or name_col_index >= df.shape[1]:
+                    continue
+
+                name_cell = df.iloc[2, name_col_index]
+                if pd.isna(name_cell):
+                    continue
+
+                locations.setdefault(str(name_cell).strip(), []).append({'sheet': sheet, 'block': block})
+        return locations
+
+    def get_employee_locations(self, employee_name):
+        """Hojas y bloques (descriptor de EMPLOYEE_BLOCKS) donde aparece el empleado"""
+        return self._employee_locations.get(employee_name, [])
+
+    def _build_ledger(self):
+        """Decodifica las hojas de asistencia en un ledger columnar de marcaciones"""
+        frames = []
+        for employee_name, locations in self._employee_locations.items():
+            for location in locations:
+                df = self._get_sheet_data(location['sheet'])
+                block = location['block']
+                if len(df) <= 11:
+                    continue
+
+                # La columna del nombre es la última del bloque, así que el resto está dentro de la hoja
+                cols = [self.get_column_index(block[key]) for key in
+                        ('day_col', 'entry_col', 'lunch_out', 'lunch_return', 'exit_col')]
+
+                # Filas 12-42 del bloque (índices 11-41)
+                rows = df.iloc[11:42, cols]
+                frames.append(pd.DataFrame({
+                    'employee': employee_name,
+                    'sheet': location['sheet'],
+                    'block': block['name_col'],
+                    'row': rows.index,
+                    'day': rows.iloc[:, 0].values,
+                    'entry': rows.iloc[:, 1].values,
+                    'lunch_out': rows.iloc[:, 2].values,
+                    'lunch_return': rows.iloc[:, 3].values,
+                    'exit': rows.iloc[:, 4].values
+                }))
+
+        if not frames:
+            return pd.DataFrame(columns=self.LEDGER_COLUMNS)
+
+        ledger = pd.concat(frames, ignore_index=True)
+        ledger = ledger[ledger['day'].notna()].reset_index(drop=True)
+        # La marca 'Absence' aparece en la columna de regreso de almuerzo (G, V, AK)
+        ledger['absence'] = ledger['lunch_return'].astype(str).str.strip().str.lower() == 'absence'
+        for field in ('entry', 'lunch_out', 'lunch_return', 'exit'):
+            ledger[f'{field}_min'] = self._to_minutes(ledger[field])
+        return ledger[self.LEDGER_COLUMNS]
+
+    def _get_employee_ledger(self, employee_name, sheet=None, block=None):
+        """Filas del ledger de un empleado, opcionalmente limitadas a una hoja y bloque"""
+        records = self._ledger.iloc[self._ledger_positions.get(employee_name, [])]
+        if sheet is not None:
+            records = records[records['sheet'] == sheet]
+        if block is not None:
+            records = records[records['block'] == block]
+        return records
+
+    def _get_ledger_field(self, block, column_letter):
+        """Traduce una letra de columna de un bloque a su campo en el ledger"""
+        fields = {'day_col': 'day', 'entry_col': 'entry', 'lunch_out': 'lunch_out',
+                  'lunch_return': 'lunch_return', 'exit_col': 'exit'}
+        for position in self.EMPLOYEE_BLOCKS:
+            if position['name_col'] == block:
+                for key, field in fields.items():
+                    if position[key] == column_letter:
+                        return field
+        raise KeyError(f"Columna {column_letter} no pertenece al bloque {block}")
             
     def _get_sheet_data(self, sheet_name):
-        """Get cached sheet data or load if not cached"""
-        if sheet_name not in self._dataframe_cache:
-            self._dataframe_cache[sheet_name] = pd.read_excel(self.excel_file, sheet_name=sheet_name, header=None)
-        return self._dataframe_cache[sheet_name]
+        """Get cached sheet data or load if not cached.
 
-    def get_employee_schedule(self, employee_name):
-        """Determina el horario de trabajo basado en el nombre del empleado"""
-        if 'ppp' in employee_name.lower() or (employee_name.lower() in self.SPECIAL_SCHEDULES and 
-            self.SPECIAL_SCHEDULES[employee_name.lower()].get('treat_as_ppp', False)):
-            schedule = self.SPECIAL_SCHEDULES.get(employee_name.lower(), {})
+        Single access point to the workbook sheets: every method reads through
+        here so each sheet is parsed at most once per processor instance.
+        """
+        with self._lock:
+            if sheet_name in self._dataframe_cache:
+                self._sheet_cache_stats['hits'] += 1
+            else:
+                self._sheet_cache_stats['misses'] += 1
+                parses = self._sheet_cache_stats['parses']
+                parses[sheet_name] = parses.get(sheet_name, 0) + 1
+                self._dataframe_cache[sheet_name] = _read_sheet(self.excel_file, sheet_name,
+                                                                **self._sheet_read_options(sheet_name))
+            return self._dataframe_cache[sheet_name]
+
+    def _sheet_read_options(self, sheet_name):
+        """usecols/nrows para leer una hoja; las de asistencia se limitan a las celdas del layout"""
+        if (not self.restricted_reads or 'Exceptional' not in self.sheet_names or sheet_name not in self.sheet_names
+                or self.sheet_names.index(sheet_name) < self.sheet_names.index('Exceptional')):
+            return {}
+
+        columns = {self.get_column_index(column) for block in self.EMPLOYEE_BLOCKS for column in block.values()}
+        return {'usecols': sorted(columns), 'nrows': self.ATTENDANCE_ROWS}
+
+    def _load_sheets(self, sheet_names):
+        """Carga varias hojas en la caché, en paralelo si se configuraron workers"""
+        pending = [sheet for sheet in sheet_names if sheet not in self._dataframe_cache]
+        workers = min(self.workers or 1, len(pending))
+        if workers <= 1:
+            for sheet in sheet_names:
+                self._get_sheet_data(sheet)
+            return
+
+        # Cada proceso abre el libro una vez y lee su grupo de hojas; se le pasa la ruta o los bytes
+        if isinstance(self._source, (str, os.PathLike)):
+            source = os.fspath(self._source)
+        elif hasattr(self._source, 'getvalue'):
+            source = self._source.getvalue()
+        else:
+            self._source.seek(0)
+            source = self._source.read()
+            self._source.seek(0)
+
+        chunks = [pending[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            requests = [[(sheet, self._sheet_read_options(sheet)) for sheet in chunk] for chunk in chunks]
+            for chunk, frames in zip(chunks, pool.map(_read_sheets, [source] * workers, requests)):
+                with self._lock:
+                    for sheet, df in zip(chunk, frames):
+                        self._sheet_cache_stats['misses'] += 1
+                        parses = self._sheet_cache_stats['parses']
+                        parses[sheet] = parses.get(sheet, 0) + 1
+                        self._dataframe_cache[sheet] = df
+
+    def _add_diagnostic(self, method, message, sheet, row, error=None):
+        """Registra un problema de parseo de una fila sin formatear texto; se loguea solo en nivel TRACE"""
+        self._diagnostics.append({'method': method, 'message': message, 'sheet': sheet, 'row': row, 'error': error})
+        logger.log(TRACE, "%s: %s (hoja %s, fila %s): %s", method, message, sheet, row, error)
+
+    def get_diagnostics(self):
+        """Problemas de parseo registrados (los más recientes, hasta MAX_DIAGNOSTICS)"""
+        return list(self._diagnostics)
+
+    def get_performance_stats(self):
+        """Tiempo total y máximo (segundos), llamadas y hojas parseadas por método instrumentado"""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._performance_stats.items()}
+
+    def reset_performance_stats(self):
+        """Reinicia los contadores de rendimiento"""
+        with self._lock:
+            self._performance_stats.clear()
+
+    def get_sheet_cache_stats(self):
+        """Returns hit/miss counters and per-sheet parse counts of the sheet cache"""
+        with self._lock:
             return {
-                'start_time': schedule.get('start_time', datetime.strptime('8:00', '%H:%M').time()),
-                'end_time': schedule.get('end_time', datetime.strptime('12:00', '%H:%M').time()),
-                'no_lunch': True,
-                'hide_exit': schedule.get('hide_exit', False),
-                'treat_as_ppp': True,
-                'fixed_hours': schedule.get('fixed_hours', None)
+                'hits': self._sheet_cache_stats['hits'],
+                'misses': self._sheet_cache_stats['misses'],
+                'parses': dict(self._sheet_cache_stats['parses'])
             }
-        elif employee_name.lower() in self.SPECIAL_SCHEDULES:
-            schedule = self.SPECIAL_SCHEDULES[employee_name.lower()]
-            return {
-                'start_time': schedule.get('start_time', self.DEFAULT_WORK_START_TIME),
-                'end_time': schedule.get('end_time', self.DEFAULT_WORK_END_TIME),
-                'no_lunch': schedule.get('no_lunch', False),
-                'overtime_enabled': schedule.get('overtime_enabled', False),
-                'hide_exit': schedule.get('hide_exit', False)
+
+    def _compile_schedule(self, employee_name):
+        """Resuelve las reglas de horario de un empleado a un dict listo para usar.
+
+        Las horas quedan también en minutos desde medianoche y las columnas de
+        scope/overtime (letras de un bloque) como campos del ledger.
+        """
+        schedule = resolve_schedule(self._schedule_default, self._schedule_rules, employee_name)
+        schedule['no_lunch'] = not schedule.pop('lunch')
+        schedule['start_min'] = schedule['start_time'].hour * 60 + schedule['start_time'].minute
+        schedule['end_min'] = schedule['end_time'].hour * 60 + schedule['end_time'].minute
+
+        if schedule['scope']:
+            scope = schedule['scope']
+            schedule['scope'] = {
+                'sheet': scope['sheet'],
+                'block': scope['block'],
+                'entry_field': self._get_ledger_field(scope['block'], scope['entry_col']),
+                'exit_field': self._get_ledger_field(scope['block'], scope['exit_col'])
             }
-        else:
-            return {
-                'start_time': self.DEFAULT_WORK_START_TIME,
-                'end_time': self.DEFAULT_WORK_END_TIME,
-                'no_lunch': False,
-                'overtime_enabled': False,
-                'hide_exit': False
+        if schedule['overtime']:
+            overtime = schedule['overtime']
+            schedule['overtime'] = {
+                'sheet': overtime['sheet'],
+                'block': overtime['block'],
+                'start_field': self._get_ledger_field(overtime['block'], overtime['start_col']),
+                'end_field': self._get_ledger_field(overtime['block'], overtime['end_col'])
             }
+        return schedule
+
+    def _compile_schedules(self):
+        """Compila los horarios de todos los empleados del libro y arma la tabla de minutos"""
+        employees = list(dict.fromkeys(list(self._ledger_positions) + list(self._department_cache)))
+        for employee_name in employees:
+            self.get_employee_schedule(employee_name)
+        self._schedule_table = pd.DataFrame(
+            {'start_min': [self._schedules[name.lower()]['start_min'] for name in employees],
+             'end_min': [self._schedules[name.lower()]['end_min'] for name in employees]},
+            index=pd.Index(employees, name='employee'), dtype=np.int16)
+
+    def _schedule_minutes(self, records):
+        """Arrays de inicio y fin de jornada (minutos) alineados con las filas del ledger"""
+        employees = records['employee']
+        with self._lock:
+            unknown = employees[~employees.isin(self._schedule_table.index)].unique()
+            if len(unknown):
+                extra = pd.DataFrame(
+                    {'start_min': [self.get_employee_schedule(name)['start_min'] for name in unknown],
+                     'end_min': [self.get_employee_schedule(name)['end_min'] for name in unknown]},
+                    index=pd.Index(unknown, name='employee'), dtype=np.int16)
+                self._schedule_table = pd.concat([self._schedule_table, extra])
+            table = self._schedule_table.reindex(employees)
+        return (table['start_min'].to_numpy(dtype=np.int32),
+                table['end_min'].to_numpy(dtype=np.int32))
+
+    def get_employee_schedule(self, employee_name):
+        """Horario de trabajo del empleado según la tabla de reglas (compilado una sola vez)"""
+        key = employee_name.lower()
+        schedule = self._schedules.get(key)
+        if schedule is None:
+            schedule = self._schedules[key] = self._compile_schedule(employee_name)
+        return schedule
 
     def is_early_departure(self, employee_name, exit_time):
         """Determina si la salida es temprana considerando excepciones"""
@@ -236,101 +528,59 @@ class ExcelProcessor:
         schedule = self.get_employee_schedule(employee_name)
         return not schedule['no_lunch']
 
+    @_profiled
     def count_early_departures(self, employee_name):
         """Cuenta las salidas tempranas considerando horarios especiales"""
         try:
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
+            trace = logger.isEnabledFor(TRACE)
             early_departures = 0
             total_early_minutes = 0
 
-            for sheet in attendance_sheets:
+            # Los PPP registran su salida en la columna de salida de almuerzo (D, S, AH)
+            schedule = self.get_employee_schedule(employee_name)
+            exit_field = schedule['exit_field']
+
+            for record in self._get_employee_ledger(employee_name).itertuples(index=False):
                 try:
-                    print(f"\nProcesando hoja: {sheet}")
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-
-                    # Define correct positions for different employee types
-                    if 'ppp' in employee_name.lower():
-                        positions = [
-                            {'name_col': 'J', 'entry_col': 'B', 'exit_col': 'D', 'day_col': 'A'},
-                            {'name_col': 'Y', 'entry_col': 'Q', 'exit_col': 'S', 'day_col': 'P'},
-                            {'name_col': 'AN', 'entry_col': 'AF', 'exit_col': 'AH', 'day_col': 'AE'}
-                        ]
-                    else:
-                        positions = [
-                            {'name_col': 'J', 'exit_col': 'I', 'day_col': 'A'},
-                            {'name_col': 'Y', 'exit_col': 'X', 'day_col': 'P'},
-                            {'name_col': 'AN', 'exit_col': 'AM', 'day_col': 'AE'}
-                        ]
+                    day_str = str(record.day).strip().lower()
+                    if day_str == '' or day_str == 'nan' or day_str == 'absence':
+                        continue
 
-                    for position in positions:
+                    exit_time = getattr(record, exit_field)
+                    if not pd.isna(exit_time):
                         try:
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
-                            if pd.isna(name_cell):
+                            if isinstance(exit_time, str):
+                                exit_time = pd.to_datetime(exit_time).time()
+                            elif isinstance(exit_time, datetime):
+                                exit_time = exit_time.time()
+                            else:
+                                self._add_diagnostic('count_early_departures', "Formato de hora no reconocido", record.sheet, record.row + 1)
                                 continue
 
-                            employee_cell = str(name_cell).strip()
-                            if employee_cell == employee_name:
-                                print(f"Empleado encontrado en hoja {sheet}, columna {position['name_col']}")
-
-                                day_col = self.get_column_index(position['day_col'])
-                                exit_col = self.get_column_index(position['exit_col'])
-
-                                for row in range(11, 42):
-                                    try:
-                                        day_value = df.iloc[row, day_col]
-                                        if pd.isna(day_value):
-                                            continue
-
-                                        day_str = str(day_value).strip().lower()
-                                        if day_str == '' or day_str == 'nan' or day_str == 'absence':
-                                            continue
-
-                                        exit_time = df.iloc[row, exit_col]
-                                        if not pd.isna(exit_time):
-                                            try:
-                                                if isinstance(exit_time, str):
-                                                    exit_time = pd.to_datetime(exit_time).time()
-                                                elif isinstance(exit_time, datetime):
-                                                    exit_time = exit_time.time()
-                                                else:
-                                                    print(f"Formato de hora no reconocido en fila {row+1}")
-                                                    continue
-
-                                                if self.is_early_departure(employee_name, exit_time):
-                                                    early_departures += 1
-                                                    schedule = self.get_employee_schedule(employee_name)
-                                                    early_minutes = (
-                                                        datetime.combine(datetime.min, schedule['end_time']) -
-                                                        datetime.combine(datetime.min, exit_time)
-                                                    ).total_seconds() / 60
-                                                    total_early_minutes += early_minutes
-                                                    formatted_day = self.translate_day_abbreviation(day_str)
-                                                    print(f"Salida temprana en {formatted_day}: {early_minutes:.0f} minutos")
-
-                                            except Exception as e:
-                                                print(f"Error procesando hora de salida en fila {row+1}: {str(e)}")
-                                                continue
-
-                                    except Exception as e:
-                                        print(f"Error en fila {row+1}: {str(e)}")
-                                        continue
+                            if self.is_early_departure(employee_name, exit_time):
+                                early_departures += 1
+                                early_minutes = (
+                                    datetime.combine(datetime.min, schedule['end_time']) -
+                                    datetime.combine(datetime.min, exit_time)
+                                ).total_seconds() / 60
+                                total_early_minutes += early_minutes
+                                if trace:
+                                    logger.log(TRACE, "Salida temprana en %s: %.0f minutos", self.translate_day_abbreviation(day_str), early_minutes)
 
                         except Exception as e:
-                            print(f"Error procesando posición {position['name_col']}: {str(e)}")
+                            self._add_diagnostic('count_early_departures', "Error procesando hora de salida", record.sheet, record.row + 1, e)
                             continue
 
                 except Exception as e:
-                    print(f"Error procesando hoja {sheet}: {str(e)}")
+                    self._add_diagnostic('count_early_departures', "Error", record.sheet, record.row + 1, e)
                     continue
 
-            print(f"Total días con salida temprana: {early_departures}")
-            print(f"Total minutos de salida temprana: {total_early_minutes:.0f}")
+            logger.debug("Total días con salida temprana: %s", early_departures)
+            logger.debug("Total minutos de salida temprana: %.0f", total_early_minutes)
             return early_departures, total_early_minutes
 
         except Exception as e:
-            print(f"Error general: {str(e)}")
+            logger.error("Error general: %s", e)
             return 0, 0
 
     def get_column_index(self, column_letter):
@@ -340,46 +590,6 @@ class ExcelProcessor:
             result += (ord(letter.upper()) - ord('A') + 1) * (26 ** i)
         return result - 1
 
-    def calculate_ppp_weekly_hours(self, employee_name):
-        """Calculate weekly hours for PPP employees and similar schedules"""
-        try:
-            schedule = self.get_employee_schedule(employee_name)
-            
-            # Si el empleado tiene horas fijas configuradas
-            if schedule.get('fixed_hours') is not None:
-                return {
-                    'Semana 1': 0,
-                    'Semana 2': 0,
-                    'Semana 3': 0,
-                    'Semana 4': schedule['fixed_hours']  # Todas las horas en la última semana
-                }, [{
-                    'week': 'Semana 4',
-                    'day': '22 Jueves',  # El día que trabajó Sebastian
-                    'entry': '08:00',
-                    'exit': '11:47',
-                    'hours': '3h 47m'
-                }]
-            
-            weekly_hours = {
-                'Semana 1': 0,
-                'Semana 2': 0,
-                'Semana 3': 0,
-                'Semana 4': 0
-            }
-            weekly_details = []
-            
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
-            
-            # Resto del código existente para el cálculo de horas PPP...
-            # [...]
-
-            return weekly_hours, weekly_details
-            
-        except Exception as e:
-            print(f"Error calculating PPP weekly hours: {str(e)}")
-            return {'Semana 1': 0, 'Semana 2': 0, 'Semana 3': 0, 'Semana 4': 0}, []
-
     def calculate_worked_hours(self, employee_name, entry_time, exit_time):
         """Calcula las horas trabajadas considerando horarios especiales y horas extra"""
         if not entry_time or not exit_time:
@@ -419,10 +629,8 @@ class ExcelProcessor:
         """Returns a list of tuples with (start_date, end_date) for each week in the month"""
         try:
             if not hasattr(self, '_cached_weeks'):
-                exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-                first_sheet = pd.read_excel(self.excel_file, 
-                                         sheet_name=self.excel_file.sheet_names[exceptional_index],
-                                         header=None)
+                exceptional_index = self.sheet_names.index('Exceptional')
+                first_sheet = self._get_sheet_data(self.sheet_names[exceptional_index])
                 
                 dates = []
                 for row in range(11, 42):
@@ -462,1112 +670,524 @@ class ExcelProcessor:
             return self._cached_weeks
             
         except Exception as e:
-            print(f"Error getting weeks in month: {str(e)}")
+            logger.error("Error getting weeks in month: %s", e)
             return [(1, 7), (8, 14), (15, 21), (22, 31)]
 
+    @_profiled
     def get_weekly_stats(self, start_date, end_date):
-        """Calculate statistics for a specific week with optimized processing"""
-        # Cache key for weekly stats
-        cache_key = f"week_stats_{start_date}_{end_date}"
-        
-        if hasattr(self, cache_key):
-            return getattr(self, cache_key)
-            
-        try:
-            stats = {
-                'total_irregularities': 0,
-                'irregularities_breakdown': {
-                    'Llegadas tarde': 0,
-                    'Salidas tempranas': 0,
-                    'Ausencias': 0,
-                    'Exceso almuerzo': 0
-                },
-                'perfect_attendance': 0,
-                'perfect_employees': [],
-                'most_late_day': 'N/A',
-                'most_late_count': 0,
-                'late_details': '',
-                'most_early_day': 'N/A',
-                'most_early_count': 0,
-                'early_details': '',
-                'most_absent_day': 'N/A',
-                'most_absent_count': 0,
-                'absence_details': ''
-            }
+        """Calculate statistics for a specific week (see get_all_weekly_stats)"""
+        week = (start_date, end_date)
+        return self.get_all_weekly_stats([week])[week]
 
-            # Process each sheet for the given date range
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
+    @_profiled
+    def get_all_weekly_stats(self, weeks=None):
+        """Estadísticas de varias semanas en una sola pasada sobre el ledger.
 
-            daily_stats = {}  # To track statistics by day
-            employee_records = {}  # To track perfect attendance
-            daily_details = {}  # To track detailed information by day
-
-            for sheet in attendance_sheets:
+        weeks: lista de (día inicial, día final); por defecto get_weeks_in_month().
+        Devuelve {(inicio, fin): dict de get_weekly_stats}. Los resultados quedan
+        en una caché acotada a WEEK_CACHE_SIZE semanas.
+        """
+        if weeks is None:
+            weeks = self.get_weeks_in_month()
+        weeks = [tuple(week) for week in weeks]
+
+        results = {}
+        with self._lock:
+            for week in weeks:
+                if week in self._week_cache:
+                    self._week_cache.move_to_end(week)
+                    results[week] = self._week_cache[week]
+
+            pending = list(dict.fromkeys(week for week in weeks if week not in results))
+            if pending:
                 try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-                    
-                    positions = [
-                        {'name_col': 'J', 'entry_col': 'B', 'exit_col': 'I', 'day_col': 'A'},
-                        {'name_col': 'Y', 'entry_col': 'Q', 'exit_col': 'X', 'day_col': 'P'},
-                        {'name_col': 'AN', 'entry_col': 'AF', 'exit_col': 'AM', 'day_col': 'AE'}
-                    ]
-
-                    for position in positions:
-                        name_col = self.get_column_index(position['name_col'])
-                        entry_col = self.get_column_index(position['entry_col'])
-                        exit_col = self.get_column_index(position['exit_col'])
-                        day_col = self.get_column_index(position['day_col'])
-
-                        try:
-                            employee_name = str(df.iloc[2, name_col]).strip()
-                            # Skip invalid employee names
-                            if pd.isna(employee_name) or employee_name.lower() in ['nan', 'leave early (mm)', 'early leave (mm)', '']:
-                                continue
-
-                            if employee_name not in employee_records:
-                                employee_records[employee_name] = {'irregularities': 0}
-
-                            for row in range(11, 42):
-                                try:
-                                    day_value = df.iloc[row, day_col]
-                                    if pd.isna(day_value):
-                                        continue
-
-                                    day_str = str(day_value).strip()
-                                    if not any(char.isdigit() for char in day_str):
-                                        continue
-                                        
-                                    day_num = int(''.join(filter(str.isdigit, day_str)))
-
-                                    if start_date <= day_num <= end_date:
-                                        if day_num not in daily_stats:
-                                            daily_stats[day_num] = {'late': [], 'early': [], 'absent': []}
-                                            daily_details[day_num] = {'late': [], 'early': [], 'absent': []}
-
-                                        if 'absence' in day_str.lower():
-                                            daily_stats[day_num]['absent'].append(employee_name)
-                                            employee_records[employee_name]['irregularities'] += 1
-                                            stats['irregularities_breakdown']['Ausencias'] += 1
-                                            continue
-
-                                        entry_time = df.iloc[row, entry_col]
-                                        exit_time = df.iloc[row, exit_col]
-
-                                        if pd.notna(entry_time):
-                                            if isinstance(entry_time, str):
-                                                entry_time = pd.to_datetime(entry_time).time()
-                                            elif isinstance(entry_time, pd.Timestamp):
-                                                entry_time = entry_time.time()
-
-                                            if self.is_late_arrival(employee_name, entry_time):
-                                                daily_stats[day_num]['late'].append(employee_name)
-                                                daily_details[day_num]['late'].append(f"{employee_name} (llegó a las {entry_time.strftime('%H:%M')})")
-                                                employee_records[employee_name]['irregularities'] += 1
-                                                stats['irregularities_breakdown']['Llegadas tarde'] += 1
-
-                                        if pd.notna(exit_time):
-                                            if isinstance(exit_time, str):
-                                                exit_time = pd.to_datetime(exit_time).time()
-                                            elif isinstance(exit_time, pd.Timestamp):
-                                                exit_time = exit_time.time()
-
-                                            if self.is_early_departure(employee_name, exit_time):
-                                                daily_stats[day_num]['early'].append(employee_name)
-                                                daily_details[day_num]['early'].append(f"{employee_name} (salió a las {exit_time.strftime('%H:%M')})")
-                                                employee_records[employee_name]['irregularities'] += 1
-                                                stats['irregularities_breakdown']['Salidas tempranas'] += 1
-
-                                except Exception as e:
-                                    print(f"Error processing row {row+1}: {str(e)}")
-                                    continue
-
-                        except Exception as e:
-                            print(f"Error processing position {position['name_col']}: {str(e)}")
-                            continue
-
+                    computed = self._compute_weekly_stats(pending)
                 except Exception as e:
-                    print(f"Error processing sheet {sheet}: {str(e)}")
-                    continue
+                    logger.error("Error getting weekly stats: %s", e)
+                    computed = {week: self._empty_weekly_stats('Sin datos', breakdown={}) for week in pending}
+                for week, stats in computed.items():
+                    self._week_cache[week] = stats
+                    if len(self._week_cache) > self.WEEK_CACHE_SIZE:
+                        self._week_cache.popitem(last=False)
+                results.update(computed)
+
+        return {week: results[week] for week in weeks}
+
+    def _empty_weekly_stats(self, details='', breakdown=None):
+        if breakdown is None:
+            breakdown = {'Llegadas tarde': 0, 'Salidas tempranas': 0, 'Ausencias': 0, 'Exceso almuerzo': 0}
+        return {
+            'total_irregularities': 0,
+            'irregularities_breakdown': breakdown,
+            'perfect_attendance': 0,
+            'perfect_employees': [],
+            'most_late_day': 'N/A',
+            'most_late_count': 0,
+            'late_details': details,
+            'most_early_day': 'N/A',
+            'most_early_count': 0,
+            'early_details': details,
+            'most_absent_day': 'N/A',
+            'most_absent_count': 0,
+            'absence_details': details
+        }
 
-            # Calculate final statistics
-            stats['total_irregularities'] = sum(stats['irregularities_breakdown'].values())
-            
-            # Filter valid employees (no invalid names)
-            valid_employees = [name for name, record in employee_records.items() 
-                             if record['irregularities'] == 0 and 
-                             name.lower() not in ['nan', 'leave early (mm)', 'early leave (mm)', '']]
-            
-            stats['perfect_attendance'] = len(valid_employees)
-            stats['perfect_employees'] = valid_employees
-
-            # Find days with most issues and include detailed information
-            if daily_stats:
-                # Most late arrivals
-                most_late_day = max(daily_stats.items(), key=lambda x: len(x[1]['late']))
-                stats['most_late_day'] = f"Día {most_late_day[0]}"
-                stats['most_late_count'] = len(most_late_day[1]['late'])
-                stats['late_details'] = "\n".join(daily_details[most_late_day[0]]['late'])
-
-                # Most early departures
-                most_early_day = max(daily_stats.items(), key=lambda x: len(x[1]['early']))
-                stats['most_early_day'] = f"Día {most_early_day[0]}"
-                stats['most_early_count'] = len(most_early_day[1]['early'])
-                stats['early_details'] = "\n".join(daily_details[most_early_day[0]]['early'])
-
-                # Most absences
-                most_absent_day = max(daily_stats.items(), key=lambda x: len(x[1]['absent']))
-                stats['most_absent_day'] = f"Día {most_absent_day[0]}"
-                stats['most_absent_count'] = len(most_absent_day[1]['absent'])
-                stats['absence_details'] = ", ".join(most_absent_day[1]['absent'])
-
-            # Cache the results before returning
-            setattr(self, cache_key, stats)
-            return stats
+    def _compute_weekly_stats(self, weeks):
+        """Calcula get_weekly_stats para semanas sin superposición con un solo groupby.
 
-        except Exception as e:
-            print(f"Error getting weekly stats: {str(e)}")
-            default_stats = {
-                'total_irregularities': 0,
-                'irregularities_breakdown': {},
-                'perfect_attendance': 0,
-                'perfect_employees': [],
-                'most_late_day': 'N/A',
-                'most_late_count': 0,
-                'late_details': 'Sin datos',
-                'most_early_day': 'N/A',
-                'most_early_count': 0,
-                'early_details': 'Sin datos',
-                'most_absent_day': 'N/A',
-                'most_absent_count': 0,
-                'absence_details': 'Sin datos'
-            }
-            setattr(self, cache_key, default_stats)
-            return default_stats
+        Cada fila del ledger se asigna a su semana por número de día; las llegadas
+        tarde, salidas tempranas y ausencias se agrupan por (semana, tipo, día).
+        """
+        weeks = sorted(weeks)
+        starts = np.array([start for start, _ in weeks])
+        ends = np.array([end for _, end in weeks])
+        if np.any(starts[1:] <= ends[:-1]):
+            # Semanas superpuestas: una fila puede pertenecer a varias, se calculan por separado
+            return {week: self._compute_weekly_stats([week])[week] for week in weeks}
+
+        ledger = self._ledger
+        missing = self.MISSING_MINUTES
+        employees = ledger['employee'].astype(str)
+        valid = ~employees.str.lower().isin(['nan', 'leave early (mm)', 'early leave (mm)', '']).to_numpy()
+
+        # Número de día ('02 Mo' -> 2) y semana de cada fila
+        day_str = ledger['day'].astype(str).str.strip()
+        digits = day_str.str.replace(r'\D', '', regex=True)
+        day_num = pd.to_numeric(digits.where(digits != ''), errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+        week_index = np.searchsorted(starts, day_num, side='right') - 1
+        in_week = (day_num >= 0) & (week_index >= 0) & (day_num <= ends[np.clip(week_index, 0, None)])
+        considered = valid & in_week
+
+        # Irregularidades: la ausencia se marca en el día y excluye las demás
+        absent_day = day_str.str.lower().str.contains('absence').to_numpy()
+        timed = considered & ~absent_day
+        start_min, end_min = self._schedule_minutes(ledger)
+        entry = ledger['entry_min'].to_numpy(dtype=np.int32)
+        exit_ = ledger['exit_min'].to_numpy(dtype=np.int32)
+        entry_invalid = ledger['entry'].notna().to_numpy() & (entry == missing)
+        for i in np.flatnonzero(timed & entry_invalid):
+            self._add_diagnostic('get_weekly_stats', "Hora de entrada inválida", ledger['sheet'].iat[i], ledger['row'].iat[i] + 1)
+
+        late = timed & (entry != missing) & (entry > start_min)
+        early = timed & ~entry_invalid & (exit_ != missing) & (exit_ < end_min)
+        absent = considered & absent_day
+
+        def clock(minutes):
+            return [f"{m // 60:02d}:{m % 60:02d}" for m in minutes]
+
+        names = employees.to_numpy()
+        events = pd.concat([
+            pd.DataFrame({'week': week_index[late], 'kind': 'late', 'day': day_num[late], 'employee': names[late],
+                          'detail': [f"{name} (llegó a las {t})" for name, t in zip(names[late], clock(entry[late]))]}),
+            pd.DataFrame({'week': week_index[early], 'kind': 'early', 'day': day_num[early], 'employee': names[early],
+                          'detail': [f"{name} (salió a las {t})" for name, t in zip(names[early], clock(exit_[early]))]}),
+            pd.DataFrame({'week': week_index[absent], 'kind': 'absent', 'day': day_num[absent], 'employee': names[absent],
+                          'detail': names[absent]})
+        ], ignore_index=True)
+
+        # Días de cada semana en orden de aparición (desempata el día con más casos) y empleados válidos
+        week_days = pd.Series(day_num[considered]).groupby(week_index[considered], sort=False).unique()
+        valid_employees = list(pd.unique(names[valid]))
+        grouped = {week: group for week, group in events.groupby('week', sort=False)}
+
+        breakdown_labels = {'late': 'Llegadas tarde', 'early': 'Salidas tempranas', 'absent': 'Ausencias'}
+        worst_day_keys = {'late': ('most_late_day', 'most_late_count', 'late_details', "\n"),
+                          'early': ('most_early_day', 'most_early_count', 'early_details', "\n"),
+                          'absent': ('most_absent_day', 'most_absent_count', 'absence_details', ", ")}
+
+        results = {}
+        for index, week in enumerate(weeks):
+            stats = self._empty_weekly_stats()
+            week_events = grouped.get(index, events.iloc[:0])
+            kinds = {kind: group for kind, group in week_events.groupby('kind', sort=False)}
+            for kind, label in breakdown_labels.items():
+                stats['irregularities_breakdown'][label] = len(kinds.get(kind, ()))
+            stats['total_irregularities'] = sum(stats['irregularities_breakdown'].values())
 
+            irregular = set(week_events['employee'])
+            stats['perfect_employees'] = [name for name in valid_employees if name not in irregular]
+            stats['perfect_attendance'] = len(stats['perfect_employees'])
+
+            days = week_days.get(index)
+            if days is not None and len(days):
+                for kind, (day_key, count_key, details_key, separator) in worst_day_keys.items():
+                    group = kinds.get(kind)
+                    counts = group['day'].value_counts() if group is not None else pd.Series(dtype=int)
+                    counts = counts.reindex(days, fill_value=0)
+                    worst = counts.index[int(np.argmax(counts.to_numpy()))]
+                    stats[day_key] = f"Día {worst}"
+                    stats[count_key] = int(counts[worst])
+                    details = group.loc[group['day'] == worst, 'detail'] if group is not None else []
+                    stats[details_key] = separator.join(details)
+            results[week] = stats
+        return results
+
+    @_profiled
     def get_employee_hours(self, employee_name):
-        """Obtiene las horas trabajadas y extra para un empleado"""
+        """Obtiene las horas trabajadas y extra para un empleado (de las columnas *_min del ledger)"""
         total_regular_hours = 0
         total_overtime_hours = 0
         hours_details = []
-        
-        try:
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
-            
-            for sheet in attendance_sheets:
-                df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-                
-                positions = [
-                    {'name_col': 'J', 'entry_col': 'B', 'exit_col': 'I', 'day_col': 'A'},
-                    {'name_col': 'Y', 'entry_col': 'Q', 'exit_col': 'X', 'day_col': 'P'},
-                    {'name_col': 'AN', 'entry_col': 'AF', 'exit_col': 'AM', 'day_col': 'AE'}
-                ]
-                
-                for position in positions:
-                    try:
-                        name_col = self.get_column_index(position['name_col'])
-                        name_cell = df.iloc[2, name_col]
-                        
-                        if pd.isna(name_cell) or str(name_cell).strip() != employee_name:
-                            continue
-                            
-                        entry_col = self.get_column_index(position['entry_col'])
-                        exit_col = self.get_column_index(position['exit_col'])
-                        day_col = self.get_column_index(position['day_col'])
-                        
-                        for row in range(11, 42):
-                            try:
-                                day_value = df.iloc[row, day_col]
-                                if pd.isna(day_value):
-                                    continue
-                                    
-                                day_str = str(day_value).strip()
-                                if 'absence' in day_str.lower() or any(abbr in day_str.lower() for abbr in ['sa', 'su']):
-                                    continue
-                                    
-                                entry_time = df.iloc[row, entry_col]
-                                exit_time = df.iloc[row, exit_col]
-                                
-                                if not pd.isna(entry_time) and not pd.isna(exit_time):
-                                    # Convertir a time() si son strings o datetime
-                                    if isinstance(entry_time, str):
-                                        entry_time = pd.to_datetime(entry_time).time()
-                                    elif isinstance(entry_time, datetime):
-                                        entry_time = entry_time.time()
-                                        
-                                    if isinstance(exit_time, str):
-                                        exit_time = pd.to_datetime(exit_time).time()
-                                    elif isinstance(exit_time, datetime):
-                                        exit_time = exit_time.time()
-                                    
-                                    # No mostrar salidas para empleados especiales
-                                    schedule = self.get_employee_schedule(employee_name)
-                                    if schedule.get('hide_exit'):
-                                        continue
-                                    
-                                    regular_hours, overtime_hours = self.calculate_worked_hours(
-                                        employee_name, entry_time, exit_time)
-                                        
-                                    total_regular_hours += regular_hours
-                                    total_overtime_hours += overtime_hours
-                                    
-                                    hours_details.append({
-                                        'day': self.translate_day_abbreviation(day_str),
-                                        'entry': entry_time.strftime('%H:%M'),
-                                        'exit': exit_time.strftime('%H:%M'),
-                                        'regular_hours': f"{regular_hours:.2f}",
-                                        'overtime_hours': f"{overtime_hours:.2f}" if overtime_hours > 0 else None
-                                    })
-                                    
-                            except Exception as e:
-                                print(f"Error processing row {row+1}: {str(e)}")
-                                continue
-                                
-                    except Exception as e:
-                        print(f"Error processing position {position['name_col']}: {str(e)}")
-                        continue
-                        
-        except Exception as e:
-            print(f"Error calculating hours: {str(e)}")
-            
-        return total_regular_hours, total_overtime_hours, hours_details
 
+        schedule = self.get_employee_schedule(employee_name)
+        # No mostrar salidas para empleados especiales
+        if schedule.get('hide_exit'):
+            return total_regular_hours, total_overtime_hours, hours_details
+
+        rows = self._employee_rows(employee_name)
+        missing = self.MISSING_MINUTES
+        entry, exit_ = rows['entry_min'], rows['exit_min']
+        not_absence_day = np.array(['absence' not in day for day in rows['day_lower']], dtype=bool)
+        worked = rows['weekday'] & not_absence_day & (entry != missing) & (exit_ != missing)
+        for i in np.flatnonzero(worked):
+            # Con horas extra habilitadas, lo que pasa del fin de horario es extra
+            if schedule['overtime_enabled'] and exit_[i] > schedule['end_min']:
+                regular_hours = max(0, schedule['end_min'] - entry[i]) / 60
+                overtime_hours = (exit_[i] - schedule['end_min']) / 60
+            else:
+                regular_hours, overtime_hours = max(0, exit_[i] - entry[i]) / 60, 0
+
+            total_regular_hours += regular_hours
+            total_overtime_hours += overtime_hours
+            hours_details.append({
+                'day': rows['labels'][i],
+                'entry': f"{entry[i] // 60:02d}:{entry[i] % 60:02d}",
+                'exit': f"{exit_[i] // 60:02d}:{exit_[i] % 60:02d}",
+                'regular_hours': f"{regular_hours:.2f}",
+                'overtime_hours': f"{overtime_hours:.2f}" if overtime_hours > 0 else None
+            })
 
+        return total_regular_hours, total_overtime_hours, hours_details
 
+    @_profiled
     def count_lunch_overtime_days(self, employee_name):
         """Returns a list of days and total minutes when the employee exceeded lunch time"""
         try:
+            trace = logger.isEnabledFor(TRACE)
             lunch_overtime_days = []
             total_lunch_minutes = 0
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index+1:]  # Start after Exceptional
 
             # Check if employee should have lunch time checked
             if not self.should_check_lunch(employee_name):
-                print(f"{employee_name} no tiene horario de almuerzo")
+                logger.debug("%s no tiene horario de almuerzo", employee_name)
                 return [], 0
 
-            # Define the three possible positions
-            positions = [
-                {
-                    'name_col': 'J',
-                    'day_col': 'A',
-                    'lunch_out': 'D',
-                    'lunch_return': 'G'
-                },
-                {
-                    'name_col': 'Y',
-                    'day_col': 'P',
-                    'lunch_out': 'S',
-                    'lunch_return': 'V'
-                },
-                {
-                    'name_col': 'AN',
-                    'day_col': 'AE',
-                    'lunch_out': 'AH',
-                    'lunch_return': 'AK'
-                }
-            ]
-
-            for sheet in attendance_sheets:
+            for record in self._get_employee_ledger(employee_name).itertuples(index=False):
                 try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
+                    # Skip weekends
+                    day_str = str(record.day).strip()
+                    if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
+                        continue
 
-                    # Check each possible position
-                    for position in positions:
+                    # Only process if both lunch times exist
+                    if not pd.isna(record.lunch_out) and not pd.isna(record.lunch_return):
                         try:
-                            # Check if employee name matches in the correct position (row 3)
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
+                            lunch_out_time = pd.to_datetime(record.lunch_out).time()
+                            lunch_return_time = pd.to_datetime(record.lunch_return).time()
 
-                            if pd.isna(name_cell) or str(name_cell).strip() != employee_name:
-                                continue
+                            lunch_minutes = (
+                                datetime.combine(datetime.min, lunch_return_time) -
+                                datetime.combine(datetime.min, lunch_out_time)
+                            ).total_seconds() / 60
+
+                            if lunch_minutes > self.LUNCH_TIME_LIMIT:
+                                # Calculate excess minutes
+                                excess_minutes = lunch_minutes - self.LUNCH_TIME_LIMIT
+                                total_lunch_minutes += excess_minutes
 
-                            # If name matches, check for lunch overtime
-                            day_col = self.get_column_index(position['day_col'])
-                            lunch_out_col = self.get_column_index(position['lunch_out'])
-                            lunch_return_col = self.get_column_index(position['lunch_return'])
-
-                            for row in range(11, 42):  # Check rows 12-42
-                                try:
-                                    day_value = df.iloc[row, day_col]
-                                    lunch_out = df.iloc[row, lunch_out_col]
-                                    lunch_return = df.iloc[row, lunch_return_col]
-
-                                    if not pd.isna(day_value):
-                                        # Skip weekends
-                                        day_str = str(day_value).strip()
-                                        if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
-                                            continue
-
-                                        # Only process if both lunch times exist
-                                        if not pd.isna(lunch_out) and not pd.isna(lunch_return):
-                                            try:
-                                                lunch_out_time = pd.to_datetime(lunch_out).time()
-                                                lunch_return_time = pd.to_datetime(lunch_return).time()
-
-                                                lunch_minutes = (
-                                                    datetime.combine(datetime.min, lunch_return_time) -
-                                                    datetime.combine(datetime.min, lunch_out_time)
-                                                ).total_seconds() / 60
-
-                                                if lunch_minutes > self.LUNCH_TIME_LIMIT:
-                                                    # Calculate excess minutes
-                                                    excess_minutes = lunch_minutes - self.LUNCH_TIME_LIMIT
-                                                    total_lunch_minutes += excess_minutes
-
-                                                    # Translate the day to Spanish format
-                                                    formatted_day = self.translate_day_abbreviation(day_str)
-                                                    print(f"Exceso de almuerzo en hoja {sheet}, fila {row+1}, día: {formatted_day} ({excess_minutes:.0f} minutos extra)")
-                                                    lunch_overtime_days.append(formatted_day)
-
-                                            except Exception as e:
-                                                print(f"Error processing lunch times in row {row+1}: {str(e)}")
-                                                continue
-
-                                except Exception as e:
-                                    print(f"Error processing row {row+1}: {str(e)}")
-                                    continue
+                                # Translate the day to Spanish format
+                                formatted_day = self.translate_day_abbreviation(day_str)
+                                if trace:
+                                    logger.log(TRACE, "Exceso de almuerzo en hoja %s, fila %s, día: %s (%.0f minutos extra)", record.sheet, record.row+1, formatted_day, excess_minutes)
+                                lunch_overtime_days.append(formatted_day)
 
                         except Exception as e:
-                            print(f"Error checking position {position['name_col']}: {str(e)}")
+                            self._add_diagnostic('count_lunch_overtime_days', "Error processing lunch times", record.sheet, record.row + 1, e)
                             continue
 
                 except Exception as e:
-                    print(f"Error processing sheet {sheet}: {str(e)}")
+                    self._add_diagnostic('count_lunch_overtime_days', "Error processing", record.sheet, record.row + 1, e)
                     continue
 
-            print(f"Total días con exceso de almuerzo: {len(lunch_overtime_days)}")
-            print(f"Total minutos excedidos: {total_lunch_minutes:.0f}")
+            logger.debug("Total días con exceso de almuerzo: %s", len(lunch_overtime_days))
+            logger.debug("Total minutos excedidos: %.0f", total_lunch_minutes)
             return lunch_overtime_days, total_lunch_minutes
 
         except Exception as e:
-            print(f"Error getting lunch overtime days: {str(e)}")
+            logger.error("Error getting lunch overtime days: %s", e)
             return [], 0
 
+    @_profiled
     def count_late_days(self, employee_name):
         """Cuenta los días que el empleado llegó tarde según su horario asignado"""
         try:
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
+            trace = logger.isEnabledFor(TRACE)
             late_days = []
             total_late_minutes = 0
 
             schedule = self.get_employee_schedule(employee_name)
             work_start_time = schedule['start_time']
 
-            for sheet in attendance_sheets:
+            for record in self._get_employee_ledger(employee_name).itertuples(index=False):
                 try:
-                    print(f"\nProcesando hoja: {sheet}")
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
+                    day_str = str(record.day).strip().lower()
+                    if day_str == '' or day_str == 'nan' or day_str == 'absence':
+                        continue
 
-                    positions = [
-                        {'name_col': 'J', 'entry_col': 'B', 'day_col': 'A'},
-                        {'name_col': 'Y', 'entry_col': 'Q', 'day_col': 'P'},
-                        {'name_col': 'AN', 'entry_col': 'AF', 'day_col': 'AE'}
-                    ]
+                    entry_time = record.entry
+                    if trace:
+                        logger.log(TRACE, "Fila %s: Entrada=%s", record.row+1, entry_time)
 
-                    try:
-                        for position in positions:
-                            try:
-                                name_col_index = self.get_column_index(position['name_col'])
-                                name_cell = df.iloc[2, name_col_index]
-
-                                if pd.isna(name_cell):
-                                    continue
-
-                                employee_cell = str(name_cell).strip()
-                                if employee_cell == employee_name:
-                                    print(f"Empleado encontrado en hoja {sheet}, columna {position['name_col']}")
-
-                                    entry_col = self.get_column_index(position['entry_col'])
-                                    day_col = self.get_column_index(position['day_col'])
-
-                                    for row in range(11, 42):
-                                        try:
-                                            day_value = df.iloc[row, day_col]
-                                            if pd.isna(day_value):
-                                                continue
-
-                                            day_str = str(day_value).strip().lower()
-                                            if day_str == '' or day_str == 'nan' or day_str == 'absence':
-                                                continue
-
-                                            entry_time = df.iloc[row, entry_col]
-                                            print(f"Fila {row+1}: Entrada={entry_time}")
-
-                                            if not pd.isna(entry_time):
-                                                try:
-                                                    if isinstance(entry_time, str):
-                                                        entry_time = pd.to_datetime(entry_time).time()
-                                                    elif isinstance(entry_time, datetime):
-                                                        entry_time = entry_time.time()
-                                                    else:
-                                                        print(f"Formato de hora no reconocido en fila {row+1}")
-                                                        continue
-
-                                                    if self.is_late_arrival(employee_name, entry_time):
-                                                        late_minutes = (
-                                                            datetime.combine(datetime.min, entry_time) -
-                                                            datetime.combine(datetime.min, work_start_time)
-                                                        ).total_seconds() / 60
-                                                        total_late_minutes += late_minutes
-
-                                                        formatted_day = self.translate_day_abbreviation(day_str)
-                                                        late_days.append(formatted_day)
-                                                        print(f"Llegada tarde en fila {row+1}: {late_minutes:.0f} minutos (hora: {entry_time}), Dia: {formatted_day}")
-
-                                                except Exception as e:
-                                                    print(f"Error procesando hora de entrada en fila {row+1}: {str(e)}")
-                                                    continue
-                                            else:
-                                                print(f"Sin registro de entrada en fila {row+1}")
-
-                                        except Exception as e:
-                                            print(f"Error en fila {row+1}: {str(e)}")
-                                            continue
-
-                            except Exception as e:
-                                print(f"Error procesando posición {position['name_col']}: {str(e)}")
+                    if not pd.isna(entry_time):
+                        try:
+                            if isinstance(entry_time, str):
+                                entry_time = pd.to_datetime(entry_time).time()
+                            elif isinstance(entry_time, datetime):
+                                entry_time = entry_time.time()
+                            else:
+                                self._add_diagnostic('count_late_days', "Formato de hora no reconocido", record.sheet, record.row + 1)
                                 continue
 
-                    except Exception as e:
-                        print(f"Error en el bucle de posiciones: {str(e)}")
-                        continue
+                            if self.is_late_arrival(employee_name, entry_time):
+                                late_minutes = (
+                                    datetime.combine(datetime.min, entry_time) -
+                                    datetime.combine(datetime.min, work_start_time)
+                                ).total_seconds() / 60
+                                total_late_minutes += late_minutes
+
+                                formatted_day = self.translate_day_abbreviation(day_str)
+                                late_days.append(formatted_day)
+                                if trace:
+                                    logger.log(TRACE, "Llegada tarde en fila %s: %.0f minutos (hora: %s), Dia: %s", record.row+1, late_minutes, entry_time, formatted_day)
+
+                        except Exception as e:
+                            self._add_diagnostic('count_late_days', "Error procesando hora de entrada", record.sheet, record.row + 1, e)
+                            continue
+                    else:
+                        if trace:
+                            logger.log(TRACE, "Sin registro de entrada en fila %s", record.row+1)
 
                 except Exception as e:
-                    print(f"Error procesando hoja {sheet}: {str(e)}")
+                    self._add_diagnostic('count_late_days', "Error", record.sheet, record.row + 1, e)
                     continue
 
-            print(f"Total días de llegada tarde: {len(late_days)}")
-            print(f"Total minutos de tardanza: {total_late_minutes:.0f}")
+            logger.debug("Total días de llegada tarde: %s", len(late_days))
+            logger.debug("Total minutos de tardanza: %.0f", total_late_minutes)
             return late_days, total_late_minutes
 
         except Exception as e:
-            print(f"Error general: {str(e)}")
+            logger.error("Error general: %s", e)
             return [], 0
 
+    @_profiled
     def count_missing_records(self, employee_name):
         """Cuenta los días sin registros de entrada, salida y almuerzo"""
         try:
+            trace = logger.isEnabledFor(TRACE)
             missing_entry_days = []
             missing_exit_days = []
             missing_lunch_days = []
 
-            # Procesamiento especial para Soledad
-            if employee_name.lower() == 'soledad silv':
-                try:
-                    schedule = self.SPECIAL_SCHEDULES['soledad silv']
-                    df = pd.read_excel(self.excel_file, sheet_name=schedule['sheet_name'], header=None)
+            # Empleados con scope (p.ej. Soledad) solo se revisan en su hoja y bloque propios
+            schedule = self.get_employee_schedule(employee_name)
+            scope = schedule['scope']
+            if scope:
+                records = self._get_employee_ledger(employee_name, sheet=scope['sheet'], block=scope['block'])
+
+                if not records.empty:
+                    entry_field = scope['entry_field']
+                    exit_field = scope['exit_field']
 
                     # Verificar registros de entrada y salida
-                    for row in range(11, 42):  # Filas 12-42
+                    for record in records.itertuples(index=False):
                         try:
-                            pos = schedule['position']
-                            day_value = df.iloc[row, self.get_column_index(pos['day_col'])]
-                            if pd.isna(day_value):
-                                continue
-
                             # Extraer el día y nombre del día
-                            day_str = str(day_value).strip()
-                            # Get special schedule configuration
-                            schedule = self.SPECIAL_SCHEDULES[employee_name.lower()]
-                            if 'position' in schedule:
-                                pos = schedule['position']
-                            else:
-                                continue
+                            day_str = str(record.day).strip()
 
                             # Skip weekends
                             if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
                                 continue
 
                             # Verificar entrada
-                            entry_value = df.iloc[row, self.get_column_index(pos['entry_col'])]
+                            entry_value = getattr(record, entry_field)
                             if pd.isna(entry_value) or str(entry_value).strip() == '':
                                 missing_entry_days.append(self.translate_day_abbreviation(day_str))
-                                print(f"Falta registro de entrada en fila {row+1} ({schedule['sheet_name']})")
+                                if trace:
+                                    logger.log(TRACE, "Falta registro de entrada en fila %s (%s)", record.row+1, scope['sheet'])
 
                             # Verificar salida
-                            exit_value = df.iloc[row, self.get_column_index(pos['exit_col'])]
+                            exit_value = getattr(record, exit_field)
                             if pd.isna(exit_value) or str(exit_value).strip() == '':
                                 missing_exit_days.append(self.translate_day_abbreviation(day_str))
-                                print(f"Falta registro de salida en fila {row+1} ({schedule['sheet_name']})")
+                                if trace:
+                                    logger.log(TRACE, "Falta registro de salida en fila %s (%s)", record.row+1, scope['sheet'])
 
                         except Exception as e:
-                            print(f"Error en fila {row+1}: {str(e)}")
+                            self._add_diagnostic('count_missing_records', "Error", record.sheet, record.row + 1, e)
                             continue
 
                     # Verificar ausencias y ajustar listas
-                    for row in range(11, 42):
-                        try:
-                            absence_value = df.iloc[row, self.get_column_index(pos['absence_col'])]
-                            if not pd.isna(absence_value) and str(absence_value).strip().lower() == 'absence':
-                                day_value = df.iloc[row, self.get_column_index(pos['day_col'])]
-                                formatted_day = self.translate_day_abbreviation(str(day_value).strip())
-                                if formatted_day in missing_entry_days:
-                                    missing_entry_days.remove(formatted_day)
-                                if formatted_day in missing_exit_days:
-                                    missing_exit_days.remove(formatted_day)
-                                print(f"Encontrado 'Absence' en fila {row+1}, ajustando contadores")
-                        except Exception as e:
-                            continue
-
-                    print(f"Total días sin registro - Entrada: {len(missing_entry_days)}, Salida: {len(missing_exit_days)}, Almuerzo: 0 (No aplica)")
+                    for record in records[records['absence']].itertuples(index=False):
+                        formatted_day = self.translate_day_abbreviation(str(record.day).strip())
+                        if formatted_day in missing_entry_days:
+                            missing_entry_days.remove(formatted_day)
+                        if formatted_day in missing_exit_days:
+                            missing_exit_days.remove(formatted_day)
+                        if trace:
+                            logger.log(TRACE, "Encontrado 'Absence' en fila %s, ajustando contadores", record.row+1)
+
+                    logger.debug("Total días sin registro - Entrada: %s, Salida: %s, Almuerzo: 0 (No aplica)", len(missing_entry_days), len(missing_exit_days))
                     return missing_entry_days, missing_exit_days, []
 
-                except Exception as e:
-                    print(f"Error procesando hoja {schedule['sheet_name']}: {str(e)}")
+                logger.debug("Hoja %s sin registros, usando procesamiento normal", scope['sheet'])
 
             # Procesamiento normal para otros empleados
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
-
-            positions = [
-                {
-                    'name_col': 'J',
-                    'entry_col': 'B',
-                    'exit_col': 'I',
-                    'day_col': 'A',
-                    'absence_col': 'G',
-                    'lunch_out': 'D',
-                    'lunch_return': 'G'
-                },
-                {
-                    'name_col': 'Y',
-                    'entry_col': 'Q',
-                    'exit_col': 'X',
-                    'day_col': 'P',
-                    'absence_col': 'V',
-                    'lunch_out': 'S',
-                    'lunch_return': 'V'
-                },
-                {
-                    'name_col': 'AN',
-                    'entry_col': 'AF',
-                    'exit_col': 'AM',
-                    'day_col': 'AE',
-                    'absence_col': 'AK',
-                    'lunch_out': 'AH',
-                    'lunch_return': 'AK'
-                }
-            ]
+            check_exit = schedule['check_missing_exit']
+            check_lunch = check_exit and not schedule['no_lunch']
 
-            for sheet in attendance_sheets:
-                try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
+            records = self._get_employee_ledger(employee_name)
+            for _, block_records in records.groupby(['sheet', 'block'], sort=False):
+                for record in block_records.itertuples(index=False):
+                    try:
+                        day_str = str(record.day).strip()
+                        # Skip weekends
+                        if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
+                            continue
 
-                    for position in positions:
-                        try:
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
+                        # Verificar entrada
+                        if pd.isna(record.entry) or str(record.entry).strip() == '':
+                            missing_entry_days.append(self.translate_day_abbreviation(day_str))
 
-                            if pd.isna(name_cell):
-                                continue
+                        # Verificar salida solo si no es empleado especial
+                        if check_exit:
+                            if pd.isna(record.exit) or str(record.exit).strip() == '':
+                                missing_exit_days.append(self.translate_day_abbreviation(day_str))
+
+                        # Verificar almuerzo
+                        if check_lunch and not pd.isna(record.exit) and str(record.exit).strip() != '':
+                            if (not pd.isna(record.lunch_out) and pd.isna(record.lunch_return)) or \
+                               (pd.isna(record.lunch_out) and pd.isna(record.lunch_return)):
+                                missing_lunch_days.append(self.translate_day_abbreviation(day_str))
+
+                    except Exception as e:
+                        self._add_diagnostic('count_missing_records', "Error", record.sheet, record.row + 1, e)
+                        continue
+
+                # Verificar ausencias y ajustar listas
+                for record in block_records[block_records['absence']].itertuples(index=False):
+                    formatted_day = self.translate_day_abbreviation(str(record.day).strip())
+                    if formatted_day in missing_entry_days:
+                        missing_entry_days.remove(formatted_day)
+                    if formatted_day in missing_exit_days:
+                        missing_exit_days.remove(formatted_day)
+                    if formatted_day in missing_lunch_days:
+                        missing_lunch_days.remove(formatted_day)
+
+            logger.debug("Total días sin registro - Entrada: %s, Salida: %s, Almuerzo: %s", len(missing_entry_days), len(missing_exit_days), len(missing_lunch_days))
+            return missing_entry_days, missing_exit_days, missing_lunch_days
+
+        except Exception as e:
+            logger.error("Error general: %s", e)
+            return [], [], []
+
+    @_profiled
+    def count_mid_day_departures(self, employee_name):
+        """Cuenta los retiros durante el horario laboral"""
+        try:
+            # No contar retiros durante horario para PPP o empleados especiales
+            if not self.get_employee_schedule(employee_name)['mid_day_departures']:
+                return 0, "No aplica"
+
+            mid_day_departures = 0
+            departure_details = []
+
+            # La salida durante el horario se registra en G, V o AK
+            for record in self._get_employee_ledger(employee_name).itertuples(index=False):
+                try:
+                    day_str = str(record.day).strip()
+                    if 'absence' in day_str.lower():
+                        continue
 
-                            if str(name_cell).strip() == employee_name:
-                                for row in range(11, 42):  # Filas 12-42
-                                    try:
-                                        day_value = df.iloc[row, self.get_column_index(position['day_col'])]
-                                        if pd.isna(day_value):
-                                            continue
-
-                                        day_str = str(day_value).strip()
-                                        # Skip weekends
-                                        if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
-                                            continue
-
-                                        # Verificar entrada
-                                        entry_value = df.iloc[row, self.get_column_index(position['entry_col'])]
-                                        if pd.isna(entry_value) or str(entry_value).strip() == '':
-                                            missing_entry_days.append(self.translate_day_abbreviation(day_str))
-
-                                        # Verificar salida solo si no es empleado especial
-                                        if employee_name.lower() not in ['valentina al', 'agustin taba']:
-                                            exit_value = df.iloc[row, self.get_column_index(position['exit_col'])]
-                                            if pd.isna(exit_value) or str(exit_value).strip() == '':
-                                                missing_exit_days.append(self.translate_day_abbreviation(day_str))
-
-                                        # Verificar almuerzo
-                                        if self.should_check_lunch(employee_name):
-                                            lunch_out = df.iloc[row, self.get_column_index(position['lunch_out'])]
-                                            lunch_return = df.iloc[row, self.get_column_index(position['lunch_return'])]
-
-                                            if not pd.isna(exit_value) and str(exit_value).strip() != '':
-                                                if (not pd.isna(lunch_out) and pd.isna(lunch_return)) or \
-                                                   (pd.isna(lunch_out) and pd.isna(lunch_return)):
-                                                    missing_lunch_days.append(self.translate_day_abbreviation(day_str))
-
-                                    except Exception as e:
-                                        print(f"Error en fila {row+1}: {str(e)}")
-                                        continue
-
-                                # Verificar ausencias y ajustar listas
-                                for row in range(11, 42):
-                                    try:
-                                        absence_value = df.iloc[row, self.get_column_index(position['absence_col'])]
-                                        if not pd.isna(absence_value) and str(absence_value).strip().lower() == 'absence':
-                                            day_value = df.iloc[row, self.get_column_index(position['day_col'])]
-                                            formatted_day = self.translate_day_abbreviation(str(day_value).strip())
-                                            if formatted_day in missing_entry_days:
-                                                missing_entry_days.remove(formatted_day)
-                                            if formatted_day in missing_exit_days:
-                                                missing_exit_days.remove(formatted_day)
-                                            if formatted_day in missing_lunch_days:
-                                                missing_lunch_days.remove(formatted_day)
-                                    except Exception as e:
-                                        continue
+                    # Skip weekends
+                    if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
+                        continue
 
+                    exit_time = record.lunch_return
+                    if not pd.isna(exit_time):
+                        try:
+                            exit_time = pd.to_datetime(exit_time).time()
+                            formatted_day = self.translate_day_abbreviation(day_str)
+                            departure_details.append(f"{formatted_day} ({exit_time.strftime('%H:%M')})")
+                            mid_day_departures += 1
                         except Exception as e:
-                            print(f"Error procesando posición: {str(e)}")
+                            self._add_diagnostic('count_mid_day_departures', "Error procesando hora de salida", record.sheet, record.row + 1, e)
                             continue
 
                 except Exception as e:
-                    print(f"Error procesando hoja {sheet}: {str(e)}")
+                    self._add_diagnostic('count_mid_day_departures', "Error", record.sheet, record.row + 1, e)
                     continue
 
-            print(f"Total días sin registro - Entrada: {len(missing_entry_days)}, Salida: {len(missing_exit_days)}, Almuerzo: {len(missing_lunch_days)}")
-            return missing_entry_days, missing_exit_days, missing_lunch_days
+            # Format departure details
+            departure_text = self.format_list_in_columns(departure_details) if departure_details else "No hay registros"
+            
+            return mid_day_departures, departure_text
 
         except Exception as e:
-            print(f"Error general: {str(e)}")
-            return [], [], []
-
-    def format_list_in_columns(self, items, items_per_column=8):
-        """
-        Format a list of items into columns, with exactly 8 items per column.
-        Returns a string with the formatted text.
-        """
-        if not items:
-            return "No hay días registrados"
-
-        # Create columns of exactly 8 items
-        columns = []
-        current_column = []
-        
-        for item in sorted(items, key=lambda x: int(x.split()[0])):
-            if len(current_column) < items_per_column:
-                current_column.append(f"• {item}")
-            else:
-                # When column is full (8 items), start a new one
-                columns.append(current_column)
-                current_column = [f"• {item}"]
-        
-        # Add the last column if it has any items
-        if current_column:
-            columns.append(current_column)
-
-        # Format each column as a string, ensuring consistent width
-        formatted_columns = []
-        for column in columns:
-            # Pad column to 8 items if needed
-            while len(column) < items_per_column:
-                column.append("")  # Add empty strings for padding
-            formatted_columns.append("\n".join(column))
-
-        # Join columns with sufficient spacing (10 spaces)
-        return "          ".join(formatted_columns)
-
-    def translate_day_abbreviation(self, day_str):
-        """Translates day abbreviations to Spanish format"""
-        try:
-            # Get the day number and name parts
-            parts = day_str.split()
-            if len(parts) < 2:
-                return day_str
-
-            day_num = parts[0]
-            day_name = parts[1].lower()
-
-            # Map English abbreviations to Spanish
-            day_map = {
-                'mo': 'Lu',
-                'tu': 'Ma',
-                'we': 'Mi',
-                'th': 'Ju',
-                'fr': 'Vi',
-                'sa': 'Sa',
-                'su': 'Do'
-            }
-
-            for eng, esp in day_map.items():
-                if day_name.startswith(eng):
-                    return f"{day_num} {esp}"
-
-            return day_str
-
-        except Exception as e:
-            print(f"Error translating day: {str(e)}")
-            return day_str
-
-    def calculate_ppp_weekly_hours(self, employee_name):
-        """Calculate weekly hours for PPP employees"""
-        try:
-            weekly_hours = {
-                'Semana 1': 0,
-                'Semana 2': 0,
-                'Semana 3': 0,
-                'Semana 4': 0
-            }
-            weekly_details = []
-            
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
-            
-            # Positions in the Excel sheet with correct columns for PPP employees
-            positions = [
-                {'name_col': 'J', 'entry_col': 'B', 'exit_col': 'D', 'day_col': 'A'},  # Entry y salida B y D
-                {'name_col': 'Y', 'entry_col': 'Q', 'exit_col': 'S', 'day_col': 'P'},  # Entry y salida Q y S
-                {'name_col': 'AN', 'entry_col': 'AF', 'exit_col': 'AH', 'day_col': 'AE'}  # Entry y salida AF y AH
-            ]
-
-            for sheet in attendance_sheets:
-                try:
-                    print(f"\nProcesando hoja: {sheet}")
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-                    
-                    for position in positions:
-                        try:
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
-                            
-                            if pd.isna(name_cell):
-                                continue
-                                
-                            if str(name_cell).strip() == employee_name:
-                                print(f"Empleado encontrado en hoja {sheet}, columna {position['name_col']}")
-                                entry_col = self.get_column_index(position['entry_col'])
-                                exit_col = self.get_column_index(position['exit_col'])
-                                day_col = self.get_column_index(position['day_col'])
-                                
-                                for row in range(11, 42):  # Filas 12-42
-                                    try:
-                                        day_value = df.iloc[row, day_col]
-                                        if pd.isna(day_value):
-                                            continue
-                                            
-                                        day_str = str(day_value).strip()
-                                        if 'absence' in day_str.lower():
-                                            continue
-                                            
-                                        # Skip weekends
-                                        if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
-                                            continue
-                                            
-                                        entry_time = df.iloc[row, entry_col]
-                                        exit_time = df.iloc[row, exit_col]
-                                        
-                                        print(f"Fila {row+1}: Entrada={entry_time}, Salida={exit_time}")
-                                        
-                                        if not pd.isna(entry_time) and not pd.isna(exit_time):
-                                            try:
-                                                entry_time = pd.to_datetime(entry_time).time()
-                                                exit_time = pd.to_datetime(exit_time).time()
-                                                
-                                                # Obtener horas y minutos por separado
-                                                end_hour = exit_time.hour
-                                                end_minute = exit_time.minute
-                                                start_hour = entry_time.hour
-                                                start_minute = entry_time.minute
-                                                
-                                                # Realizar la resta de horas y minutos
-                                                diff_hours = end_hour - start_hour
-                                                diff_minutes = end_minute - start_minute
-                                                
-                                                # Ajustar si los minutos son negativos
-                                                if diff_minutes < 0:
-                                                    diff_minutes += 60
-                                                    diff_hours -= 1
-                                                
-                                                # Convertir minutos extras a horas si superan 60
-                                                if diff_minutes >= 60:
-                                                    extra_hours = diff_minutes // 60
-                                                    diff_hours += extra_hours
-                                                    diff_minutes = diff_minutes % 60
-                                                
-                                                # Calcular horas totales para esta entrada
-                                                total_hours = diff_hours + (diff_minutes / 60)
-                                                
-                                                # Add to appropriate week
-                                                day_num = int(day_str.split()[0])
-                                                week_key = ''
-                                                if 1 <= day_num <= 7:
-                                                    week_key = 'Semana 1'
-                                                elif 8 <= day_num <= 14:
-                                                    week_key = 'Semana 2'
-                                                elif 15 <= day_num <= 21:
-                                                    week_key = 'Semana 3'
-                                                elif day_num >= 22:
-                                                    week_key = 'Semana 4'
-                                                    
-                                                if week_key:
-                                                    weekly_hours[week_key] += total_hours
-                                                    week_details.append({
-                                                        'week': week_key,
-                                                        'day': self.translate_day_abbreviation(day_str),
-                                                        'entry': entry_time.strftime('%H:%M'),
-                                                        'exit': exit_time.strftime('%H:%M'),
-                                                        'hours': f"{diff_hours}h {diff_minutes}m"
-                                                    })
-                                                    print(f"Día {day_str}: {diff_hours}h {diff_minutes}m")
-                                                    
-                                            except Exception as e:
-                                                print(f"Error processing times in row {row+1}: {str(e)}")
-                                                continue
-                                                
-                                    except Exception as e:
-                                        print(f"Error in row {row+1}: {str(e)}")
-                                        continue
-                                        
-                        except Exception as e:
-                            print(f"Error checking position {position['name_col']}: {str(e)}")
-                            continue
-                            
-                except Exception as e:
-                    print(f"Error processing sheet {sheet}: {str(e)}")
-                    continue
-                    
-            # Round weekly hours
-            for week in weekly_hours:
-                weekly_hours[week] = round(weekly_hours[week], 2)
-                
-            return weekly_hours, weekly_details
-            
-        except Exception as e:
-            print(f"Error calculating PPP weekly hours: {str(e)}")
-            return {'Semana 1': 0, 'Semana 2': 0, 'Semana 3': 0, 'Semana 4': 0}, []
-
-    def count_mid_day_departures(self, employee_name):
-        """Cuenta los retiros durante el horario laboral"""
-        try:
-            # No contar retiros durante horario para PPP o empleados especiales
-            if 'ppp' in employee_name.lower() or employee_name.lower() == 'agustin taba':
-                return 0, "No aplica"
-
-            mid_day_departures = 0
-            departure_details = []
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
-
-            for sheet in attendance_sheets:
-                try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-
-                    positions = [
-                        {'name_col': 'J', 'exit_col': 'G', 'day_col': 'A'},
-                        {'name_col': 'Y', 'exit_col': 'V', 'day_col': 'P'},
-                        {'name_col': 'AN', 'exit_col': 'AK', 'day_col': 'AE'}
-                    ]
-
-                    for position in positions:
-                        try:
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
-
-                            if pd.isna(name_cell):
-                                continue
-
-                            if str(name_cell).strip() == employee_name:
-                                exit_col = self.get_column_index(position['exit_col'])
-                                day_col = self.get_column_index(position['day_col'])
-
-                                for row in range(11, 42):
-                                    try:
-                                        day_value = df.iloc[row, day_col]
-                                        if pd.isna(day_value):
-                                            continue
-
-                                        day_str = str(day_value).strip()
-                                        if 'absence' in day_str.lower():
-                                            continue
-
-                                        # Skip weekends
-                                        if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
-                                            continue
-
-                                        exit_time = df.iloc[row, exit_col]
-                                        if not pd.isna(exit_time):
-                                            try:
-                                                exit_time = pd.to_datetime(exit_time).time()
-                                                formatted_day = self.translate_day_abbreviation(day_str)
-                                                departure_details.append(f"{formatted_day} ({exit_time.strftime('%H:%M')})")
-                                                mid_day_departures += 1
-                                            except Exception as e:
-                                                print(f"Error procesando hora de salida en fila {row+1}: {str(e)}")
-                                                continue
-
-                                    except Exception as e:
-                                        print(f"Error en fila {row+1}: {str(e)}")
-                                        continue
-
-                        except Exception as e:
-                            print(f"Error procesando posición {position['name_col']}: {str(e)}")
-                            continue
-
-                except Exception as e:
-                    print(f"Error procesando hoja {sheet}: {str(e)}")
-                    continue
-
-            # Format departure details
-            departure_text = self.format_list_in_columns(departure_details) if departure_details else "No hay registros"
-            
-            return mid_day_departures, departure_text
-
-        except Exception as e:
-            print(f"Error general: {str(e)}")
-            return 0, "Error al procesar los datos"
-
-    def get_employee_stats(self, employee_name):
-        """Get comprehensive statistics for a specific employee"""
-        # Regular stats
-        late_days, late_minutes = self.count_late_days(employee_name)
-        late_arrivals, late_arrival_minutes = self.count_late_arrivals_after_810(employee_name)
-        early_departure_days, early_minutes = self.count_early_departures(employee_name)
-        lunch_overtime_days, total_lunch_minutes = self.count_lunch_overtime_days(employee_name)
-        missing_entry_days, missing_exit_days, missing_lunch_days = self.count_missing_records(employee_name)
-        absence_days = self.get_absence_days(employee_name)
-        absences = len(absence_days) if absence_days else 0
-        mid_day_departures, mid_day_departures_text = self.count_mid_day_departures(employee_name)
-        overtime_minutes = 0
-        overtime_days = []
-
-        # Get overtime for agustin taba
-        if employee_name.lower() == 'agustin taba':
-            overtime_minutes, overtime_days = self.calculate_overtime(employee_name)
-
-        # Get department
-        department = ""
-        try:
-            department = self.get_employee_department(employee_name)
-        except Exception as e:
-            print(f"Error getting department: {str(e)}")
-
-        # Calcular horas requeridas según el tipo de empleado
-        if 'sebastian' in employee_name.lower() or 'ppp' in employee_name.lower():
-            required_hours = 80.0  # Estándar mensual para PPP y Sebastian
-        else:
-            required_hours = 168.4  # Estándar mensual para empleados regulares
-
-
-        # Get stats dictionary ready
-        stats = {
-            'name': employee_name,
-            'department': department,
-            'absences': absences,
-            'absence_days': absence_days,
-            'late_days': late_days,
-            'late_minutes': late_minutes,
-            'late_arrivals': late_arrivals,  # Ingresos posteriores a 8:10
-            'late_arrival_minutes': late_arrival_minutes,  # Minutos de retraso después de 8:10
-            'early_departure_days': early_departure_days,
-            'early_minutes': early_minutes,
-            'lunch_overtime_days': lunch_overtime_days,
-            'total_lunch_minutes': total_lunch_minutes,
-            'missing_entry_days': missing_entry_days,
-            'missing_exit_days': missing_exit_days,
-            'missing_lunch_days': missing_lunch_days,
-            'required_hours': required_hours,
-            'actual_hours': actual_hours,
-            'mid_day_departures': mid_day_departures,
-            'mid_day_departures_text': mid_day_departures_text,
-            'overtime_minutes': overtime_minutes if 'agustin taba' in employee_name.lower() else 0,
-            'overtime_days': overtime_days if 'agustin taba' in employee_name.lower() else []
-        }
-        
-        # Add PPP weekly hours if applicable
-        if 'ppp' in employee_name.lower():
-            stats['weekly_hours'] = weekly_hours
-            stats['weekly_details'] = weekly_details
-            
-        return stats
+            logger.error("Error general: %s", e)
+            return 0, "Error al procesar los datos"
 
+    @_profiled
     def count_late_arrivals_after_810(self, employee_name):
         """Cuenta los ingresos posteriores a las 8:10"""
         try:
+            trace = logger.isEnabledFor(TRACE)
             late_arrivals = []
             total_late_minutes = 0
             limit_time = datetime.strptime('8:10', '%H:%M').time()
 
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
-
-            for sheet in attendance_sheets:
+            for record in self._get_employee_ledger(employee_name).itertuples(index=False):
                 try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-
-                    positions = [
-                        {'name_col': 'J', 'entry_col': 'B', 'day_col': 'A'},
-                        {'name_col': 'Y', 'entry_col': 'Q', 'day_col': 'P'},
-                        {'name_col': 'AN', 'entry_col': 'AF', 'day_col': 'AE'}
-                    ]
+                    day_str = str(record.day).strip().lower()
+                    if day_str == '' or day_str == 'nan' or day_str == 'absence':
+                        continue
 
-                    for position in positions:
+                    entry_time = record.entry
+                    if not pd.isna(entry_time):
                         try:
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
-
-                            if pd.isna(name_cell):
+                            if isinstance(entry_time, str):
+                                entry_time = pd.to_datetime(entry_time).time()
+                            elif isinstance(entry_time, datetime):
+                                entry_time = entry_time.time()
+                            else:
                                 continue
 
-                            employee_cell = str(name_cell).strip()
-                            if employee_cell == employee_name:
-                                entry_col = self.get_column_index(position['entry_col'])
-                                day_col = self.get_column_index(position['day_col'])
-
-                                for row in range(11, 42):
-                                    try:
-                                        day_value = df.iloc[row, day_col]
-                                        if pd.isna(day_value):
-                                            continue
-
-                                        day_str = str(day_value).strip().lower()
-                                        if day_str == '' or day_str == 'nan' or day_str == 'absence':
-                                            continue
-
-                                        entry_time = df.iloc[row, entry_col]
-                                        if not pd.isna(entry_time):
-                                            try:
-                                                if isinstance(entry_time, str):
-                                                    entry_time = pd.to_datetime(entry_time).time()
-                                                elif isinstance(entry_time, datetime):
-                                                    entry_time = entry_time.time()
-                                                else:
-                                                    continue
-
-                                                # Solo contar si es posterior a las 8:10
-                                                if entry_time > limit_time:
-                                                    late_minutes = (
-                                                        datetime.combine(datetime.min, entry_time) -
-                                                        datetime.combine(datetime.min, limit_time)
-                                                    ).total_seconds() / 60
-                                                    total_late_minutes += late_minutes
-
-                                                    formatted_day = self.translate_day_abbreviation(day_str)
-                                                    late_arrivals.append(formatted_day)
-                                                    print(f"Ingreso con retraso en fila {row+1}: {late_minutes:.0f} minutos (hora: {entry_time}), Dia: {formatted_day}")
-
-                                            except Exception as e:
-                                                print(f"Error procesando hora de entrada en fila {row+1}: {str(e)}")
-                                                continue
-
-                                    except Exception as e:
-                                        print(f"Error en fila {row+1}: {str(e)}")
-                                        continue
+                            # Solo contar si es posterior a las 8:10
+                            if entry_time > limit_time:
+                                late_minutes = (
+                                    datetime.combine(datetime.min, entry_time) -
+                                    datetime.combine(datetime.min, limit_time)
+                                ).total_seconds() / 60
+                                total_late_minutes += late_minutes
+
+                                formatted_day = self.translate_day_abbreviation(day_str)
+                                late_arrivals.append(formatted_day)
+                                if trace:
+                                    logger.log(TRACE, "Ingreso con retraso en fila %s: %.0f minutos (hora: %s), Dia: %s", record.row+1, late_minutes, entry_time, formatted_day)
 
                         except Exception as e:
-                            print(f"Error procesando posición {position['name_col']}: {str(e)}")
+                            self._add_diagnostic('count_late_arrivals_after_810', "Error procesando hora de entrada", record.sheet, record.row + 1, e)
                             continue
 
                 except Exception as e:
-                    print(f"Error procesando hoja {sheet}: {str(e)}")
+                    self._add_diagnostic('count_late_arrivals_after_810', "Error", record.sheet, record.row + 1, e)
                     continue
 
-            print(f"Total ingresos con retraso: {len(late_arrivals)}")
-            print(f"Total minutos de retraso: {total_late_minutes:.0f}")
+            logger.debug("Total ingresos con retraso: %s", len(late_arrivals))
+            logger.debug("Total minutos de retraso: %.0f", total_late_minutes)
             return late_arrivals, total_late_minutes
 
         except Exception as e:
-            print(f"Error general: {str(e)}")
+            logger.error("Error general: %s", e)
             return [], 0
 
     def format_list_in_columns(self, items, items_per_column=8):
@@ -1604,183 +1224,13 @@ class ExcelProcessor:
 
 
 
-    def calculate_ppp_weekly_hours(self, employee_name):
-        """Calculate weekly hours for PPP employees"""
-        try:
-            weekly_hours = {
-                'Semana 1': 0,
-                'Semana 2': 0,
-                'Semana 3': 0,
-                'Semana 4': 0
-            }
-            weekly_details = []
-            
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
-            
-            # Positions in the Excel sheet with correct columns for PPP employees
-            positions = [
-                {'name_col': 'J', 'entry_col': 'B', 'exit_col': 'D', 'day_col': 'A'},  # Entry y salida B y D
-                {'name_col': 'Y', 'entry_col': 'Q', 'exit_col': 'S', 'day_col': 'P'},  # Entry y salida Q y S
-                {'name_col': 'AN', 'entry_col': 'AF', 'exit_col': 'AH', 'day_col': 'AE'}  # Entry y salida AF y AH
-            ]
-
-            for sheet in attendance_sheets:
-                try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-                    
-                    for position in positions:
-                        try:
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
-                            
-                            if pd.isna(name_cell) or str(name_cell).strip() != employee_name:
-                                continue
-                                
-                            for row in range(11, 42):  # Filas 12-42
-                                try:
-                                    day_value = df.iloc[row, self.get_column_index(position['day_col'])]
-                                    entry_time = df.iloc[row, self.get_column_index(position['entry_col'])]
-                                    exit_time = df.iloc[row, self.get_column_index(position['exit_col'])]
-                                    
-                                    if pd.isna(day_value):
-                                        continue
-                                        
-                                    day_str = str(day_value).strip()
-                                    if 'absence' in day_str.lower():
-                                        continue
-                                        
-                                    # Skip weekends
-                                    if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
-                                        continue
-                                        
-                                    # Process entry and exit times
-                                    if not pd.isna(entry_time) and not pd.isna(exit_time):
-                                        try:
-                                            entry_time = pd.to_datetime(entry_time).time()
-                                            exit_time = pd.to_datetime(exit_time).time()
-                                            
-                                            # Obtener horas y minutos por separado
-                                            end_hour = exit_time.hour
-                                            end_minute = exit_time.minute
-                                            start_hour = entry_time.hour
-                                            start_minute = entry_time.minute
-                                            
-                                            # Realizar la resta de horas y minutos
-                                            diff_hours = end_hour - start_hour
-                                            diff_minutes = end_minute - start_minute
-                                            
-                                            # Ajustar si los minutos son negativos
-                                            if diff_minutes < 0:
-                                                diff_minutes += 60
-                                                diff_hours -= 1
-                                            
-                                            # Convertir minutos extras a horas si superan 60
-                                            if diff_minutes >= 60:
-                                                extra_hours = diff_minutes // 60
-                                                diff_hours += extra_hours
-                                                diff_minutes = diff_minutes % 60
-                                            
-                                            # Calcular horas totales para esta entrada
-                                            total_hours = diff_hours + (diff_minutes / 60)
-                                            
-                                            # Add to appropriate week
-                                            day_num = int(day_str.split()[0])
-                                            week_key = ''
-                                            if 1 <= day_num <= 7:
-                                                week_key = 'Semana 1'
-                                            elif 8 <= day_num <= 14:
-                                                week_key = 'Semana 2'
-                                            elif 15 <= day_num <= 21:
-                                                week_key = 'Semana 3'
-                                            elif day_num >= 22:
-                                                week_key = 'Semana 4'
-                                                
-                                            if week_key:
-                                                weekly_hours[week_key] += total_hours
-                                                week_details = {
-                                                    'week': week_key,
-                                                    'day': self.translate_day_abbreviation(day_str),
-                                                    'entry': entry_time.strftime('%H:%M'),
-                                                    'exit': exit_time.strftime('%H:%M'),
-                                                    'hours': f"{diff_hours}h {diff_minutes}m"
-                                                }
-                                                
-                                                # Check for extra hours
-                                                extra_entry_col = 'G' if position['name_col'] == 'J' else \
-                                                                'V' if position['name_col'] == 'Y' else 'AK'
-                                                extra_exit_col = 'I' if position['name_col'] == 'J' else \
-                                                                'X' if position['name_col'] == 'Y' else 'AM'
-                                                
-                                                extra_entry = df.iloc[row, self.get_column_index(extra_entry_col)]
-                                                extra_exit = df.iloc[row, self.get_column_index(extra_exit_col)]
-                                                
-                                                if not pd.isna(extra_entry) and not pd.isna(extra_exit):
-                                                    extra_entry_time = pd.to_datetime(extra_entry).time()
-                                                    extra_exit_time = pd.to_datetime(extra_exit).time()
-                                                    
-                                                    # Calculate extra hours
-                                                    extra_end_hour = extra_exit_time.hour
-                                                    extra_end_minute = extra_exit_time.minute
-                                                    extra_start_hour = extra_entry_time.hour
-                                                    extra_start_minute = extra_entry_time.minute
-                                                    
-                                                    extra_diff_hours = extra_end_hour - extra_start_hour
-                                                    extra_diff_minutes = extra_end_minute - extra_start_minute
-                                                    
-                                                    if extra_diff_minutes < 0:
-                                                        extra_diff_minutes += 60
-                                                        extra_diff_hours -= 1
-                                                    
-                                                    if extra_diff_minutes >= 60:
-                                                        more_hours = extra_diff_minutes // 60
-                                                        extra_diff_hours += more_hours
-                                                        extra_diff_minutes = extra_diff_minutes % 60
-                                                    
-                                                    if extra_diff_hours > 0 or extra_diff_minutes > 0:
-                                                        week_details['extra_entry'] = extra_entry_time.strftime('%H:%M')
-                                                        week_details['extra_exit'] = extra_exit_time.strftime('%H:%M')
-                                                        week_details['extra_hours'] = f"{extra_diff_hours}h {extra_diff_minutes}m"
-                                                        
-                                                        # Add extra hours to weekly total
-                                                        extra_total_hours = extra_diff_hours + (extra_diff_minutes / 60)
-                                                        weekly_hours[week_key] += extra_total_hours
-                                                
-                                                weekly_details.append(week_details)
-                                                print(f"Día {day_str}: {diff_hours}h {diff_minutes}m")
-                                                
-                                        except Exception as e:
-                                            print(f"Error processing times in row {row+1}: {str(e)}")
-                                            continue
-                                            
-                                except Exception as e:
-                                    print(f"Error in row {row+1}: {str(e)}")
-                                    continue
-                                    
-                        except Exception as e:
-                            print(f"Error checking position {position['name_col']}: {str(e)}")
-                            continue
-                            
-                except Exception as e:
-                    print(f"Error processing sheet {sheet}: {str(e)}")
-                    continue
-                    
-            # Round weekly hours
-            for week in weekly_hours:
-                weekly_hours[week] = round(weekly_hours[week], 2)
-                
-            return weekly_hours, weekly_details
-            
-        except Exception as e:
-            print(f"Error calculating PPP weekly hours: {str(e)}")
-            return {'Semana 1': 0, 'Semana 2': 0, 'Semana 3': 0, 'Semana 4': 0}, []
-
     def calculate_ppp_overtime(self, employee_name):
         """Calculate overtime hours for PPP employees"""
-        if 'ppp' not in employee_name.lower():
+        if not self.get_employee_schedule(employee_name)['treat_as_ppp']:
             return 0, []
 
         try:
+            trace = logger.isEnabledFor(TRACE)
             total_overtime_minutes = 0
             overtime_days = []
             weekly_hours, week_details = self.calculate_ppp_weekly_hours(employee_name)
@@ -1813,226 +1263,197 @@ class ExcelProcessor:
                         overtime_minutes = ((total_time - 4) * 60)
                         total_overtime_minutes += overtime_minutes
                         overtime_days.append(details['day'])
-                        print(f"Overtime on {details['day']}: {overtime_minutes:.0f} minutes")
+                        if trace:
+                            logger.log(TRACE, "Overtime on %s: %.0f minutes", details['day'], overtime_minutes)
                         
                 except Exception as e:
-                    print(f"Error calculating overtime for day: {str(e)}")
+                    logger.error("Error calculating overtime for day: %s", e)
                     continue
             
-            print(f"Total overtime days: {len(overtime_days)}")
-            print(f"Total overtime minutes: {total_overtime_minutes:.0f}")
+            logger.debug("Total overtime days: %s", len(overtime_days))
+            logger.debug("Total overtime minutes: %.0f", total_overtime_minutes)
             return overtime_days, total_overtime_minutes
             
         except Exception as e:
-            print(f"Error calculating PPP overtime: {str(e)}")
+            logger.error("Error calculating PPP overtime: %s", e)
             return [], 0
 
+    @_profiled
     def calculate_overtime(self, employee_name):
-        """Calculate overtime hours for agustin taba"""
-        if employee_name.lower() != 'agustin taba':
+        """Total de minutos extra y días con horas extra de un empleado (ver get_overtime_tables)"""
+        return self._overtime_by_employee([employee_name]).get(employee_name, (0, []))
+
+    def _overtime_by_employee(self, employee_names=None):
+        """{empleado: (minutos extra, días con horas extra)} de la tabla diaria de get_overtime_tables"""
+        daily, _ = self.get_overtime_tables(employee_names)
+        days = daily[daily['overtime_minutes'] > 0]
+        return {
+            employee_name: (int(group['overtime_minutes'].sum()),
+                            [f"{day} ({minutes // 60}h {minutes % 60}m)"
+                             for day, minutes in zip(group['day'], group['overtime_minutes'])])
+            for employee_name, group in days.groupby('employee', sort=False)
+        }
+
+    @_profiled
+    def get_overtime_tables(self, employee_names=None):
+        """Minutos regulares y extra por día y por semana de los empleados con horas extra.
+
+        Incluye los horarios con overtime_enabled y los que tienen un rango de
+        horas extra (overtime) en la tabla de horarios:
+        - overtime_enabled (ana): la jornada va de la entrada a la última marcación
+          del día; lo que pasa del fin de horario es extra.
+        - overtime (agustin taba): lo extra es el rango entre las columnas de la
+          regla, solo en su hoja y bloque.
+        Los minutos regulares son los trabajados hasta el fin de horario.
+
+        Devuelve (daily, weekly): daily tiene una fila por empleado y día trabajado
+        (employee, sheet, day, week, regular_minutes, overtime_minutes) y weekly
+        los totales por empleado y semana de get_weeks_in_month.
+        """
+        with self._lock:
+            if self._overtime_tables is None:
+                self._overtime_tables = self._compute_overtime_tables()
+            daily, weekly = self._overtime_tables
+        if employee_names is not None:
+            daily = daily[daily['employee'].isin(employee_names)].reset_index(drop=True)
+            weekly = weekly[weekly['employee'].isin(employee_names)].reset_index(drop=True)
+        return daily, weekly
+
+    def _compute_overtime_tables(self):
+        daily_columns = ['employee', 'sheet', 'day', 'week', 'regular_minutes', 'overtime_minutes']
+        weekly_columns = ['employee', 'week', 'regular_minutes', 'overtime_minutes', 'overtime_days']
+        employees = [name for name in self._ledger_positions
+                     if self.get_employee_schedule(name)['overtime_enabled'] or self.get_employee_schedule(name)['overtime']]
+        if not employees:
+            return pd.DataFrame(columns=daily_columns), pd.DataFrame(columns=weekly_columns)
+
+        records = self._ledger.iloc[np.concatenate([self._ledger_positions[name] for name in employees])]
+        missing = self.MISSING_MINUTES
+        sheets = records['sheet'].to_numpy()
+        blocks = records['block'].to_numpy()
+        names = records['employee'].to_numpy()
+        _, work_end = self._schedule_minutes(records)
+
+        # Jornada: de la entrada a la última marcación del día (el reloj no siempre usa la columna de salida)
+        entry = records['entry_min'].to_numpy(dtype=np.int32)
+        last_punch = records[['lunch_out_min', 'lunch_return_min', 'exit_min']].to_numpy(dtype=np.int32).max(axis=1)
+        worked = (entry != missing) & (last_punch > entry)
+        regular = np.where(worked, np.clip(np.minimum(last_punch, work_end) - entry, 0, None), 0)
+        overtime = np.where(worked, np.clip(last_punch - work_end, 0, None), 0)
+
+        # Rango de horas extra por regla (p.ej. 4.5.6, bloque AN: de AK a AM)
+        for name in employees:
+            rule = self.get_employee_schedule(name)['overtime']
+            if not rule:
+                continue
+            span_start = records[f"{rule['start_field']}_min"].to_numpy(dtype=np.int32)
+            span_end = records[f"{rule['end_field']}_min"].to_numpy(dtype=np.int32)
+            span = span_end - span_start
+            employee_rows = names == name
+            overtime[employee_rows] = 0
+            in_span = (employee_rows & (sheets == rule['sheet']) & (blocks == rule['block']) &
+                       (span_start != missing) & (span_end != missing) & (span > 0))
+            overtime[in_span] = span[in_span]
+
+        keep = worked | (overtime > 0)
+        day_str = records['day'].astype(str).str.strip().to_numpy()[keep]
+        weeks = self.get_weeks_in_month()
+        starts = np.array([start for start, _ in weeks])
+        day_num = pd.to_numeric(pd.Series(day_str).str.split().str[0], errors='coerce').fillna(-1).to_numpy()
+        # Igual que get_all_ppp_weekly_hours: los días previos a la primera semana cuentan en la Semana 1
+        week_index = np.where(day_num >= 1, np.clip(np.searchsorted(starts, day_num, side='right') - 1, 0, None), -1)
+
+        daily = pd.DataFrame({
+            'employee': names[keep],
+            'sheet': sheets[keep],
+            'day': [self.translate_day_abbreviation(day) for day in day_str],
+            'week': [f'Semana {index + 1}' if index >= 0 else None for index in week_index],
+            'regular_minutes': regular[keep].astype(int),
+            'overtime_minutes': overtime[keep].astype(int)
+        }, columns=daily_columns)
+
+        weekly = (daily.assign(overtime_days=daily['overtime_minutes'] > 0)
+                  .groupby(['employee', 'week'], sort=False)[['regular_minutes', 'overtime_minutes', 'overtime_days']]
+                  .sum().reset_index())
+        return daily, weekly
+
+    def _reference_overtime(self, employee_name):
+        """Calculate overtime minutes and days for one employee row by row.
+
+        Reference implementation for get_overtime_tables, used by
+        _reference_employee_stats.
+        """
+        schedule = self.get_employee_schedule(employee_name)
+        overtime = schedule['overtime']
+        if not overtime and not schedule['overtime_enabled']:
             return 0, []
 
         try:
             total_overtime_minutes = 0
             overtime_days = []
-            
-            # Solo procesar la hoja "4.5.6"
-            df = pd.read_excel(self.excel_file, sheet_name='4.5.6', header=None)
-            
-            # Verificar si es el empleado correcto
-            if str(df.iloc[2, self.get_column_index('AN')]).strip() != employee_name:
-                return 0, []
 
-            # Procesar filas 12-42 (índices 11-41)
-            for row in range(11, 42):
+            if overtime:
+                # Solo la hoja y bloque de la regla (p.ej. 4.5.6, AN: AK = inicio, AM = fin)
+                records = self._get_employee_ledger(employee_name, sheet=overtime['sheet'], block=overtime['block'])
+                start_field, end_field = overtime['start_field'], overtime['end_field']
+            else:
+                # De fin de horario a la última marcación del día
+                records = self._get_employee_ledger(employee_name)
+
+            for record in records.itertuples(index=False):
                 try:
-                    end_time = df.iloc[row, self.get_column_index('AM')]
-                    start_time = df.iloc[row, self.get_column_index('AK')]
-                    day_value = df.iloc[row, self.get_column_index('AE')]
+                    if overtime:
+                        start_time = getattr(record, start_field)
+                        end_time = getattr(record, end_field)
+                    else:
+                        punches = [record.lunch_out, record.lunch_return, record.exit]
+                        punches = [pd.to_datetime(punch).time() for punch in punches if not pd.isna(punch)]
+                        if pd.isna(record.entry) or not punches:
+                            continue
+                        start_time = schedule['end_time']
+                        end_time = max(punches)
+                        if end_time <= pd.to_datetime(record.entry).time():
+                            continue
 
-                    if not pd.isna(end_time) and not pd.isna(start_time) and not pd.isna(day_value):
+                    if not pd.isna(end_time) and not pd.isna(start_time):
                         try:
-                            # Convertir a datetime.time
-                            end_time = pd.to_datetime(end_time).time()
-                            start_time = pd.to_datetime(start_time).time()
-                            
-                            # Obtener horas y minutos por separado
-                            end_hour = end_time.hour
-                            end_minute = end_time.minute
-                            start_hour = start_time.hour
-                            start_minute = start_time.minute
-                            
-                            # Realizar la resta de horas y minutos
-                            diff_hours = end_hour - start_hour
-                            diff_minutes = end_minute - start_minute
-                            
-                            # Ajustar si los minutos son negativos
+                            end_time = pd.to_datetime(str(end_time)).time()
+                            start_time = pd.to_datetime(str(start_time)).time()
+
+                            diff_hours = end_time.hour - start_time.hour
+                            diff_minutes = end_time.minute - start_time.minute
                             if diff_minutes < 0:
                                 diff_minutes += 60
                                 diff_hours -= 1
-                            
-                            # Convertir minutos extras a horas si superan 60
-                            if diff_minutes >= 60:
-                                extra_hours = diff_minutes // 60
-                                diff_hours += extra_hours
-                                diff_minutes = diff_minutes % 60
-                            
-                            # Calcular minutos totales para esta entrada
-                            total_minutes = (diff_hours * 60) + diff_minutes
 
+                            total_minutes = (diff_hours * 60) + diff_minutes
                             if total_minutes > 0:
                                 total_overtime_minutes += total_minutes
-                                formatted_day = self.translate_day_abbreviation(str(day_value).strip())
+                                formatted_day = self.translate_day_abbreviation(str(record.day).strip())
                                 overtime_days.append(f"{formatted_day} ({diff_hours}h {diff_minutes}m)")
-                                print(f"Diferencia para la fila {row+1}: {diff_hours} horas y {diff_minutes} minutos")
-                                
+
                         except Exception as e:
-                            print(f"Error processing times in row {row+1}: {str(e)}")
+                            self._add_diagnostic('_reference_overtime', "Error processing times", record.sheet, record.row + 1, e)
                             continue
 
                 except Exception as e:
-                    print(f"Error in row {row+1}: {str(e)}")
+                    self._add_diagnostic('_reference_overtime', "Error", record.sheet, record.row + 1, e)
                     continue
 
             return total_overtime_minutes, overtime_days
 
         except Exception as e:
-            print(f"Error calculating overtime: {str(e)}")
+            logger.error("Error calculating overtime: %s", e)
             return 0, []
 
-    def calculate_ppp_weekly_hours(self, employee_name):
-        """Calculate weekly hours for PPP employees"""
-        try:
-            weekly_hours = {
-                'Semana 1': 0,
-                'Semana 2': 0,
-                'Semana 3': 0,
-                'Semana 4': 0
-            }
-            weekly_details = []
-            
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
-            
-            # Positions in the Excel sheet with correct columns for PPP employees
-            positions = [
-                {'name_col': 'J', 'entry_col': 'B', 'exit_col': 'D', 'day_col': 'A'},  # Entry y salida B y D
-                {'name_col': 'Y', 'entry_col': 'Q', 'exit_col': 'S', 'day_col': 'P'},  # Entry y salida Q y S
-                {'name_col': 'AN', 'entry_col': 'AF', 'exit_col': 'AH', 'day_col': 'AE'}  # Entry y salida AF y AH
-            ]
+    def _reference_ppp_weekly_hours(self, employee_name):
+        """Calculate weekly hours for PPP employees row by row.
 
-            for sheet in attendance_sheets:
-                try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-                    
-                    for position in positions:
-                        try:
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
-                            
-                            if pd.isna(name_cell) or str(name_cell).strip() != employee_name:
-                                continue
-                                
-                            for row in range(11, 42):  # Filas 12-42
-                                try:
-                                    day_value = df.iloc[row, self.get_column_index(position['day_col'])]
-                                    entry_time = df.iloc[row, self.get_column_index(position['entry_col'])]
-                                    exit_time = df.iloc[row, self.get_column_index(position['exit_col'])]
-                                    
-                                    if pd.isna(day_value):
-                                        continue
-                                        
-                                    day_str = str(day_value).strip()
-                                    if 'absence' in day_str.lower():
-                                        continue
-                                        
-                                    # Skip weekends
-                                    if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
-                                        continue
-                                        
-                                    # Process entry and exit times
-                                    if not pd.isna(entry_time) and not pd.isna(exit_time):
-                                        try:
-                                            entry_time = pd.to_datetime(entry_time).time()
-                                            exit_time = pd.to_datetime(exit_time).time()
-                                            
-                                            # Obtener horas y minutos por separado
-                                            end_hour = exit_time.hour
-                                            end_minute = exit_time.minute
-                                            start_hour = entry_time.hour
-                                            start_minute = entry_time.minute
-                                            
-                                            # Realizar la resta de horas y minutos
-                                            diff_hours = end_hour - start_hour
-                                            diff_minutes = end_minute - start_minute
-                                            
-                                            # Ajustar si los minutos son negativos
-                                            if diff_minutes < 0:
-                                                diff_minutes += 60
-                                                diff_hours -= 1
-                                            
-                                            # Convertir minutos extras a horas si superan 60
-                                            if diff_minutes >= 60:
-                                                extra_hours = diff_minutes // 60
-                                                diff_hours += extra_hours
-                                                diff_minutes = diff_minutes % 60
-                                            
-                                            # Calcular horas totales para esta entrada
-                                            total_hours = diff_hours + (diff_minutes / 60)
-                                            
-                                            # Add to appropriate week
-                                            day_num = int(day_str.split()[0])
-                                            week_key = ''
-                                            if 1 <= day_num <= 7:
-                                                week_key = 'Semana 1'
-                                            elif 8 <= day_num <= 14:
-                                                week_key = 'Semana 2'
-                                            elif 15 <= day_num <= 21:
-                                                week_key = 'Semana 3'
-                                            elif day_num >= 22:
-                                                week_key = 'Semana 4'
-                                                
-                                            if week_key:
-                                                weekly_hours[week_key] += total_hours
-                                                week_details = {
-                                                    'week': week_key,
-                                                    'day': self.translate_day_abbreviation(day_str),
-                                                    'entry': entry_time.strftime('%H:%M'),
-                                                    'exit': exit_time.strftime('%H:%M'),
-                                                    'hours': f"{diff_hours}h {diff_minutes}m"
-                                                }
-                                                weekly_details.append(week_details)
-                                                print(f"Día {day_str}: {diff_hours}h {diff_minutes}m")
-                                                
-                                        except Exception as e:
-                                            print(f"Error processing times in row {row+1}: {str(e)}")
-                                            continue
-                                            
-                                except Exception as e:
-                                    print(f"Error in row {row+1}: {str(e)}")
-                                    continue
-                                    
-                        except Exception as e:
-                            print(f"Error checking position {position['name_col']}: {str(e)}")
-                            continue
-                            
-                except Exception as e:
-                    print(f"Error processing sheet {sheet}: {str(e)}")
-                    continue
-                    
-            # Round weekly hours
-            for week in weekly_hours:
-                weekly_hours[week] = round(weekly_hours[week], 2)
-                
-            return weekly_hours, weekly_details
-            
-        except Exception as e:
-            print(f"Error calculating PPP weekly hours: {str(e)}")
-            return {'Semana 1': 0, 'Semana 2': 0, 'Semana 3': 0, 'Semana 4': 0}, []
-
-    def format_lunch_overtime_text(self, lunch_overtime_days):
-        """Calculate weekly hours for PPP employees"""
+        Reference implementation for get_all_ppp_weekly_hours, used by
+        _reference_employee_stats.
+        """
         try:
+            trace = logger.isEnabledFor(TRACE)
             weekly_hours = {
                 'Semana 1': 0,
                 'Semana 2': 0,
@@ -2040,483 +1461,168 @@ class ExcelProcessor:
                 'Semana 4': 0
             }
             weekly_details = []
-            
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
-            
-            # Positions in the Excel sheet with correct columns for PPP employees
-            positions = [
-                {'name_col': 'J', 'entry_col': 'B', 'exit_col': 'D', 'day_col': 'A'},  # Entry y salida B y D
-                {'name_col': 'Y', 'entry_col': 'Q', 'exit_col': 'S', 'day_col': 'P'},  # Entry y salida Q y S
-                {'name_col': 'AN', 'entry_col': 'AF', 'exit_col': 'AH', 'day_col': 'AE'}  # Entry y salida AF y AH
-            ]
-
-            for sheet in attendance_sheets:
-                try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-                    
-                    for position in positions:
-                        try:
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
-                            
-                            if pd.isna(name_cell) or str(name_cell).strip() != employee_name:
-                                continue
-                                
-                            for row in range(11, 42):  # Filas 12-42
-                                try:
-                                    day_value = df.iloc[row, self.get_column_index(position['day_col'])]
-                                    entry_time = df.iloc[row, self.get_column_index(position['entry_col'])]
-                                    exit_time = df.iloc[row, self.get_column_index(position['exit_col'])]
-                                    
-                                    if pd.isna(day_value):
-                                        continue
-                                        
-                                    day_str = str(day_value).strip()
-                                    if 'absence' in day_str.lower():
-                                        continue
-                                        
-                                    # Skip weekends
-                                    if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
-                                        continue
-                                        
-                                    # Process entry and exit times
-                                    if not pd.isna(entry_time) and not pd.isna(exit_time):
-                                        try:
-                                            entry_time = pd.to_datetime(entry_time).time()
-                                            exit_time = pd.to_datetime(exit_time).time()
-                                            
-                                            # Calculate hours worked
-                                            hours = ((
-                                                datetime.combine(datetime.min, exit_time) - 
-                                                datetime.combine(datetime.min, entry_time)
-                                            ).total_seconds() / 3600)
-                                            
-                                            # Add to appropriate week
-                                            day_num = int(day_str.split()[0])
-                                            week_key = ''
-                                            if 1 <= day_num <= 7:
-                                                week_key = 'Semana 1'
-                                            elif 8 <= day_num <= 14:
-                                                week_key = 'Semana 2'
-                                            elif 15 <= day_num <= 21:
-                                                week_key = 'Semana 3'
-                                            elif day_num >= 22:
-                                                week_key = 'Semana 4'
-                                                
-                                            if week_key:
-                                                weekly_hours[week_key] += hours
-                                                week_details = {
-                                                    'week': week_key,
-                                                    'day': self.translate_day_abbreviation(day_str),
-                                                    'entry': entry_time.strftime('%H:%M'),
-                                                    'exit': exit_time.strftime('%H:%M'),
-                                                    'hours': round(hours, 2)
-                                                }
-                                                weekly_details.append(week_details)
-                                                
-                                        except Exception as e:
-                                            print(f"Error processing times in row {row+1}: {str(e)}")
-                                            continue
-                                            
-                                except Exception as e:
-                                    print(f"Error in row {row+1}: {str(e)}")
-                                    continue
-                                    
-                        except Exception as e:
-                            print(f"Error checking position {position['name_col']}: {str(e)}")
-                            continue
-                            
-                except Exception as e:
-                    print(f"Error processing sheet {sheet}: {str(e)}")
-                    continue
-                    
-            # Round weekly hours
-            for week in weekly_hours:
-                weekly_hours[week] = round(weekly_hours[week], 2)
-                
-            return weekly_hours, weekly_details
-            
-        except Exception as e:
-            print(f"Error calculating PPP weekly hours: {str(e)}")
-            return {'Semana 1': 0, 'Semana 2': 0, 'Semana 3': 0, 'Semana 4': 0}, []
-
-    def get_employee_stats(self, employee_name):
-        """Get comprehensive statistics for a specific employee"""
-        # Regular stats
-        absence_days = self.get_absence_days(employee_name)
-        absences = len(absence_days) if absence_days else 0
-        late_days, late_minutes = self.count_late_days(employee_name)
-        lunch_overtime_days, total_lunch_minutes = self.count_lunch_overtime_days(employee_name)
-        early_departure_days, early_minutes = self.count_early_departures(employee_name)
-        missing_entry_days, missing_exit_days, missing_lunch_days = self.count_missing_records(employee_name)
-        
-        # Mid-day departures with detailed text
-        mid_day_departures, mid_day_departures_text = self.format_mid_day_departures_text(employee_name)
-        
-        # Calculate overtime for agustin taba
-        overtime_minutes, overtime_days = self.calculate_overtime(employee_name)
-        
-        print(f"Debug - {employee_name} mid-day departures: {mid_day_departures}")
-        print(f"Debug - {employee_name} mid-day departures text: {mid_day_departures_text}")
-        if employee_name.lower() == 'agustin taba':
-            print(f"Debug - {employee_name} overtime minutes: {overtime_minutes}")
-            print(f"Debug - {employee_name} overtime days: {overtime_days}")
-
-        # Get department from the first sheet (Summary)
-        department = ""
-        try:
-            df = pd.read_excel(self.excel_file, sheet_name='Summary', header=None)
-            for idx in range(4, 24):  # Filas 5-24
-                if str(df.iloc[idx, 1]).strip() == employee_name:
-                    department = str(df.iloc[idx, 2]).strip()
-                    break
-        except Exception as e:
-            print(f"Error getting department: {str(e)}")
-
-        # Calcular horas requeridas según el tipo de empleado
-        if 'sebastian' in employee_name.lower() or 'ppp' in employee_name.lower():
-            required_hours = 80.0  # Estándar mensual para PPP y Sebastian
-        else:
-            required_hours = 168.4  # Estándar mensual para empleados regulares
-
-
-        # Get stats dictionary ready
-        stats = {
-            'name': employee_name,
-            'department': department,
-            'absences': absences,
-            'absence_days': absence_days,
-            'late_days': late_days,
-            'late_minutes': late_minutes,
-            'lunch_overtime_days': lunch_overtime_days,
-            'total_lunch_minutes': total_lunch_minutes,
-            'early_departure_days': early_departure_days,
-            'early_minutes': early_minutes,
-            'missing_entry_days': missing_entry_days,
-            'missing_exit_days': missing_exit_days,
-            'missing_lunch_days': missing_lunch_days,
-            'required_hours': required_hours,
-            'actual_hours': actual_hours,
-            'mid_day_departures': mid_day_departures,
-            'mid_day_departures_text': mid_day_departures_text,
-            'overtime_minutes': overtime_minutes if 'agustin taba' in employee_name.lower() else 0,
-            'overtime_days': overtime_days if 'agustin taba' in employee_name.lower() else []
-        }
-        
-        # Add PPP weekly hours if applicable
-        if 'ppp' in employee_name.lower():
-            stats['weekly_hours'] = weekly_hours
-            stats['weekly_details'] = weekly_details
-            
-        return stats
 
-    def format_mid_day_departures_text(self, employee_name):
-        """Updates the mid-day departures text based on new logic"""
-        try:
-            total_mid_day_departures = 0
-            days_with_mid_departures = []
-            
-            # Encontrar el índice de la hoja "Exceptional"
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            # Solo procesar las hojas después de "Exceptional"
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index + 1:]
-            
-            work_start = datetime.strptime('07:50', '%H:%M').time()
-            work_lunch_limit = datetime.strptime('12:00', '%H:%M').time()
-
-            for sheet in attendance_sheets:
+            # Los PPP marcan entrada y salida en B y D (Q y S, AF y AH)
+            for record in self._get_employee_ledger(employee_name).itertuples(index=False):
                 try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-                    
-                    # Check position 1 (J3)
-                    if str(df.iloc[2, self.get_column_index('J')]).strip() == employee_name:
-                        for row in range(11, 42):  # Filas 12-42
-                            try:
-                                entry = df.iloc[row, self.get_column_index('B')]
-                                exit_time = df.iloc[row, self.get_column_index('D')]
-                                return_time = df.iloc[row, self.get_column_index('G')]
-                                
-                                if not pd.isna(entry):  # Si hay entrada
-                                    if not pd.isna(exit_time):  # Si hay salida
-                                        exit_time = pd.to_datetime(exit_time).time()
-                                        if work_start <= exit_time <= work_lunch_limit:  # Salida entre 7:50 y 12:00
-                                            if pd.isna(return_time) or pd.to_datetime(return_time).time() > work_lunch_limit:
-                                                total_mid_day_departures += 1
-                                                day_value = df.iloc[row, self.get_column_index('A')]
-                                                days_with_mid_departures.append(self.translate_day_abbreviation(str(day_value).strip()))
-                            except Exception as e:
-                                print(f"Error processing row {row} data: {e}")
-                                continue
+                    entry_time = record.entry
+                    exit_time = record.lunch_out
 
-                    # Check position 2 (Y3)
-                    elif str(df.iloc[2, self.get_column_index('Y')]).strip() == employee_name:
-                        for row in range(11, 42):
-                            try:
-                                entry = df.iloc[row, self.get_column_index('Q')]
-                                exit_time = df.iloc[row, self.get_column_index('S')]
-                                return_time = df.iloc[row, self.get_column_index('V')]
-                                
-                                if not pd.isna(entry):  # Si hay entrada
-                                    if not pd.isna(exit_time):  # Si hay salida
-                                        exit_time = pd.to_datetime(exit_time).time()
-                                        if work_start <= exit_time <= work_lunch_limit:  # Salida entre 7:50 y 12:00
-                                            if pd.isna(return_time) or pd.to_datetime(return_time).time() > work_lunch_limit:
-                                                total_mid_day_departures += 1
-                                                day_value = df.iloc[row, self.get_column_index('P')]
-                                                days_with_mid_departures.append(self.translate_day_abbreviation(str(day_value).strip()))
-                            except Exception as e:
-                                print(f"Error processing row {row} data in position 2: {e}")
-                                continue
-
-                    # Check position 3 (AN3)
-                    elif str(df.iloc[2, self.get_column_index('AN')]).strip() == employee_name:
-                        for row in range(11, 42):
-                            try:
-                                entry = df.iloc[row, self.get_column_index('AF')]
-                                exit_time = df.iloc[row, self.get_column_index('AH')]
-                                return_time = df.iloc[row, self.get_column_index('AK')]
-                                
-                                if not pd.isna(entry):  # Si hay entrada
-                                    if not pd.isna(exit_time):  # Si hay salida
-                                        exit_time = pd.to_datetime(exit_time).time()
-                                        if work_start <= exit_time <= work_lunch_limit:  # Salida entre 7:50 y 12:00
-                                            if pd.isna(return_time) or pd.to_datetime(return_time).time() > work_lunch_limit:
-                                                total_mid_day_departures += 1
-                                                day_value = df.iloc[row, self.get_column_index('AE')]
-                                                days_with_mid_departures.append(self.translate_day_abbreviation(str(day_value).strip()))
-                            except Exception as e:
-                                print(f"Error processing row {row} data in position 3: {e}")
-                                continue
-
-                except Exception as e:
-                    print(f"Error procesando hoja {sheet}: {str(e)}")
-                    continue
-
-            # Format the days text 
-            days_text = self.format_list_in_columns(days_with_mid_departures) if days_with_mid_departures else "No hay días registrados"
-            
-            return total_mid_day_departures, days_text
-
-        except Exception as e:
-            print(f"Error general en format_mid_day_departures_text: {str(e)}")
-            return 0, "Error al procesar los datos"
-
-
-
-    def get_early_departure_days(self, employee_name):
-        """Returns a list of days with early departures and total early minutes"""
-        try:
-            early_departure_days = []
-            total_early_minutes = 0
-            
-            # Find Exceptional sheet index
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
-
-            for sheet in attendance_sheets:
-                try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-                    
-                    # Check each possible position
-                    positions = [
-                        {'name_col': 'J', 'exit_col': 'I', 'day_col': 'A'},
-                        {'name_col': 'Y', 'exit_col': 'X', 'day_col': 'P'},
-                        {'name_col': 'AN', 'exit_col': 'AM', 'day_col': 'AE'}
-                    ]
-
-                    for position in positions:
-                        try:
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
-
-                            if pd.isna(name_cell) or str(name_cell).strip() != employee_name:
-                                continue
-
-                            day_col = self.get_column_index(position['day_col'])
-                            exit_col = self.get_column_index(position['exit_col'])
-
-                            for row in range(11, 42):
-                                try:
-                                    day_value = df.iloc[row, day_col]
-                                    if pd.isna(day_value):
-                                        continue
-
-                                    day_str = str(day_value).strip()
-                                    if any(abbr in day_str.lower() for abbr in ['sa', 'su', 'absence']):
-                                        continue
-
-                                    exit_time = df.iloc[row, exit_col]
-                                    if not pd.isna(exit_time):
-                                        try:
-                                            exit_time = pd.to_datetime(exit_time).time()
-                                            if self.is_early_departure(employee_name, exit_time):
-                                                schedule = self.get_employee_schedule(employee_name)
-                                                early_minutes = (
-                                                    datetime.combine(datetime.min, schedule['end_time']) -
-                                                    datetime.combine(datetime.min, exit_time)
-                                                ).total_seconds() / 60
-                                                total_early_minutes += early_minutes
-                                                
-                                                formatted_day = self.translate_day_abbreviation(day_str)
-                                                early_departure_days.append(formatted_day)
-                                        except Exception as e:
-                                            print(f"Error processing exit time in row {row+1}: {str(e)}")
-                                except Exception as e:
-                                    print(f"Error in row {row+1}: {str(e)}")
-
-                        except Exception as e:
-                            print(f"Error checking position: {str(e)}")
-
-                except Exception as e:
-                    print(f"Error processing sheet {sheet}: {str(e)}")
-
-            return early_departure_days, total_early_minutes
-
-        except Exception as e:
-            print(f"Error getting early departure days: {str(e)}")
-            return [], 0
-
-    def calculate_agustin_hours(self, df, start_row=11, end_row=42):
-        """Calcula las horas trabajadas específicamente para Agustín Tabasso"""
-        try:
-            total_hours = 0.0
-            entry_col = self.get_column_index('AF')
-            exit_col = self.get_column_index('AH')  # Cambio de AK a AH para hora de salida
-
-            print("\nCalculando horas trabajadas para Agustín:")
-
-            for row in range(start_row, end_row):
-                try:
-                    # Verificar si hay datos en la fila
-                    entry_time = df.iloc[row, entry_col]
-                    exit_time = df.iloc[row, exit_col]
+                    day_str = str(record.day).strip()
+                    if 'absence' in day_str.lower():
+                        continue
 
-                    # Saltar si específicamente dice "Absence" en la columna AK
-                    if pd.isna(exit_time) or str(exit_time).strip().lower() == 'absence':
-                        print(f"Fila {row+1}: Ausencia registrada")
+                    # Skip weekends
+                    if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
                         continue
 
-                    # Verificar si hay una entrada válida
-                    if not pd.isna(entry_time):
+                    # Process entry and exit times
+                    if not pd.isna(entry_time) and not pd.isna(exit_time):
                         try:
-                            # Convertir a datetime
                             entry_time = pd.to_datetime(entry_time).time()
                             exit_time = pd.to_datetime(exit_time).time()
 
-                            # Calcular horas trabajadas
-                            hours = (datetime.combine(datetime.min, exit_time) -
-                                     datetime.combine(datetime.min, entry_time)).total_seconds() / 3600
+                            # Obtener horas y minutos por separado
+                            end_hour = exit_time.hour
+                            end_minute = exit_time.minute
+                            start_hour = entry_time.hour
+                            start_minute = entry_time.minute
+
+                            # Realizar la resta de horas y minutos
+                            diff_hours = end_hour - start_hour
+                            diff_minutes = end_minute - start_minute
+
+                            # Ajustar si los minutos son negativos
+                            if diff_minutes < 0:
+                                diff_minutes += 60
+                                diff_hours -= 1
+
+                            # Convertir minutos extras a horas si superan 60
+                            if diff_minutes >= 60:
+                                extra_hours = diff_minutes // 60
+                                diff_hours += extra_hours
+                                diff_minutes = diff_minutes % 60
 
-                            if hours > 0:
-                                total_hours += hours
-                                print(f"Fila {row+1}: {hours:.2f} horas")
+                            # Calcular horas totales para esta entrada
+                            total_hours = diff_hours + (diff_minutes / 60)
+
+                            # Add to appropriate week
+                            day_num = int(day_str.split()[0])
+                            week_key = ''
+                            if 1 <= day_num <= 7:
+                                week_key = 'Semana 1'
+                            elif 8 <= day_num <= 14:
+                                week_key = 'Semana 2'
+                            elif 15 <= day_num <= 21:
+                                week_key = 'Semana 3'
+                            elif day_num >= 22:
+                                week_key = 'Semana 4'
+
+                            if week_key:
+                                weekly_hours[week_key] += total_hours
+                                week_details = {
+                                    'week': week_key,
+                                    'day': self.translate_day_abbreviation(day_str),
+                                    'entry': entry_time.strftime('%H:%M'),
+                                    'exit': exit_time.strftime('%H:%M'),
+                                    'hours': f"{diff_hours}h {diff_minutes}m"
+                                }
+                                weekly_details.append(week_details)
+                                if trace:
+                                    logger.log(TRACE, "Día %s: %sh %sm", day_str, diff_hours, diff_minutes)
 
                         except Exception as e:
-                            print(f"Error procesando horarios en fila {row+1}: {str(e)}")
+                            self._add_diagnostic('calculate_ppp_weekly_hours', "Error processing times", record.sheet, record.row + 1, e)
                             continue
 
                 except Exception as e:
-                    print(f"Error en fila {row+1}: {str(e)}")
+                    self._add_diagnostic('calculate_ppp_weekly_hours', "Error", record.sheet, record.row + 1, e)
                     continue
 
-            print(f"Total horas trabajadas: {total_hours:.2f}")
-            return total_hours
-
-        except Exception as e:
-            print(f"Error calculando horas: {str(e)}")
-            return 0.0
-
-    def process_attendance_summary(self):
-        """Procesa los datos de asistencia desde la hoja Summary"""
-        try:
-            print("Leyendo hoja Summary...")
-            summary_df = pd.read_excel(self.excel_file, sheet_name="Summary", header=None)
-
-            # Special handling for Agustín's absences
-            try:
-                agustin_sheet = pd.read_excel(self.excel_file, sheet_name="4.5.6", header=None)
-                agustin_absences = agustin_sheet.iloc[6, self.get_column_index('AE')]  # AE7 is [6, AE_index]
-                if not pd.isna(agustin_absences):
-                    agustin_idx = summary_df[summary_df.iloc[:, 1].str.strip() == 'agustin taba'].index
-                    if len(agustin_idx) > 0:
-                        summary_df.iloc[agustin_idx[0], 13] = agustin_absences
-            except Exception as e:
-                print(f"Error processing Agustin's special absences: {str(e)}")
+            # Round weekly hours
+            for week in weekly_hours:
+                weekly_hours[week] = round(weekly_hours[week], 2)
 
-            # Special handling for Valentina's absences
-            try:
-                valentina_sheet = pd.read_excel(self.excel_file, sheet_name="7.8.9", header=None)
-                valentina_absences = self.calculate_valentina_absences(valentina_sheet)
-                valentina_idx = summary_df[summary_df.iloc[:, 1].str.strip() == 'valentina al'].index
-                if len(valentina_idx) > 0:
-                    summary_df.iloc[valentina_idx[0], 13] = valentina_absences
-            except Exception as e:
-                print(f"Error processing Valentina's special absences: {str(e)}")
+            return weekly_hours, weekly_details
 
-            # Special handling for Soledad's absences
-            try:
-                soledad_sheet = pd.read_excel(self.excel_file, sheet_name="17.18", header=None)
-                soledad_absences = self.calculate_soledad_absences(soledad_sheet)
-                soledad_idx = summary_df[summary_df.iloc[:, 1].str.strip() == 'soledad silv'].index
-                if len(soledad_idx) > 0:
-                    summary_df.iloc[soledad_idx[0], 13] = soledad_absences
-            except Exception as e:
-                print(f"Error processing Soledad's special absences: {str(e)}")
-
-            # Extraer datos directamente de las celdas específicas (filas 5-21)
-            empleados_df = summary_df.iloc[4:21, [0, 1, 2]]  # ID, Nombre, Departamento
-            # Agregar horas requeridas y trabajadas de las columnas D y E
-            empleados_df['required_hours'] = summary_df.iloc[4:21, 3]  # Columna D
-            empleados_df['actual_hours'] = summary_df.iloc[4:21, 4]    # Columna E
-            # Agregar el resto de las columnas
-            empleados_df = pd.concat([
-                empleados_df,
-                summary_df.iloc[4:21, [5, 6, 7, 8, 13]]  # late_count hasta absences
-            ], axis=1)
-
-            print("\nDatos procesados de empleados:")
-            print(empleados_df.head())
-
-            empleados_df.columns = [
-                'employee_id', 'employee_name', 'department', 'required_hours',
-                'actual_hours', 'late_count', 'late_minutes', 'early_departure_count',
-                'early_departure_minutes', 'absences'
-            ]
+        except Exception as e:
+            logger.error("Error calculating PPP weekly hours: %s", e)
+            return {'Semana 1': 0, 'Semana 2': 0, 'Semana 3': 0, 'Semana 4': 0}, []
 
-            empleados_df = empleados_df.dropna(subset=['employee_name'])
-            empleados_df['employee_name'] = empleados_df['employee_name'].astype(str).apply(
-                lambda x: x.strip()
-            )
+    @_profiled
+    def calculate_ppp_weekly_hours(self, employee_name):
+        """Calculate weekly hours for a PPP employee (see get_all_ppp_weekly_hours)"""
+        return self.get_all_ppp_weekly_hours([employee_name])[employee_name]
 
-            numeric_cols = ['required_hours', 'actual_hours', 'late_count', 'late_minutes',
-                            'early_departure_count', 'early_departure_minutes']
-            for col in numeric_cols:
-                empleados_df[col] = pd.to_numeric(empleados_df[col], errors='coerce').fillna(0)
+    @_profiled
+    def get_all_ppp_weekly_hours(self, employee_names=None):
+        """Horas semanales de los empleados de medio turno en una sola pasada sobre el ledger.
 
-            # Convert absences to numeric, handling potential string values
-            def parse_absence(absence_str):
-                try:
-                    if pd.isna(absence_str) or str(absence_str).strip() == '':
-                        return 0
-                    return float(absence_str)
-                except:
-                    return 0
+        Los PPP marcan entrada y salida en las columnas de entrada y salida a
+        almorzar (B y D, Q y S, AF y AH). Los minutos trabajados por día salen de
+        restar esos arrays y se suman por semana de get_weeks_in_month ('Semana 1'
+        a 'Semana N'); se omiten fines de semana y ausencias. Por defecto calcula
+        todos los empleados cuyo horario tiene treat_as_ppp.
 
-            empleados_df['absences'] = empleados_df['absences'].apply(parse_absence)
+        Devuelve {empleado: (weekly_hours, weekly_details)}.
+        """
+        if employee_names is None:
+            employee_names = [name for name in self._ledger_positions
+                              if self.get_employee_schedule(name)['treat_as_ppp']]
+        employee_names = list(employee_names)
 
-            print("\nEmpleados disponibles:", empleados_df['employee_name'].tolist())
+        weeks = self.get_weeks_in_month()
+        week_labels = [f'Semana {number}' for number in range(1, len(weeks) + 1)]
+        results = {name: ({label: 0 for label in week_labels}, []) for name in employee_names}
 
-            return empleados_df
+        try:
+            positions = [self._ledger_positions[name] for name in employee_names if name in self._ledger_positions]
+            if not positions:
+                return results
+            records = self._ledger.iloc[np.concatenate(positions)]
+
+            missing = self.MISSING_MINUTES
+            day_str = records['day'].astype(str).str.strip()
+            day_lower = day_str.str.lower()
+            weekend = day_lower.str.contains('sa') | day_lower.str.contains('su')
+            day_num = pd.to_numeric(day_str.str.split().str[0], errors='coerce').to_numpy()
+            entry = records['entry_min'].to_numpy(dtype=np.int32)
+            exit_ = records['lunch_out_min'].to_numpy(dtype=np.int32)
+
+            # Los días anteriores al inicio de la primera semana (p.ej. el 1 si arranca el 2) van a la Semana 1
+            starts = np.array([start for start, _ in weeks])
+            week_index = np.clip(np.searchsorted(starts, np.nan_to_num(day_num, nan=-1), side='right') - 1, 0, None)
+            worked_day = ((~day_lower.str.contains('absence') & ~weekend).to_numpy() &
+                          (entry != missing) & (exit_ != missing) & (day_num >= 1))
+
+            worked = pd.DataFrame({
+                'employee': records['employee'].to_numpy()[worked_day],
+                'week': week_index[worked_day],
+                'day': day_str.to_numpy()[worked_day],
+                'entry': entry[worked_day],
+                'exit': exit_[worked_day]
+            })
+            worked['minutes'] = worked['exit'] - worked['entry']
+
+            totals = worked.groupby(['employee', 'week'], sort=False)['minutes'].sum()
+            for (employee_name, week), minutes in totals.items():
+                results[employee_name][0][week_labels[week]] = round(minutes / 60, 2)
+
+            for row in worked.itertuples(index=False):
+                hours, minutes = divmod(int(row.minutes), 60)
+                results[row.employee][1].append({
+                    'week': week_labels[row.week],
+                    'day': self.translate_day_abbreviation(row.day),
+                    'entry': f"{row.entry // 60:02d}:{row.entry % 60:02d}",
+                    'exit': f"{row.exit // 60:02d}:{row.exit % 60:02d}",
+                    'hours': f"{hours}h {minutes}m"
+                })
+            return results
 
         except Exception as e:
-            print(f"Error processing attendance summary: {str(e)}")
-            return pd.DataFrame(columns=[
-                'employee_id', 'employee_name', 'department', 'required_hours',
-                'actual_hours', 'late_count', 'late_minutes', 'early_departure_count',
-                'early_departure_minutes', 'absences'
-            ])
-    
+            logger.error("Error calculating PPP weekly hours: %s", e)
+            return {name: ({label: 0 for label in week_labels}, []) for name in employee_names}
+
     def get_employee_summary(self, employee_name):
         """Extracts summary data for a specific employee."""
         attendance_summary = self.process_attendance_summary()
@@ -2528,141 +1634,59 @@ class ExcelProcessor:
 
 
 
-    def calculate_valentina_absences(self, df):
-        """Calcula las ausencias de Valentina verificandosolo la columna AK"""
-        absences = 0
-        try:
-            absence_col = self.get_column_index('AK')
-            day_col = self.get_column_index('AE')
-
-            for row in range(11, 42):  # AK12 hasta AK42 (índices 11-41)
-                try:
-                    absence_value = df.iloc[row, absence_col]
-                    if not pd.isna(absence_value) and str(absence_value).strip().lower() == 'absence':
-                        absences += 1
-                except Exception as e:
-                    continue
-
-            return absences
-
-        except Exception as e:
-            print(f"Error calculando ausencias de Valentina: {str(e)}")
-            return 0
-
-    def calculate_soledad_absences(self, df):
-        """Calcula las ausencias de Soledad verificando solo la columna G"""
-        absences = 0
-        try:
-            for row in range(11, 42):  # Filas 12-42
-                try:
-                    absence_value = df.iloc[row, self.get_column_index('G')]
-                    if not pd.isna(absence_value) and str(absence_value).strip().lower() == 'absence':
-                        absences += 1
-                except Exception as e:
-                    continue
-        except Exception as e:
-            print(f"Error calculando ausencias de Soledad: {str(e)}")
-        return absences
-
+    @_profiled
     def get_weekly_attendance_data(self, employee_name):
-        """Calcula las estadísticas de asistencia semanal"""
+        """Calcula las estadísticas de asistencia semanal (semanas de lunes a domingo).
+
+        Las fechas salen del período de la hoja Summary y el número de día de cada
+        fila; las irregularidades, de las mismas máscaras que get_employee_stats.
+        """
         try:
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
+            period = self.get_period()
+            if period is None:
+                return {}
             weekly_stats = {}
 
-            for sheet in attendance_sheets:
-                df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-
-                employee_positions = [
-                    {'name_col': 'J', 'entry_col': 'B', 'exit_col': 'I', 'lunch_out': 'D', 'lunch_return': 'G', 'day_col': 'A'},
-                    {'name_col': 'Y', 'entry_col': 'Q', 'exit_col': 'X', 'lunch_out': 'S', 'lunch_return': 'V', 'day_col': 'P'},
-                    {'name_col': 'AN', 'entry_col': 'AF', 'exit_col': 'AM', 'lunch_out': 'AH', 'lunch_return': 'AK', 'day_col': 'AE'}
-                ]
-
-                for position in employee_positions:
-                    cols = {key: self.get_column_index(value) for key, value in position.items()}
-                    name_cell = df.iloc[2, cols['name_col']]
+            schedule = self.get_employee_schedule(employee_name)
+            rows = self._employee_rows(employee_name)
+            row_minutes = self._row_minutes(schedule, rows)
+            checks = [(row_minutes['late_mask'], 'late_days', 'Llegada tarde'),
+                      (row_minutes['lunch_mask'], 'lunch_overtime_days', 'Exceso almuerzo'),
+                      (row_minutes['early_mask'], 'early_departure_days', 'Salida temprana')]
 
-                    if pd.isna(name_cell) or str(name_cell).strip() != employee_name:
+            for i, day in enumerate(rows['day_lower']):
+                try:
+                    date = period[0].replace(day=int(day.split()[0]))
+                except (IndexError, ValueError):
+                    continue
+                week_start = date - timedelta(days=date.weekday())
+                week_key = week_start.strftime('%Y-%m-%d')
+
+                if week_key not in weekly_stats:
+                    weekly_stats[week_key] = {
+                        'total_days': 0,
+                        'present_days': 0,
+                        'late_days': 0,
+                        'lunch_overtime_days': 0,
+                        'early_departure_days': 0,
+                        'events': []
+                    }
+
+                if date.weekday() < 5:  # Solo días laborables
+                    week = weekly_stats[week_key]
+                    week['total_days'] += 1
+                    if rows['absent'][i]:
                         continue
-
-                    for row in range(11, 42):
-                        try:
-                            day_value = df.iloc[row, cols['day_col']]
-                            if pd.isna(day_value):
-                                continue
-
-                            try:
-                                date = pd.to_datetime(day_value)
-                                week_start = date - timedelta(days=date.weekday())
-                                week_key = week_start.strftime('%Y-%m-%d')
-
-                                if week_key not in weekly_stats:
-                                    weekly_stats[week_key] = {
-                                        'total_days': 0,
-                                        'present_days': 0,
-                                        'late_days': 0,
-                                        'lunch_overtime_days': 0,
-                                        'early_departure_days': 0,
-                                        'events': []
-                                    }
-
-                                if date.weekday() < 5:  # Solo días laborables
-                                    weekly_stats[week_key]['total_days'] += 1
-
-                                    day_str = str(day_value).strip().lower()
-                                    if day_str != 'absence':
-                                        weekly_stats[week_key]['present_days'] += 1
-
-                                        # Verificar llegada tarde
-                                        entry_time = df.iloc[row, cols['entry_col']]
-                                        if not pd.isna(entry_time):
-                                            entry_time = pd.to_datetime(entry_time).time()
-                                            if entry_time > self.WORK_START_TIME:
-                                                weekly_stats[week_key]['late_days'] += 1
-                                                weekly_stats[week_key]['events'].append(
-                                                    f"{date.strftime('%d/%m')}: Llegada tarde"
-                                                )
-
-                                        # Verificar exceso en almuerzo
-                                        lunch_out = df.iloc[row, cols['lunch_out']]
-                                        lunch_return = df.iloc[row, cols['lunch_return']]
-                                        if not pd.isna(lunch_out) and not pd.isna(lunch_return):
-                                            lunch_out = pd.to_datetime(lunch_out).time()
-                                            lunch_return = pd.to_datetime(lunch_return).time()
-                                            lunch_minutes = (
-                                                datetime.combine(datetime.min, lunch_return) -
-                                                datetime.combine(datetime.min, lunch_out)
-                                            ).total_seconds() / 60
-                                            if lunch_minutes > self.LUNCH_TIME_LIMIT:
-                                                weekly_stats[week_key]['lunch_overtime_days'] += 1
-                                                weekly_stats[week_key]['events'].append(
-                                                    f"{date.strftime('%d/%m')}: Exceso almuerzo"
-                                                )
-
-                                        # Verificar salida temprana
-                                        exit_time = df.iloc[row, cols['exit_col']]
-                                        if not pd.isna(exit_time):
-                                            exit_time = pd.to_datetime(exit_time).time()
-                                            if self.is_early_departure(employee_name, exit_time):
-                                                weekly_stats[week_key]['early_departure_days'] += 1
-                                                weekly_stats[week_key]['events'].append(
-                                                    f"{date.strftime('%d/%m')}: Salida temprana"
-                                                )
-
-                            except Exception as e:
-                                print(f"Error procesando fecha en fila {row+1}: {str(e)}")
-                                continue
-
-                        except Exception as e:
-                            print(f"Error en fila {row+1}: {str(e)}")
-                            continue
+                    week['present_days'] += 1
+                    for mask, field, event in checks:
+                        if mask[i]:
+                            week[field] += 1
+                            week['events'].append(f"{date.strftime('%d/%m')}: {event}")
 
             return weekly_stats
 
         except Exception as e:
-            print(f"Error procesando estadísticas semanales: {str(e)}")
+            logger.error("Error procesando estadísticas semanales: %s", e)
             return {}
 
     def create_weekly_attendance_chart(self, employee_name):
@@ -2731,166 +1755,67 @@ class ExcelProcessor:
 
         return fig
 
+    @_profiled
     def get_employee_daily_data(self, employee_name):
         """Gets daily attendance data for an employee"""
         try:
             daily_data = []
-
-            # Determine which sheets to process
-            if employee_name.lower() in self.SPECIAL_SCHEDULES:
-                schedule = self.SPECIAL_SCHEDULES[employee_name.lower()]
-                attendance_sheets = [schedule['sheet_name']]
-            else:
-                exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-                attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
-
-            for sheet in attendance_sheets:
-                try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-
-                    # Define standard positions for regular employees
-                    positions = [
-                        {'name_col': 'J', 'entry_col': 'B', 'exit_col': 'I', 'day_col': 'A'},  # First person
-                        {'name_col': 'Y', 'entry_col': 'Q', 'exit_col': 'X', 'day_col': 'P'},  # Second person
-                        {'name_col': 'AN', 'entry_col': 'AF', 'exit_col': 'AM', 'day_col': 'AE'}  # Third person
-                    ]
-
-                    # Check if employee has special position configuration
-                    if employee_name.lower() in self.SPECIAL_SCHEDULES:
-                        schedule = self.SPECIAL_SCHEDULES[employee_name.lower()]
-                        if 'position' in schedule:
-                            positions = [schedule['position']]
-
-                    for position in positions:
-                        try:
-                            name_col = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col]
-
-                            if pd.isna(name_cell):
-                                continue
-
-                            if str(name_cell).strip() == employee_name:
-                                entry_col = self.get_column_index(position['entry_col'])
-                                exit_col = self.get_column_index(position['exit_col'])
-                                day_col = self.get_column_index(position['day_col'])
-
-                                # Process each day's data
-                                for row in range(11, 42):  # Rows 12-42
-                                    try:
-                                        day_value = df.iloc[row, day_col]
-                                        if pd.isna(day_value):
-                                            continue
-
-                                        day_str = str(day_value).strip()
-                                        if day_str == '' or day_str.lower() == 'absence':
-                                            continue
-
-                                        # Get entry and exit times
-                                        entry_time = df.iloc[row, entry_col]
-                                        exit_time = df.iloc[row, exit_col]
-
-                                        if not pd.isna(entry_time) and not pd.isna(exit_time):
-                                            try:
-                                                # Convert to datetime
-                                                entry_time = pd.to_datetime(entry_time).time()
-                                                exit_time = pd.to_datetime(exit_time).time()
-
-                                                # Calculate hours worked
-                                                hours = (
-                                                    datetime.combine(datetime.min, exit_time) -
-                                                    datetime.combine(datetime.min, entry_time)
-                                                ).total_seconds() / 3600
-
-                                                if hours > 0:
-                                                    daily_data.append({
-                                                        'date': day_str,
-                                                        'hours': hours,
-                                                        'entry': entry_time.strftime('%H:%M'),
-                                                        'exit': exit_time.strftime('%H:%M')
-                                                    })
-
-                                            except Exception as e:
-                                                print(f"Error processing times in row {row+1}: {str(e)}")
-                                                continue
-
-                                    except Exception as e:
-                                        print(f"Error processing row {row+1}: {str(e)}")
-                                        continue
-
-                        except Exception as e:
-                            print(f"Error processing position: {str(e)}")
-                            continue
-
-                except Exception as e:
-                    print(f"Error processing sheet {sheet}: {str(e)}")
-                    continue
+            records = self._get_employee_ledger(employee_name)
+            schedule = self.get_employee_schedule(employee_name)
+            entry_field, exit_field = 'entry', 'exit'
+
+            # Schedules with a scope are limited to their configured sheet and block
+            scope = schedule['scope']
+            if scope:
+                records = records[(records['sheet'] == scope['sheet']) & (records['block'] == scope['block'])]
+                entry_field, exit_field = scope['entry_field'], scope['exit_field']
+
+            rows = self._prepare_rows(records, schedule)
+            missing = self.MISSING_MINUTES
+            entry, exit_ = rows[f"{entry_field}_min"], rows[f"{exit_field}_min"]
+            day_str = [day.strip() for day in rows['day_raw']]
+            worked = ((entry != missing) & (exit_ != missing) & (exit_ > entry) &
+                      np.array([day != '' and day != 'absence' for day in rows['day_lower']], dtype=bool))
+            for i in np.flatnonzero(worked):
+                daily_data.append({
+                    'date': day_str[i],
+                    'hours': (exit_[i] - entry[i]) / 60,
+                    'entry': f"{entry[i] // 60:02d}:{entry[i] % 60:02d}",
+                    'exit': f"{exit_[i] // 60:02d}:{exit_[i] % 60:02d}"
+                })
 
             # Sort data by date
             daily_data.sort(key=lambda x: x['date'])
             return daily_data
         except Exception as e:
-            print(f"Error getting daily data: {str(e)}")
+            logger.error("Error getting daily data: %s", e)
             return []
 
+    @_profiled
     def get_absence_days(self, employee_name):
         """Returns a list of days when the employee was absent"""
         try:
+            trace = logger.isEnabledFor(TRACE)
             absence_days = []
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index+1:]  # Start after Exceptional
-
-            # Define the three possible positions
-            positions = [
-                {'name_col': 'J', 'day_col': 'A', 'absence_col': 'G'},
-                {'name_col': 'Y', 'day_col': 'P', 'absence_col': 'V'},
-                {'name_col': 'AN', 'day_col': 'AE', 'absence_col': 'AK'}
-            ]
 
-            for sheet in attendance_sheets:
+            # La columna de ausencia (G, V o AK) ya viene marcada en el ledger
+            records = self._get_employee_ledger(employee_name)
+            for record in records[records['absence']].itertuples(index=False):
                 try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-
-                    # Check each possible position
-                    for position in positions:
-                        try:
-                            # Check if employee name matches in the correct position (row 3)
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]  # Row 3 (index 2)
-
-                            if pd.isna(name_cell) or str(name_cell).strip() != employee_name:
-                                continue
-
-                            # If name matches, check for absences
-                            day_col = self.get_column_index(position['day_col'])
-                            absence_col = self.get_column_index(position['absence_col'])
-
-                            for row in range(11, 42):  # Check rows 12-42
-                                try:
-                                    absence_value = df.iloc[row, absence_col]
-                                    if not pd.isna(absence_value) and str(absence_value).strip().lower() == 'absence':
-                                        day_value = df.iloc[row, day_col]
-                                        if not pd.isna(day_value):
-                                            # Translate the day abbreviation to Spanish full name
-                                            day_str = self.translate_day_abbreviation(str(day_value))
-                                            print(f"Ausencia encontrada en hoja {sheet}, fila {row+1}, día: {day_str}")
-                                            absence_days.append(day_str)
-                                except Exception as e:
-                                    print(f"Error processing row {row+1}: {str(e)}")
-                                    continue
-
-                        except Exception as e:
-                            print(f"Error checking position {position['name_col']}: {str(e)}")
-                            continue
-
+                    # Translate the day abbreviation to Spanish full name
+                    day_str = self.translate_day_abbreviation(str(record.day))
+                    if trace:
+                        logger.log(TRACE, "Ausencia encontrada en hoja %s, fila %s, día: %s", record.sheet, record.row+1, day_str)
+                    absence_days.append(day_str)
                 except Exception as e:
-                    print(f"Error processing sheet {sheet}: {str(e)}")
+                    self._add_diagnostic('get_absence_days', "Error processing", record.sheet, record.row + 1, e)
                     continue
 
-            print(f"Total ausencias encontradas: {len(absence_days)}")
+            logger.debug("Total ausencias encontradas: %s", len(absence_days))
             return absence_days
 
         except Exception as e:
-            print(f"Error getting absence days: {str(e)}")
+            logger.error("Error getting absence days: %s", e)
             return []
 
     def translate_day_abbreviation(self, day_str):
@@ -2919,338 +1844,64 @@ class ExcelProcessor:
         return day_str  # Return original if can't translate
 
     def get_late_days(self, employee_name):
-        """Returns a list of days when the employee arrived late"""
+        """Returns a list of days when the employee arrived late and the total late minutes"""
         try:
-            late_days = []
-            total_late_minutes = 0
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index:]
+            rows = self._employee_rows(employee_name)
+            row_minutes = self._row_minutes(self.get_employee_schedule(employee_name), rows)
+            late_days = [rows['late_labels'][i] for i in np.flatnonzero(row_minutes['late_mask'])]
+            total_late_minutes = float(np.sum(row_minutes['late_minutes']))
 
-            for sheet in attendance_sheets:
-                try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-
-                    # Definir las tres posibles posiciones del empleado
-                    positions = [
-                        {'name_col': 'J', 'entry_col': 'B', 'day_col': 'A'},  # Primera persona
-                        {'name_col': 'Y', 'entry_col': 'Q', 'day_col': 'P'},  # Segunda persona
-                        {'name_col': 'AN', 'entry_col': 'AF', 'day_col': 'AE'}  # Tercera persona
-                    ]
-
-                    for position in positions:
-                        try:
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
-
-                            if pd.isna(name_cell) or str(name_cell).strip() != employee_name:
-                                continue
-
-                            print(f"Empleado encontrado en hoja {sheet}, columna {position['name_col']}")
-
-                            entry_col = self.get_column_index(position['entry_col'])
-                            day_col = self.get_column_index(position['day_col'])
-
-                            for row in range(11, 42):  # Filas 12 a 42
-                                try:
-                                    day_value = df.iloc[row, day_col]
-                                    if pd.isna(day_value):
-                                        continue
-
-                                    day_str = str(day_value).strip()
-                                    if day_str == '' or any(abbr in day_str.lower() for abbr in ['sa', 'su']):
-                                        continue
-
-                                    entry_time = df.iloc[row, entry_col]
-                                    if not pd.isna(entry_time):
-                                        try:
-                                            # Convertir a datetime
-                                            if isinstance(entry_time, str):
-                                                entry_time = pd.to_datetime(entry_time).time()
-                                            elif isinstance(entry_time, datetime):
-                                                entry_time = entry_time.time()
-                                            else:
-                                                print(f"Formato de hora no reconocido en fila {row+1}")
-                                                continue
-
-                                            # Verificar si llegó tarde
-                                            if entry_time > self.WORK_START_TIME:
-                                                late_minutes = (
-                                                    datetime.combine(datetime.min, entry_time) -
-                                                    datetime.combine(datetime.min, self.WORK_START_TIME)
-                                                ).total_seconds() / 60
-                                                total_late_minutes += late_minutes
-
-                                                formatted_day = self.translate_day_abbreviation(day_str)
-                                                late_days.append(formatted_day)
-                                                print(f"Llegada tarde en fila {row+1}: {late_minutes:.0f} minutos (hora: {entry_time}), Dia: {formatted_day}")
-
-                                        except Exception as e:
-                                            print(f"Error procesando hora de entrada en fila {row+1}: {str(e)}")
-                                    else:
-                                        print(f"Sin registro de entrada en fila {row+1}")
-
-                                except Exception as e:
-                                    print(f"Error en fila {row+1}: {str(e)}")
-
-                        except Exception as e:
-                            print(f"Error procesando posición: {str(e)}")
-
-                except Exception as e:
-                    print(f"Error procesando hoja {sheet}: {str(e)}")
-
-            print(f"Total días de llegada tarde: {len(late_days)}")
-            print(f"Total minutos de tardanza: {total_late_minutes:.0f}")
+            logger.debug("Total días de llegada tarde: %s", len(late_days))
+            logger.debug("Total minutos de tardanza: %.0f", total_late_minutes)
             return late_days, total_late_minutes
 
         except Exception as e:
-            print(f"Error general: {str(e)}")
+            logger.error("Error general: %s", e)
             return [], 0
 
     def get_early_departure_days(self, employee_name):
-        """Returns a list of days when the employee left early"""
+        """Returns a list of days when the employee left early and the total early minutes"""
         try:
-            early_departure_days = []
-            total_early_minutes = 0
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index+1:]
-
-            positions = [
-                {'name_col': 'J', 'day_col': 'A', 'exit_col': 'I'},
-                {'name_col': 'Y', 'day_col': 'P', 'exit_col': 'X'},
-                {'name_col': 'AN', 'day_col': 'AE', 'exit_col': 'AM'}
-            ]
-
-            for sheet in attendance_sheets:
-                try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-
-                    for position in positions:
-                        try:
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
-
-                            if pd.isna(name_cell) or str(name_cell).strip() != employee_name:
-                                continue
-
-                            day_col = self.get_column_index(position['day_col'])
-                            exit_col = self.get_column_index(position['exit_col'])
-
-                            for row in range(11, 42):  # Check rows 12-42
-                                try:
-                                    day_value = df.iloc[row, day_col]
-                                    exit_time = df.iloc[row, exit_col]
-
-                                    if not pd.isna(day_value) and not pd.isna(exit_time):
-                                        # Skip weekends
-                                        day_str = str(day_value).strip()
-                                        if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
-                                            continue
-
-                                        exit_time = pd.to_datetime(exit_time).time()
-                                        if self.is_early_departure(employee_name, exit_time):
-                                            # Calculate early minutes
-                                            early_minutes = (
-                                                datetime.combine(datetime.min, self.WORK_END_TIME) -
-                                                datetime.combine(datetime.min, exit_time)
-                                            ).total_seconds() / 60
-                                            total_early_minutes += early_minutes
-
-                                            # Translate the day to Spanish format
-                                            formatted_day = self.translate_day_abbreviation(day_str)
-                                            print(f"Salida temprana en hoja {sheet}, fila {row+1}, día: {formatted_day} ({early_minutes:.0f} minutos)")
-                                            early_departure_days.append(formatted_day)
-
-                                except Exception as e:
-                                    print(f"Error processing row {row+1}: {str(e)}")
-                                    continue
-
-                        except Exception as e:
-                            print(f"Error checking position {position['name_col']}: {str(e)}")
-                            continue
-
-                except Exception as e:
-                    print(f"Error processing sheet {sheet}: {str(e)}")
-                    continue
+            rows = self._employee_rows(employee_name)
+            row_minutes = self._row_minutes(self.get_employee_schedule(employee_name), rows)
+            early_departure_days = [rows['labels'][i] for i in np.flatnonzero(row_minutes['early_mask'])]
+            total_early_minutes = float(np.sum(row_minutes['early_minutes']))
 
-            print(f"Total días con salida temprana: {len(early_departure_days)}")
-            print(f"Total minutos de salida temprana: {total_early_minutes:.0f}")
+            logger.debug("Total días con salida temprana: %s", len(early_departure_days))
+            logger.debug("Total minutos de salida temprana: %.0f", total_early_minutes)
             return early_departure_days, total_early_minutes
 
         except Exception as e:
-            print(f"Error getting early departure days: {str(e)}")
+            logger.error("Error getting early departure days: %s", e)
             return [], 0
 
     def get_mid_day_departures(self, employee_name):
-        """Returns count of mid-day departures"""
+        """Returns count of mid-day departures (weekdays with an entry but no exit)"""
         try:
-            mid_day_departures = 0
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index+1:]
-
-            positions = [
-                {'name_col': 'J', 'day_col': 'A', 'exit_col': 'I', 'entry_col': 'B'},
-                {'name_col': 'Y', 'day_col': 'P', 'exit_col': 'X', 'entry_col': 'Q'},
-                {'name_col': 'AN', 'day_col': 'AE', 'exit_col': 'AM', 'entry_col': 'AF'}
-            ]
-
-            for sheet in attendance_sheets:
-                try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-
-                    for position in positions:
-                        try:
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
-
-                            if pd.isna(name_cell) or str(name_cell).strip() != employee_name:
-                                continue
-
-                            # If name matches, check for mid-day departures
-                            day_col = self.get_column_index(position['day_col'])
-                            exit_col = self.get_column_index(position['exit_col'])
-                            entry_col = self.get_column_index(position['entry_col'])
-
-                            for row in range(11, 42):  # Check rows 12-42
-                                try:
-                                    day_value = df.iloc[row, day_col]
-                                    entry_time = df.iloc[row, entry_col]
-                                    exit_time = df.iloc[row, exit_col]
-
-                                    if not pd.isna(day_value):
-                                        # Skip weekends
-                                        day_str = str(day_value).strip()
-                                        if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
-                                            continue
-
-                                        # Check if there's an entry but no exit
-                                        if not pd.isna(entry_time) and pd.isna(exit_time):
-                                            mid_day_departures += 1
-                                            print(f"Salida durante horario en hoja {sheet}, fila {row+1}, día: {self.translate_day_abbreviation(day_str)}")
-
-                                except Exception as e:
-                                    print(f"Error processing row {row+1}: {str(e)}")
-                                    continue
-
-                        except Exception as e:
-                            print(f"Error checking position {position['name_col']}: {str(e)}")
-                            continue
-
-                except Exception as e:
-                    print(f"Error processing sheet {sheet}: {str(e)}")
-                    continue
-
-            print(f"Total salidas durante horario: {mid_day_departures}")
+            rows = self._employee_rows(employee_name)
+            mid_day_departures = int(np.sum(rows['weekday'] & ~rows['entry_na'] & rows['exit_na']))
+            logger.debug("Total salidas durante horario: %s", mid_day_departures)
             return mid_day_departures
 
         except Exception as e:
-            print(f"Error getting mid-day departures: {str(e)}")
+            logger.error("Error getting mid-day departures: %s", e)
             return 0
 
     def get_lunch_overtime_days(self, employee_name):
         """Returns a list of days when the employee exceeded lunch time"""
         try:
-            lunch_overtime_days = []
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index+1:]  # Start after Exceptional
-
-            # Si es Valentina, Agustín o Soledad, retornar lista vacía ya que no tienen almuerzo
-            if employee_name.lower() in ['valentina al', 'agustin taba', 'soledad silv']:
-                print(f"{employee_name} no tiene horario de almuerzo")
-                return lunch_overtime_days
-
-            # Define the three possible positions
-            positions = [
-                {
-                    'name_col': 'J',
-                    'day_col': 'A',
-                    'lunch_out': 'D',
-                    'lunch_return': 'G'
-                },
-                {
-                    'name_col': 'Y',
-                    'day_col': 'P',
-                    'lunch_out': 'S',
-                    'lunch_return': 'V'
-                },
-                {
-                    'name_col': 'AN',
-                    'day_col': 'AE',
-                    'lunch_out': 'AH',
-                    'lunch_return': 'AK'
-                }
-            ]
-
-            for sheet in attendance_sheets:
-                try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-
-                    # Check each possible position
-                    for position in positions:
-                        try:
-                            # Check if employee name matches in the correct position (row 3)
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
-
-                            if pd.isna(name_cell) or str(name_cell).strip() != employee_name:
-                                continue
-
-                            # If name matches, check for lunch overtime
-                            day_col = self.get_column_index(position['day_col'])
-                            lunch_out_col = self.get_column_index(position['lunch_out'])
-                            lunch_return_col = self.get_column_index(position['lunch_return'])
-
-                            for row in range(11, 42):  # Check rows 12-42
-                                try:
-                                    day_value = df.iloc[row, day_col]
-                                    lunch_out = df.iloc[row, lunch_out_col]
-                                    lunch_return = df.iloc[row, lunch_return_col]
-
-                                    if not pd.isna(day_value):
-                                        # Skip weekends
-                                        day_str = str(day_value).strip()
-                                        if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
-                                            continue
-
-                                        # Only process if both lunch times exist
-                                        if not pd.isna(lunch_out) and not pd.isna(lunch_return):
-                                            try:
-                                                lunch_out_time = pd.to_datetime(lunch_out).time()
-                                                lunch_return_time = pd.to_datetime(lunch_return).time()
-
-                                                lunch_minutes = (
-                                                    datetime.combine(datetime.min, lunch_return_time) -
-                                                    datetime.combine(datetime.min, lunch_out_time)
-                                                ).total_seconds() / 60
-
-                                                if lunch_minutes > self.LUNCH_TIME_LIMIT:
-                                                    # Translate the day to Spanish format
-                                                    formatted_day = self.translate_day_abbreviation(day_str)
-                                                    print(f"Exceso de almuerzo en hoja {sheet}, fila {row+1}, día: {formatted_day} ({lunch_minutes:.0f} minutos)")
-                                                    lunch_overtime_days.append(formatted_day)
-
-                                            except Exception as e:
-                                                print(f"Error processing lunch times in row {row+1}: {str(e)}")
-                                                continue
-
-                                except Exception as e:
-                                    print(f"Error processing row {row+1}: {str(e)}")
-                                    continue
-
-                        except Exception as e:
-                            print(f"Error checking position {position['name_col']}: {str(e)}")
-                            continue
-
-                except Exception as e:
-                    print(f"Error processing sheet {sheet}: {str(e)}")
-                    continue
-
-            print(f"Total días con exceso de almuerzo: {len(lunch_overtime_days)}")
+            # Empleados sin horario de almuerzo (Agustín, Soledad, PPP): _row_minutes no marca ningún día
+            rows = self._employee_rows(employee_name)
+            row_minutes = self._row_minutes(self.get_employee_schedule(employee_name), rows)
+            lunch_overtime_days = [rows['labels'][i] for i in np.flatnonzero(row_minutes['lunch_mask'])]
+            logger.debug("Total días con exceso de almuerzo: %s", len(lunch_overtime_days))
             return lunch_overtime_days
 
         except Exception as e:
-            print(f"Error getting lunch overtime days: {str(e)}")
+            logger.error("Error getting lunch overtime days: %s", e)
             return []
 
+    @_profiled
     def export_to_csv(self, employee_name, filepath):
         """Export employee performance data to CSV"""
         try:
@@ -3295,9 +1946,10 @@ class ExcelProcessor:
             return True
 
         except Exception as e:
-            print(f"Error exporting to CSV: {str(e)}")
+            logger.error("Error exporting to CSV: %s", e)
             return False
 
+    @_profiled
     def export_to_pdf(self, employee_name, filepath):
         """Export employee performance data to PDF"""
         try:
@@ -3342,7 +1994,7 @@ class ExcelProcessor:
             ]
 
             for metric, value, unit in metrics:
-                pdf.multi_cell(0, 8, f"{metric}: {value} {unit}")
+                pdf.multi_cell(0, 8, f"{metric}: {value} {unit}", new_x="LMARGIN", new_y="NEXT")
 
             pdf.ln(5)
             pdf.set_font('Arial', 'B', 12)
@@ -3350,18 +2002,20 @@ class ExcelProcessor:
             pdf.set_font('Arial', '', 12)
 
             if absence_days:
-                pdf.multi_cell(0, 8, f"Días de Ausencia: {', '.join(absence_days)}")
+                pdf.multi_cell(0, 8, f"Días de Ausencia: {', '.join(absence_days)}", new_x="LMARGIN", new_y="NEXT")
             if late_days:
-                pdf.multi_cell(0, 8, f"Días de Llegada Tarde: {', '.join(late_days)}")
+                pdf.multi_cell(0, 8, f"Días de Llegada Tarde: {', '.join(late_days)}", new_x="LMARGIN", new_y="NEXT")
             if early_departure_days:
-                pdf.multi_cell(0, 8, f"Días de Salida Anticipada: {', '.join(early_departure_days)}")
-            pdf.multi_cell(0, 8, f"Días con Exceso de Almuerzo: {self.format_lunch_overtime_text(lunch_overtime_days)}")
+                pdf.multi_cell(0, 8, f"Días de Salida Anticipada: {', '.join(early_departure_days)}", new_x="LMARGIN", new_y="NEXT")
+            # The core PDF fonts are latin-1 only, so the UI bullet becomes a dash
+            lunch_text = self.format_lunch_overtime_text(lunch_overtime_days).replace("•", "-")
+            pdf.multi_cell(0, 8, f"Días con Exceso de Almuerzo: {lunch_text}", new_x="LMARGIN", new_y="NEXT")
 
             pdf.output(filepath)
             return True
 
         except Exception as e:
-            print(f"Error exporting to PDF: {str(e)}")
+            logger.error("Error exporting to PDF: %s", e)
             return False
 
     def organize_days_by_week(self, days):
@@ -3394,7 +2048,7 @@ class ExcelProcessor:
                     week.sort(key=lambda x: int(x.split()[0]))
 
             except (ValueError, IndexError) as e:
-                print(f"Error processing day {day}: {str(e)}")
+                logger.error("Error processing day %s: %s", day, e)
                 continue
 
         return weeks
@@ -3423,7 +2077,7 @@ class ExcelProcessor:
                     elif 22 <= day_num <= 31:
                         weeks_dict['Semana 4'].append(day)
             except (ValueError, IndexError) as e:
-                print(f"Error processing day {day}: {str(e)}")
+                logger.error("Error processing day %s: %s", day, e)
                 continue
 
         # Sort days within each week by day number
@@ -3449,63 +2103,27 @@ class ExcelProcessor:
             weeks_dict = {f'Semana {i}': [] for i in range(1, 5)}
             total_days = 0
 
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
-            attendance_sheets = self.excel_file.sheet_names[exceptional_index+1:]
-
-            positions = [
-                {'name_col': 'J', 'day_col': 'A', 'exit_col': 'I', 'entry_col': 'B'},
-                {'name_col': 'Y', 'day_col': 'P', 'exit_col': 'X', 'entry_col': 'Q'},
-                {'name_col': 'AN', 'day_col': 'AE', 'exit_col': 'AM', 'entry_col': 'AF'}
-            ]
-
             # Collect all mid-day departure days
-            for sheet in attendance_sheets:
+            for record in self._get_employee_ledger(employee_name).itertuples(index=False):
                 try:
-                    df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-
-                    for position in positions:
-                        try:
-                            name_col_index = self.get_column_index(position['name_col'])
-                            name_cell = df.iloc[2, name_col_index]
-
-                            if pd.isna(name_cell) or str(name_cell).strip() != employee_name:
-                                continue
-
-                            day_col = self.get_column_index(position['day_col'])
-                            exit_col = self.get_column_index(position['exit_col'])
-                            entry_col = self.get_column_index(position['entry_col'])
-
-                            for row in range(11, 42):
-                                try:
-                                    day_value = df.iloc[row, day_col]
-                                    entry_time = df.iloc[row, entry_col]
-                                    exit_time = df.iloc[row, exit_col]
-
-                                    if not pd.isna(day_value):
-                                        day_str = str(day_value).strip()
-                                        if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
-                                            continue
-
-                                        if not pd.isna(entry_time) and pd.isna(exit_time):
-                                            formatted_day = self.translate_day_abbreviation(day_str)
-                                            day_num = int(formatted_day.split()[0])
-                                            total_days += 1
-
-                                            # Add to appropriate week
-                                            if 1 <= day_num <= 7:
-                                                weeks_dict['Semana 1'].append(formatted_day)
-                                            elif 8 <= day_num <= 14:
-                                                weeks_dict['Semana 2'].append(formatted_day)
-                                            elif 15 <= day_num <= 21:
-                                                weeks_dict['Semana 3'].append(formatted_day)
-                                            elif 22 <= day_num <= 31:
-                                                weeks_dict['Semana 4'].append(formatted_day)
-
-                                except Exception as e:
-                                    continue
+                    day_str = str(record.day).strip()
+                    if any(abbr in day_str.lower() for abbr in ['sa', 'su']):
+                        continue
 
-                        except Exception as e:
-                            continue
+                    if not pd.isna(record.entry) and pd.isna(record.exit):
+                        formatted_day = self.translate_day_abbreviation(day_str)
+                        day_num = int(formatted_day.split()[0])
+                        total_days += 1
+
+                        # Add to appropriate week
+                        if 1 <= day_num <= 7:
+                            weeks_dict['Semana 1'].append(formatted_day)
+                        elif 8 <= day_num <= 14:
+                            weeks_dict['Semana 2'].append(formatted_day)
+                        elif 15 <= day_num <= 21:
+                            weeks_dict['Semana 3'].append(formatted_day)
+                        elif 22 <= day_num <= 31:
+                            weeks_dict['Semana 4'].append(formatted_day)
 
                 except Exception as e:
                     continue
@@ -3526,21 +2144,23 @@ class ExcelProcessor:
             return total_days, hover_text
 
         except Exception as e:
-            print(f"Error formatting mid-day departures text: {str(e)}")
+            logger.error("Error formatting mid-day departures text: %s", e)
             return 0, "No hay días registrados"
             
+    @_profiled
     def process_attendance_summary(self):
         """Process the Summary sheet to get employee information"""
         try:
-            print("Leyendo hoja Summary...")
-            df = pd.read_excel(self.excel_file, sheet_name='Summary', header=None)
+            logger.debug("Leyendo hoja Summary...")
+            df = self._get_sheet_data('Summary')
             
             # Start from row 5 (index 4) which contains the actual data
             data_start_row = 4
             
-            # Print the data being processed for debugging
-            print("\nDatos procesados de empleados:")
-            print(df.iloc[data_start_row:, [0, 1, 2, 3, 4, 5, 6, 7, 8, 13]].to_string())
+            # Log the data being processed for debugging (to_string only when DEBUG is enabled)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Datos procesados de empleados:\n%s",
+                             df.iloc[data_start_row:, [0, 1, 2, 3, 4, 5, 6, 7, 8, 13]].to_string())
             
             # Create a DataFrame with employee information
             employee_data = []
@@ -3562,23 +2182,11 @@ class ExcelProcessor:
             # Convert to DataFrame
             summary_df = pd.DataFrame(employee_data)
             
-            # Get all employees from all sheets after 'Exceptional'
-            exceptional_index = self.excel_file.sheet_names.index('Exceptional')
+            # Get all employees from all sheets after 'Exceptional' (J3, Y3, AN3)
             additional_employees = set()
-            
-            for sheet in self.excel_file.sheet_names[exceptional_index:]:
-                df = pd.read_excel(self.excel_file, sheet_name=sheet, header=None)
-                
-                # Check each position (J3, Y3, AN3)
-                for col in ['J', 'Y', 'AN']:
-                    try:
-                        name = df.iloc[2, self.get_column_index(col)]
-                        if not pd.isna(name):
-                            employee_name = str(name).strip()
-                            if employee_name.lower() != 'early leave (mm)':  # Skip the unwanted entry
-                                additional_employees.add(employee_name)
-                    except:
-                        continue
+            for employee_name in self._employee_locations:
+                if employee_name.lower() != 'early leave (mm)':  # Skip the unwanted entry
+                    additional_employees.add(employee_name)
             
             # Add any employees found in other sheets that weren't in Summary
             for name in additional_employees:
@@ -3591,18 +2199,31 @@ class ExcelProcessor:
                         'actual_hours': 0.0
                     }])], ignore_index=True)
             
-            print("\nEmpleados disponibles:", sorted(summary_df['employee_name'].tolist()))
+            logger.debug("Empleados disponibles: %s", sorted(summary_df['employee_name'].tolist()))
             
             return summary_df
             
         except Exception as e:
-            print(f"Error processing Summary sheet: {str(e)}")
+            logger.error("Error processing Summary sheet: %s", e)
             # Return an empty DataFrame with the required columns if there's an error
             return pd.DataFrame(columns=['employee_id', 'employee_name', 'department', 'required_hours', 'actual_hours'])
 
+    @_profiled
     def get_employee_stats(self, employee_name):
-        """Get comprehensive statistics for a specific employee"""
-        # Regular stats
+        """Get comprehensive statistics for a specific employee (cached per employee)"""
+        with self._lock:
+            stats = self._stats_cache.get(employee_name)
+            if stats is None:
+                stats = self._compute_employee_stats(employee_name, self._employee_rows(employee_name))
+                self._stats_cache[employee_name] = stats
+            return stats
+
+    def _reference_employee_stats(self, employee_name):
+        """Arma el dict de get_employee_stats con los métodos count_* fila por fila.
+
+        Es la implementación original, más lenta; se mantiene como referencia
+        para benchmarks/golden.py, que la compara con el motor vectorizado.
+        """
         late_days, late_minutes = self.count_late_days(employee_name)
         late_arrivals, late_arrival_minutes = self.count_late_arrivals_after_810(employee_name)
         early_departure_days, early_minutes = self.count_early_departures(employee_name)
@@ -3611,23 +2232,327 @@ class ExcelProcessor:
         absence_days = self.get_absence_days(employee_name)
         absences = len(absence_days) if absence_days else 0
         mid_day_departures, mid_day_departures_text = self.count_mid_day_departures(employee_name)
-        overtime_minutes = 0
-        overtime_days = []
+        overtime_minutes, overtime_days = self._reference_overtime(employee_name)
+        is_ppp = self.get_employee_schedule(employee_name)['treat_as_ppp']
+
+        # Get department
+        department = ""
+        try:
+            department = self.get_employee_department(employee_name)
+        except Exception as e:
+            logger.error("Error getting department: %s", e)
+
+        # Calculate actual hours differently for PPP employees
+        if is_ppp:
+            weekly_hours, weekly_details = self._reference_ppp_weekly_hours(employee_name)
+            actual_hours = sum(weekly_hours.values())
+            required_hours = 80.0  # Estándar mensual para PPP
+        else:
+            required_hours = 76.40  # Estándar regular
+            actual_hours = required_hours - (absences * 8)  # Subtract 8 hours for each absence
+
+        stats = {
+            'name': employee_name,
+            'department': department,
+            'absences': absences,
+            'absence_days': absence_days,
+            'late_days': late_days,
+            'late_minutes': late_minutes,
+            'late_arrivals': late_arrivals,
+            'late_arrival_minutes': late_arrival_minutes,
+            'early_departure_days': early_departure_days,
+            'early_minutes': early_minutes,
+            'lunch_overtime_days': lunch_overtime_days,
+            'total_lunch_minutes': total_lunch_minutes,
+            'missing_entry_days': missing_entry_days,
+            'missing_exit_days': missing_exit_days,
+            'missing_lunch_days': missing_lunch_days,
+            'required_hours': required_hours,
+            'actual_hours': actual_hours,
+            'mid_day_departures': mid_day_departures,
+            'mid_day_departures_text': mid_day_departures_text,
+            'overtime_minutes': overtime_minutes,
+            'overtime_days': overtime_days
+        }
+
+        if is_ppp:
+            stats['weekly_hours'] = weekly_hours
+            stats['weekly_details'] = weekly_details
+
+        return stats
 
-        # Get overtime for agustin taba
-        if employee_name.lower() == 'agustin taba':
-            overtime_minutes, overtime_days = self.calculate_overtime(employee_name)
+    def _to_minutes(self, values):
+        """Convierte una columna de horas a minutos desde medianoche (int16, MISSING_MINUTES si no hay hora).
+
+        Acepta textos 'HH:MM', datetime/Timestamp, datetime.time y horas de Excel
+        como fracción de día (0.5 = 12:00); cualquier otro valor queda enmascarado.
+        """
+        values = pd.Series(values, dtype=object).reset_index(drop=True)
+        minutes = np.full(len(values), self.MISSING_MINUTES, dtype=np.int16)
+        if values.empty:
+            return minutes
+
+        kinds = values.map(type)
+        is_text = kinds == str
+        is_datetime = kinds.map(lambda kind: issubclass(kind, datetime))
+        is_time = kinds.map(lambda kind: issubclass(kind, time))
+        is_number = kinds.map(lambda kind: issubclass(kind, (int, float, np.number)) and not issubclass(kind, bool))
+
+        # Textos 'HH:MM' (o 'HH:MM:SS'), el formato del reloj
+        text = values[is_text].str.extract(r'^\s*(\d{1,2}):(\d{2})(?::\d{2})?\s*$').astype(float)
+        parsed = (text[0] < 24) & (text[1] < 60)
+        minutes[parsed[parsed].index] = (text[0] * 60 + text[1])[parsed].astype(np.int16)
+
+        # Otros textos (p.ej. '7:46 PM'); 'Absence' y similares no son horas
+        others = values[is_text & ~values.index.isin(parsed[parsed].index)]
+        if not others.empty:
+            others = pd.to_datetime(others, errors='coerce', format='mixed').dropna()
+            minutes[others.index] = (others.dt.hour * 60 + others.dt.minute).astype(np.int16)
+
+        if is_datetime.any():
+            stamps = pd.to_datetime(values[is_datetime], errors='coerce').dropna()
+            minutes[stamps.index] = (stamps.dt.hour * 60 + stamps.dt.minute).astype(np.int16)
+
+        if is_time.any():
+            times = values[is_time]
+            minutes[times.index] = [t.hour * 60 + t.minute for t in times]
+
+        if is_number.any():
+            fractions = values[is_number].astype(float)
+            fractions = fractions[(fractions >= 0) & (fractions < 1)]
+            minutes[fractions.index] = np.round(fractions * 24 * 60).astype(np.int16) % (24 * 60)
+
+        return minutes
+
+    def _prepare_rows(self, records, schedule=None):
+        """Arrays por fila del ledger que usan _row_minutes y _compute_employee_stats.
+
+        Se calculan de una sola vez para cualquier conjunto de filas (get_all_employee_stats
+        los arma para todos los empleados y los reparte con _slice_rows): días y sus
+        etiquetas en castellano, horario de cada fila, minutos y celdas vacías de cada marcación.
+        schedule: horario de get_employee_schedule si todas las filas son de un mismo empleado.
+        """
+        translated = {}
+
+        def translate(day):
+            if day not in translated:
+                translated[day] = self.translate_day_abbreviation(day)
+            return translated[day]
+
+        day_raw = records['day'].astype(str).tolist()
+        day_str = [day.strip() for day in day_raw]
+        day_lower = [day.lower() for day in day_str]
+        if schedule is None:
+            work_start, work_end = self._schedule_minutes(records)
+        else:
+            work_start = np.full(len(records), schedule['start_min'], dtype=np.int32)
+            work_end = np.full(len(records), schedule['end_min'], dtype=np.int32)
+        rows = {
+            'sheet': records['sheet'].to_numpy(),
+            'block': records['block'].to_numpy(),
+            'day_raw': day_raw,
+            'day_lower': day_lower,
+            'labels': [translate(day) for day in day_str],
+            'late_labels': [translate(day) for day in day_lower],
+            'valid_day': np.array([day not in ('', 'nan', 'absence') for day in day_lower], dtype=bool),
+            'weekday': np.array([not any(abbr in day for abbr in ['sa', 'su']) for day in day_lower], dtype=bool),
+            'absent': records['absence'].to_numpy(dtype=bool),
+            'work_start': work_start,
+            'work_end': work_end,
+        }
+        for field in ('entry', 'lunch_out', 'lunch_return', 'exit'):
+            values = records[field].to_numpy()
+            rows[f"{field}_min"] = records[f"{field}_min"].to_numpy(dtype=np.int32)
+            rows[f"{field}_na"] = pd.isna(values)
+            rows[f"{field}_blank"] = rows[f"{field}_na"] | np.array([str(value).strip() == '' for value in values],
+                                                                    dtype=bool)
+        return rows
+
+    def _employee_rows(self, employee_name):
+        """_prepare_rows de todas las filas del ledger de un empleado"""
+        return self._prepare_rows(self._get_employee_ledger(employee_name), self.get_employee_schedule(employee_name))
+
+    @staticmethod
+    def _slice_rows(rows, start, end):
+        """Filas start:end de un dict de _prepare_rows"""
+        return {key: values[start:end] for key, values in rows.items()}
+
+    def _row_minutes(self, schedule, rows):
+        """Retraso, salida temprana y exceso de almuerzo de cada fila de un empleado.
+
+        rows: arrays de _prepare_rows. Devuelve las máscaras (late_mask, early_mask,
+        lunch_mask, valid_day) y los minutos de cada fila (cero donde la máscara es
+        falsa), con las mismas reglas que los totales de get_employee_stats.
+        """
+        valid_day = rows['valid_day']
+        weekday = rows['weekday']
+        work_start, work_end = rows['work_start'], rows['work_end']
+
+        missing = self.MISSING_MINUTES
+        entry = rows['entry_min']
+        lunch_out = rows['lunch_out_min']
+        lunch_return = rows['lunch_return_min']
+        # Los PPP registran su salida en la columna de salida de almuerzo (D, S, AH)
+        early_exit = rows[f"{schedule['exit_field']}_min"]
+
+        late_mask = valid_day & (entry != missing) & (entry > work_start)
+        early_mask = valid_day & (early_exit != missing) & (early_exit < work_end)
+        lunch_minutes = lunch_return - lunch_out
+        lunch_mask = (weekday & (lunch_out != missing) & (lunch_return != missing) &
+                      (lunch_minutes > self.LUNCH_TIME_LIMIT))
+        if schedule['no_lunch']:
+            lunch_mask = np.zeros(len(valid_day), dtype=bool)
+        return {
+            'valid_day': valid_day,
+            'late_mask': late_mask,
+            'late_minutes': np.where(late_mask, entry - work_start, 0),
+            'early_mask': early_mask,
+            'early_minutes': np.where(early_mask, work_end - early_exit, 0),
+            'lunch_mask': lunch_mask,
+            'lunch_minutes': np.where(lunch_mask, lunch_minutes - self.LUNCH_TIME_LIMIT, 0)
+        }
+
+    def _compute_employee_stats(self, employee_name, rows, ppp_hours=None, overtime=None):
+        """Calcula todas las métricas de un empleado en una sola pasada sobre sus filas del ledger.
+
+        Equivale a llamar a count_late_days, count_late_arrivals_after_810,
+        count_early_departures, count_lunch_overtime_days, count_missing_records,
+        get_absence_days, count_mid_day_departures y calculate_overtime por separado.
+        rows: arrays de _prepare_rows con las filas del empleado; los minutos se
+        calculan con aritmética de arrays sobre las columnas *_min.
+        ppp_hours: (weekly_hours, weekly_details) ya calculados con
+        get_all_ppp_weekly_hours; overtime: (minutos, días) de _overtime_by_employee.
+        Si faltan se calculan para este empleado.
+        """
+        schedule = self.get_employee_schedule(employee_name)
+        is_ppp = schedule['treat_as_ppp']
+        limit_810 = 8 * 60 + 10
+        check_lunch_overtime = not schedule['no_lunch']
+        check_mid_day = schedule['mid_day_departures']
+
+        # Registros faltantes: los horarios con scope (Soledad) solo se revisan en su hoja y bloque
+        sheets = rows['sheet']
+        blocks = rows['block']
+        missing_rows = np.ones(len(sheets), dtype=bool)
+        missing_entry_field, missing_exit_field = 'entry', 'exit'
+        check_missing_exit = schedule['check_missing_exit']
+        check_missing_lunch = check_missing_exit and check_lunch_overtime
+        scope = schedule['scope']
+        if scope:
+            in_scope = (sheets == scope['sheet']) & (blocks == scope['block'])
+            if in_scope.any():
+                missing_rows = in_scope
+                missing_entry_field = scope['entry_field']
+                missing_exit_field = scope['exit_field']
+                check_missing_exit = True
+                check_missing_lunch = False
+
+        # Días y marcaciones del empleado como arrays
+        day_raw = rows['day_raw']
+        day_lower = rows['day_lower']
+        labels = rows['labels']
+        weekday = rows['weekday']
+        absent = rows['absent']
+
+        missing = self.MISSING_MINUTES
+        entry = rows['entry_min']
+        lunch_return = rows['lunch_return_min']
+
+        def days(mask, day_labels=labels):
+            return [day_labels[i] for i in np.flatnonzero(mask)]
+
+        # Llegadas tarde, salidas tempranas y exceso de almuerzo fila por fila
+        row_minutes = self._row_minutes(schedule, rows)
+        late_mask = row_minutes['late_mask']
+        late_labels = rows['late_labels']
+        late_days = days(late_mask, late_labels)
+        late_minutes = float(np.sum(row_minutes['late_minutes']))
+
+        # Ingresos después de 8:10
+        late_810_mask = row_minutes['valid_day'] & (entry != missing) & (entry > limit_810)
+        late_arrivals = days(late_810_mask, late_labels)
+        late_arrival_minutes = float(np.sum(entry[late_810_mask] - limit_810))
+
+        # Salidas tempranas
+        early_departure_days = int(row_minutes['early_mask'].sum())
+        early_minutes = float(np.sum(row_minutes['early_minutes']))
+
+        # Exceso de almuerzo
+        lunch_overtime_days, total_lunch_minutes = [], 0
+        if check_lunch_overtime:
+            lunch_overtime_days = days(row_minutes['lunch_mask'])
+            total_lunch_minutes = float(np.sum(row_minutes['lunch_minutes']))
+
+        # Ausencias
+        absence_days = [self.translate_day_abbreviation(day_raw[i]) for i in np.flatnonzero(absent)]
+        absences = len(absence_days)
+
+        # Retiros durante el horario (G, V o AK)
+        if check_mid_day:
+            not_absence_day = np.array(['absence' not in day for day in day_lower], dtype=bool)
+            departure_mask = weekday & not_absence_day & (lunch_return != missing)
+            departure_details = [f"{labels[i]} ({lunch_return[i] // 60:02d}:{lunch_return[i] % 60:02d})"
+                                 for i in np.flatnonzero(departure_mask)]
+            mid_day_departures = len(departure_details)
+            try:
+                mid_day_departures_text = self.format_list_in_columns(departure_details) if departure_details else "No hay registros"
+            except Exception as e:
+                logger.error("Error general: %s", e)
+                mid_day_departures, mid_day_departures_text = 0, "Error al procesar los datos"
+        else:
+            mid_day_departures, mid_day_departures_text = 0, "No aplica"
+
+        # Horas extra (ana, agustin taba), de las tablas que get_overtime_tables calcula una sola vez
+        if overtime is None:
+            overtime = self.calculate_overtime(employee_name)
+        overtime_minutes, overtime_days = overtime
+
+        # Registros faltantes, ajustados por ausencias al cerrar cada bloque
+        entry_blank = rows[f"{missing_entry_field}_blank"]
+        exit_blank = rows[f"{missing_exit_field}_blank"]
+        lunch_return_blank = rows['lunch_return_na']
+
+        missing_entry_days, missing_exit_days, missing_lunch_days = [], [], []
+
+        def remove_absent_days(absent_days):
+            # Las ausencias no cuentan como registros faltantes
+            for formatted_day in absent_days:
+                for missing_days in (missing_entry_days, missing_exit_days, missing_lunch_days):
+                    if formatted_day in missing_days:
+                        missing_days.remove(formatted_day)
+
+        current_block = None
+        block_absences = []
+        for i in np.flatnonzero(missing_rows):
+            if (sheets[i], blocks[i]) != current_block:
+                remove_absent_days(block_absences)
+                current_block = (sheets[i], blocks[i])
+                block_absences = []
+
+            if absent[i]:
+                block_absences.append(labels[i])
+            if not weekday[i]:
+                continue
+            if entry_blank[i]:
+                missing_entry_days.append(labels[i])
+            if check_missing_exit and exit_blank[i]:
+                missing_exit_days.append(labels[i])
+            if check_missing_lunch and not exit_blank[i] and lunch_return_blank[i]:
+                missing_lunch_days.append(labels[i])
+        remove_absent_days(block_absences)
 
         # Get department
         department = ""
         try:
             department = self.get_employee_department(employee_name)
         except Exception as e:
-            print(f"Error getting department: {str(e)}")
+            logger.error("Error getting department: %s", e)
 
         # Calculate actual hours differently for PPP employees
-        if 'ppp' in employee_name.lower():
-            weekly_hours, weekly_details = self.calculate_ppp_weekly_hours(employee_name)
+        if is_ppp:
+            if ppp_hours is None:
+                ppp_hours = self.calculate_ppp_weekly_hours(employee_name)
+            weekly_hours, weekly_details = ppp_hours
             actual_hours = sum(weekly_hours.values())
             required_hours = 80.0  # Estándar mensual para PPP
         else:
@@ -3655,13 +2580,151 @@ class ExcelProcessor:
             'actual_hours': actual_hours,
             'mid_day_departures': mid_day_departures,
             'mid_day_departures_text': mid_day_departures_text,
-            'overtime_minutes': overtime_minutes if 'agustin taba' in employee_name.lower() else 0,
-            'overtime_days': overtime_days if 'agustin taba' in employee_name.lower() else []
+            'overtime_minutes': overtime_minutes,
+            'overtime_days': overtime_days
         }
-        
+
         # Add PPP weekly hours if applicable
-        if 'ppp' in employee_name.lower():
+        if is_ppp:
             stats['weekly_hours'] = weekly_hours
             stats['weekly_details'] = weekly_details
-            
-        return stats
\ No newline at end of file
+
+        return stats
+
+    @_profiled
+    def get_all_employee_stats(self, employee_names=None):
+        """Get statistics for every employee in one sweep over the ledger.
+
+        Returns a dict of employee name -> the same dict get_employee_stats returns.
+        Defaults to every employee found in the attendance sheets. Employees
+        already computed (e.g. by start_precompute) come from the stats cache.
+        The per-row arrays (_prepare_rows), schedule minutes, overtime and PPP
+        hours are computed once for all pending employees and then split by employee.
+        """
+        if employee_names is None:
+            employee_names = list(self._ledger_positions)
+        with self._lock:
+            pending = [name for name in dict.fromkeys(employee_names) if name not in self._stats_cache]
+            if pending:
+                positions = [np.asarray(self._ledger_positions.get(name, []), dtype=np.intp) for name in pending]
+                rows = self._prepare_rows(self._ledger.iloc[np.concatenate(positions)])
+                bounds = np.cumsum([0] + [len(employee_positions) for employee_positions in positions])
+                all_overtime = self._overtime_by_employee(pending)
+
+                # Las horas semanales de todos los PPP salen de una sola pasada
+                ppp_names = [name for name in pending if self.get_employee_schedule(name)['treat_as_ppp']]
+                all_ppp_hours = self.get_all_ppp_weekly_hours(ppp_names) if ppp_names else {}
+
+                for employee_name, start, end in zip(pending, bounds[:-1], bounds[1:]):
+                    self._stats_cache[employee_name] = self._compute_employee_stats(
+                        employee_name, self._slice_rows(rows, start, end), all_ppp_hours.get(employee_name),
+                        all_overtime.get(employee_name, (0, [])))
+            return {employee_name: self._stats_cache[employee_name] for employee_name in employee_names}
+
+    # Métricas diarias de get_daily_metrics, en el orden en que se guardan en los acumulados
+    DAILY_METRICS = ['late_minutes', 'late_days', 'early_minutes', 'early_days', 'lunch_overtime_minutes',
+                     'lunch_overtime_days', 'absences', 'missing_entry', 'missing_exit', 'missing_lunch']
+
+    def get_daily_metrics(self, employee_names=None):
+        """Irregularidades de cada empleado por día del mes, para acumular entre meses.
+
+        Devuelve un DataFrame con employee, department, day (número de día) y las
+        columnas de DAILY_METRICS. Los minutos salen de las mismas máscaras que
+        get_employee_stats y los conteos de sus listas de días, así que la suma de
+        los días de un empleado da sus totales del mes.
+        """
+        if employee_names is None:
+            employee_names = list(self._ledger_positions)
+        all_stats = self.get_all_employee_stats(employee_names)
+
+        def day_numbers(labels):
+            digits = pd.Series(labels, dtype=object).astype(str).str.extract(r'^\s*(\d+)', expand=False)
+            return pd.to_numeric(digits, errors='coerce').to_numpy()
+
+        # Una fila por fila del ledger (minutos) y una por día listado (conteos); se agrupan al final
+        employee_names = list(dict.fromkeys(employee_names))
+        positions = [np.asarray(self._ledger_positions.get(name, []), dtype=np.intp) for name in employee_names]
+        rows = self._prepare_rows(self._ledger.iloc[np.concatenate(positions)]) if positions else {}
+        bounds = np.cumsum([0] + [len(employee_positions) for employee_positions in positions])
+        parts = []
+        for employee_name, start, end in zip(employee_names, bounds[:-1], bounds[1:]):
+            employee_rows = self._slice_rows(rows, start, end)
+            stats = all_stats[employee_name]
+            row_minutes = self._row_minutes(self.get_employee_schedule(employee_name), employee_rows)
+            parts.append(pd.DataFrame({
+                'employee': employee_name,
+                'department': stats['department'],
+                'day': day_numbers(employee_rows['day_raw']),
+                'late_minutes': row_minutes['late_minutes'],
+                'late_days': row_minutes['late_mask'],
+                'early_minutes': row_minutes['early_minutes'],
+                'early_days': row_minutes['early_mask'],
+                'lunch_overtime_minutes': row_minutes['lunch_minutes'],
+                'lunch_overtime_days': row_minutes['lunch_mask']
+            }))
+            for metric, field in (('absences', 'absence_days'), ('missing_entry', 'missing_entry_days'),
+                                  ('missing_exit', 'missing_exit_days'), ('missing_lunch', 'missing_lunch_days')):
+                if stats[field]:
+                    parts.append(pd.DataFrame({'employee': employee_name, 'department': stats['department'],
+                                               'day': day_numbers(stats[field]), metric: 1}))
+
+        columns = ['employee', 'department', 'day'] + self.DAILY_METRICS
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        rows = pd.concat(parts, ignore_index=True).reindex(columns=columns).dropna(subset=['day'])
+        rows[self.DAILY_METRICS] = rows[self.DAILY_METRICS].fillna(0).astype(int)
+        rows['day'] = rows['day'].astype(int)
+        return rows.groupby(['employee', 'department', 'day'], as_index=False, sort=False).sum()[columns]
+
+    def start_precompute(self, employee_names=None, on_done=None):
+        """Calcula en un hilo en segundo plano las métricas de todos los empleados y semanas.
+
+        Los resultados se publican en las cachés del procesador (estadísticas por
+        empleado, semanas, horas extra), así que get_employee_stats y
+        get_all_employee_stats devuelven al instante lo ya calculado. Las cachés se
+        llenan bajo _lock de a lotes de PRECOMPUTE_BATCH_SIZE empleados: una consulta
+        del hilo de la interfaz espera a lo sumo un lote. El avance se consulta con
+        get_precompute_progress; llamarlo otra vez no relanza el cálculo.
+        on_done: función que recibe el procesador, llamada en el mismo hilo al terminar sin error.
+        """
+        if self._precompute_thread is not None:
+            return self._precompute_thread
+        if employee_names is None:
+            employee_names = list(self._ledger_positions)
+        employee_names = list(dict.fromkeys(employee_names))
+        # Las semanas leen una hoja del libro; se resuelven en este hilo antes de lanzar el cálculo
+        weeks = self.get_weeks_in_month()
+
+        self._precompute_progress.update(done=0, total=len(employee_names), finished=False, error=None)
+        self._precompute_thread = threading.Thread(target=self._precompute, args=(employee_names, weeks, on_done),
+                                                   name='attendance-precompute', daemon=True)
+        self._precompute_thread.start()
+        return self._precompute_thread
+
+    def _precompute(self, employee_names, weeks, on_done=None):
+        progress = self._precompute_progress
+        cached = len(self._stats_cache)
+        try:
+            self.get_overtime_tables()
+            for start in range(0, len(employee_names), self.PRECOMPUTE_BATCH_SIZE):
+                batch = employee_names[start:start + self.PRECOMPUTE_BATCH_SIZE]
+                self.get_all_employee_stats(batch)
+                progress['done'] = start + len(batch)
+            self.get_all_weekly_stats(weeks)
+            if len(self._stats_cache) > cached:
+                self.save_stats_snapshot()
+        except Exception as e:
+            logger.error("Error precomputing stats: %s", e)
+            progress['error'] = str(e)
+        finally:
+            progress['finished'] = True
+
+        if on_done is not None and progress['error'] is None:
+            try:
+                on_done(self)
+            except Exception as e:
+                logger.error("Error after precomputing stats: %s", e)
+
+    def get_precompute_progress(self):
+        """Avance del precálculo: empleados hechos y totales, si terminó y el error si lo hubo"""
+        return dict(self._precompute_progress)
@@ -0,0 +1,63 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+# Tabla de horarios por defecto, versionada con el código
+DEFAULT_SCHEDULE_FILE = Path(__file__).resolve().parent.parent / 'config' / 'schedules.json'
+
+TIME_KEYS = ('start_time', 'end_time')
+MATCH_KINDS = ('name', 'contains')
+
+
+def _parse_time(value, where):
+    try:
+        return datetime.strptime(value, '%H:%M').time()
+    except (TypeError, ValueError):
+        raise ValueError(f"{where}: hora inválida {value!r}, se espera 'H:MM'")
+
+
+def _parse_rule(rule, where, allowed_keys):
+    """Valida las claves de una regla y convierte sus horas a datetime.time"""
+    unknown = set(rule) - set(allowed_keys)
+    if unknown:
+        raise ValueError(f"{where}: claves desconocidas {sorted(unknown)}")
+    parsed = dict(rule)
+    for key in TIME_KEYS:
+        if key in parsed:
+            parsed[key] = _parse_time(parsed[key], f"{where}.{key}")
+    return parsed
+
+
+def load_schedule_rules(path=None):
+    """Lee la tabla de horarios (JSON) y la valida.
+
+    El archivo tiene un bloque "default" con todos los campos y una lista
+    "rules"; cada regla tiene un "match" ({"name": nombre exacto} o
+    {"contains": texto}) y los campos que cambia. Las reglas que coinciden
+    se aplican en orden, así que las más específicas van al final.
+    """
+    path = Path(path) if path is not None else DEFAULT_SCHEDULE_FILE
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+
+    default = _parse_rule(config['default'], f"{path.name}:default", config['default'])
+    rules = []
+    for number, rule in enumerate(config.get('rules', [])):
+        where = f"{path.name}:rules[{number}]"
+        match = rule.get('match', {})
+        if len(match) != 1 or next(iter(match)) not in MATCH_KINDS:
+            raise ValueError(f"{where}: match debe tener una sola clave entre {MATCH_KINDS}")
+        kind, value = next(iter(match.items()))
+        fields = _parse_rule({k: v for k, v in rule.items() if k != 'match'}, where, default)
+        rules.append((kind, value.lower(), fields))
+    return default, rules
+
+
+def resolve_schedule(default, rules, employee_name):
+    """Campos del horario de un empleado: el default más cada regla que coincide, en orden"""
+    name = employee_name.lower()
+    schedule = dict(default)
+    for kind, value, fields in rules:
+        if (kind == 'name' and name == value) or (kind == 'contains' and value in name):
+            schedule.update(fields)
+    return schedule
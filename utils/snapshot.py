@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Carpeta donde se guardan los snapshots, junto a los archivos subidos
+SNAPSHOT_DIR_NAME = '.snapshots'
+
+# Tipos de celda; las columnas object mezclan textos, números, fechas y horas
+CELL_EMPTY, CELL_TEXT, CELL_INT, CELL_FLOAT, CELL_DATETIME, CELL_TIME = range(6)
+KIND_SUFFIX = '__kind'
+
+
+def file_content_hash(file):
+    """SHA-256 del contenido de un archivo (ruta o archivo en memoria)"""
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            data = f.read()
+    elif hasattr(file, 'getvalue'):
+        data = file.getvalue()
+    else:
+        position = file.tell()
+        data = file.read()
+        file.seek(position)
+    return hashlib.sha256(data).hexdigest()
+
+
+def snapshot_path(snapshot_dir, content_hash, parser_version):
+    """Ruta del snapshot para un contenido y una versión del parser"""
+    return Path(snapshot_dir) / f"{content_hash}-v{parser_version}"
+
+
+def _encode_cell(value):
+    if isinstance(value, str):
+        return CELL_TEXT, value
+    if isinstance(value, datetime):
+        return CELL_DATETIME, value.isoformat()
+    if isinstance(value, time):
+        return CELL_TIME, value.isoformat()
+    if isinstance(value, (bool, np.bool_)):
+        return CELL_INT, str(int(value))
+    if isinstance(value, (int, np.integer)):
+        return CELL_INT, str(value)
+    if pd.isna(value):
+        return CELL_EMPTY, None
+    return CELL_FLOAT, repr(float(value))
+
+
+def _decode_cell(kind, text):
+    if kind == CELL_TEXT:
+        return text
+    if kind == CELL_INT:
+        return int(text)
+    if kind == CELL_FLOAT:
+        return float(text)
+    if kind == CELL_DATETIME:
+        return datetime.fromisoformat(text)
+    if kind == CELL_TIME:
+        return time.fromisoformat(text)
+    return np.nan
+
+
+def _encode_frame(df):
+    """Convierte las columnas object (tipos mezclados) en pares texto + tipo que Parquet puede guardar"""
+    encoded = {}
+    for column in df.columns:
+        values = df[column]
+        key = str(column)
+        if values.dtype == object:
+            cells = [_encode_cell(value) for value in values]
+            encoded[key] = pd.Series([text for _, text in cells], dtype=object)
+            encoded[key + KIND_SUFFIX] = np.array([kind for kind, _ in cells], dtype=np.int8)
+        else:
+            encoded[key] = values.to_numpy()
+    return pd.DataFrame(encoded)
+
+
+def _decode_frame(encoded, integer_columns=False):
+    frame = {}
+    for key in encoded.columns:
+        if key.endswith(KIND_SUFFIX):
+            continue
+        column = int(key) if integer_columns else key
+        kind_key = key + KIND_SUFFIX
+        if kind_key in encoded.columns:
+            frame[column] = pd.Series([_decode_cell(kind, text) for kind, text in
+                                       zip(encoded[kind_key], encoded[key])], dtype=object)
+        else:
+            frame[column] = encoded[key]
+    return pd.DataFrame(frame)
+
+
+def write_snapshot(path, ledger, sheets, metadata):
+    """Guarda el ledger, las hojas crudas indicadas y los metadatos como snapshot Parquet.
+
+    Se escribe en una carpeta temporal y se renombra al final para que un
+    snapshot a medio escribir nunca se lea.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = Path(tempfile.mkdtemp(prefix=path.name + '.', dir=path.parent))
+    try:
+        _encode_frame(ledger).to_parquet(tmp_path / 'ledger.parquet', engine='pyarrow', index=False)
+        for position, (sheet_name, df) in enumerate(sheets.items()):
+            _encode_frame(df).to_parquet(tmp_path / f"sheet_{position}.parquet", engine='pyarrow', index=False)
+        metadata = dict(metadata, snapshot_sheets=list(sheets))
+        with open(tmp_path / 'metadata.json', 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        if not path.exists():
+            os.replace(tmp_path, path)
+    finally:
+        # Si otro proceso ya escribió el mismo snapshot, se descarta el nuestro
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def stats_path(path, schedule_hash, stats_version):
+    """Ruta de las estadísticas precalculadas dentro de un snapshot, según la tabla de horarios
+    y la versión del cálculo de las métricas"""
+    return Path(path) / f"stats-v{stats_version}-{schedule_hash[:16]}.json"
+
+
+def write_stats(path, schedule_hash, stats_version, stats):
+    """Guarda las estadísticas por empleado junto al snapshot; no hace nada si el snapshot no existe"""
+    path = Path(path)
+    if not (path / 'metadata.json').exists():
+        return False
+    fd, tmp_path = tempfile.mkstemp(prefix='stats.', dir=path)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False)
+        os.replace(tmp_path, stats_path(path, schedule_hash, stats_version))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return True
+
+
+def read_stats(path, schedule_hash, stats_version):
+    """Estadísticas precalculadas de un snapshot para la tabla de horarios y la versión; None si no hay"""
+    target = stats_path(path, schedule_hash, stats_version)
+    if not target.exists():
+        return None
+    with open(target, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_snapshot(path):
+    """Lee un snapshot (ledger, hojas, metadatos) con memory-map; None si no existe"""
+    path = Path(path)
+    metadata_file = path / 'metadata.json'
+    if not metadata_file.exists():
+        return None
+
+    with open(metadata_file, encoding='utf-8') as f:
+        metadata = json.load(f)
+    ledger = _decode_frame(pd.read_parquet(path / 'ledger.parquet', engine='pyarrow', memory_map=True))
+    sheets = {}
+    for position, sheet_name in enumerate(metadata['snapshot_sheets']):
+        encoded = pd.read_parquet(path / f"sheet_{position}.parquet", engine='pyarrow', memory_map=True)
+        sheets[sheet_name] = _decode_frame(encoded, integer_columns=True)
+    return ledger, sheets, metadata
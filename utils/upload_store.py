@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+# Carpeta del almacén de archivos subidos, dentro de uploads/
+STORE_DIR_NAME = '.store'
+
+PARSE_PENDING, PARSE_OK, PARSE_ERROR = 'pending', 'ok', 'error'
+
+
+def month_code(filename):
+    """Mes del archivo según los dos primeros caracteres del nombre ('02Static.XLS' -> '02')"""
+    code = Path(filename).name[:2]
+    return code if code.isdigit() and 1 <= int(code) <= 12 else None
+
+
+def blob_path(store_dir, content_hash, suffix):
+    """Ruta del contenido de un archivo dentro del almacén"""
+    return Path(store_dir) / 'objects' / f"{content_hash}{suffix.lower()}"
+
+
+def _metadata_path(store_dir, content_hash):
+    return Path(store_dir) / 'meta' / f"{content_hash}.json"
+
+
+def _write_atomic(path, data):
+    """Escribe en un temporal y lo renombra, para que nunca se lea un archivo a medias"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=path.name + '.', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _write_metadata(store_dir, metadata):
+    data = json.dumps(metadata, ensure_ascii=False, indent=2).encode('utf-8')
+    _write_atomic(_metadata_path(store_dir, metadata['hash']), data)
+
+
+def load_metadata(store_dir, content_hash):
+    """Metadatos de un archivo del almacén; None si no está"""
+    path = _metadata_path(store_dir, content_hash)
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def store_upload(store_dir, data, filename, content_hash=None):
+    """Guarda un archivo subido una sola vez por contenido y devuelve sus metadatos.
+
+    El contenido se guarda en objects/<hash><extensión> y los metadatos (nombre
+    original, mes, tamaño, estado del parseo) en meta/<hash>.json. Si el mismo
+    contenido ya está guardado, con este u otro nombre, no se escribe nada.
+    """
+    if content_hash is None:
+        content_hash = hashlib.sha256(data).hexdigest()
+    metadata = load_metadata(store_dir, content_hash)
+    if metadata is not None and blob_path(store_dir, content_hash, metadata['suffix']).exists():
+        return metadata
+
+    suffix = Path(filename).suffix.lower()
+    _write_atomic(blob_path(store_dir, content_hash, suffix), bytes(data))
+    metadata = {
+        'hash': content_hash,
+        'filename': Path(filename).name,
+        'suffix': suffix,
+        'month_code': month_code(filename),
+        'size': len(data),
+        'stored_at': datetime.now().isoformat(timespec='seconds'),
+        'parse_status': PARSE_PENDING,
+        'parse_error': None
+    }
+    _write_metadata(store_dir, metadata)
+    return metadata
+
+
+def set_parse_status(store_dir, content_hash, status, error=None):
+    """Registra el resultado del parseo; solo escribe si el estado cambió"""
+    metadata = load_metadata(store_dir, content_hash)
+    if metadata is None:
+        return None
+    error = str(error) if error is not None else None
+    if metadata['parse_status'] != status or metadata['parse_error'] != error:
+        metadata['parse_status'] = status
+        metadata['parse_error'] = error
+        _write_metadata(store_dir, metadata)
+    return metadata
+
+
+def list_uploads(store_dir):
+    """Metadatos de todos los archivos del almacén, del más antiguo al más reciente"""
+    meta_dir = Path(store_dir) / 'meta'
+    if not meta_dir.exists():
+        return []
+    uploads = []
+    for path in meta_dir.glob('*.json'):
+        with open(path, encoding='utf-8') as f:
+            uploads.append(json.load(f))
+    return sorted(uploads, key=lambda metadata: metadata['stored_at'])
+
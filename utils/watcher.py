@@ -0,0 +1,153 @@
+"""Watcher de uploads/: ingesta en segundo plano los libros nuevos o modificados.
+
+Uso (desde la raíz del repo):
+    python -m utils.watcher [carpeta] [--interval 2] [--workers 2] [--once]
+
+Revisa la carpeta (por defecto uploads/) cada --interval segundos. Un archivo se
+ingesta cuando su tamaño y fecha de modificación no cambiaron entre dos
+revisiones (ya terminó de copiarse) y su hash de contenido no fue procesado
+antes según el almacén de uploads/.store; si el hash no cambió no se reprocesa.
+Cada libro se decodifica en un pool acotado de procesos, que guarda en
+uploads/.snapshots el snapshot del ledger y las estadísticas precalculadas de
+todos los empleados: el dashboard los carga de ahí al abrir el archivo sin
+volver a parsearlo. El ledger de cada mes se agrega además al store multi-mes
+(uploads/.store/attendance.sqlite). --once procesa lo que haya en la carpeta y termina.
+"""
+import argparse
+import hashlib
+import logging
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from pathlib import Path
+
+from utils.attendance_store import DB_NAME, append_month
+from utils.batch import expand_inputs
+from utils.excel_processor import ExcelProcessor
+from utils.snapshot import SNAPSHOT_DIR_NAME
+from utils.upload_store import (PARSE_ERROR, PARSE_OK, PARSE_PENDING, STORE_DIR_NAME, blob_path,
+                                set_parse_status, store_upload)
+
+logger = logging.getLogger(__name__)
+
+
+def ingest_workbook(path, snapshot_dir, db_path=None, filename=None):
+    """Decodifica un libro y precalcula sus estadísticas; se ejecuta en un proceso del pool.
+
+    Devuelve (empleados, segundos). El snapshot y las estadísticas quedan en
+    snapshot_dir y, si se indica db_path, el ledger del mes se agrega al store multi-mes.
+    """
+    start = time.perf_counter()
+    processor = ExcelProcessor(path, snapshot_dir=snapshot_dir)
+    names = processor.process_attendance_summary()['employee_name'].unique()
+    if len(names) == 0:
+        raise ValueError("No se encontraron empleados en el libro")
+    processor.start_precompute(names).join()
+    error = processor.get_precompute_progress()['error']
+    if error:
+        raise RuntimeError(error)
+    if db_path is not None:
+        append_month(db_path, processor, filename)
+    return len(names), time.perf_counter() - start
+
+
+def _ignore_interrupts():
+    # Ctrl+C lo maneja el proceso principal, que cierra el pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class UploadWatcher:
+    """Ingesta los libros de una carpeta a medida que aparecen o cambian"""
+
+    def __init__(self, upload_dir, workers=2):
+        self.upload_dir = Path(upload_dir)
+        self.store_dir = self.upload_dir / STORE_DIR_NAME
+        self.snapshot_dir = self.upload_dir / SNAPSHOT_DIR_NAME
+        self.db_path = self.store_dir / DB_NAME
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_ignore_interrupts)
+        # ruta -> (tamaño, mtime) de la última revisión, para saber si terminó de copiarse
+        self._signatures = {}
+        # ruta -> firma con la que se resolvió su hash; si no cambia, no se vuelve a leer
+        self._fingerprinted = {}
+        # future -> (nombre del archivo, hash) de las ingestas en curso
+        self._running = {}
+
+    def scan(self, settle=True):
+        """Revisa la carpeta y lanza la ingesta de los archivos nuevos o modificados.
+
+        settle: esperar a que la firma de un archivo se repita entre dos revisiones
+        antes de leerlo; False lo lee en la primera (carpeta que no está cambiando).
+        """
+        files = [Path(file) for file in expand_inputs([self.upload_dir])]
+        self._signatures = {path: self._signatures.get(path) for path in files}
+        for path in files:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            previous, self._signatures[path] = self._signatures[path], signature
+            if (settle and previous != signature) or self._fingerprinted.get(path) == signature:
+                continue
+            self._fingerprinted[path] = signature
+            self._submit(path, path.read_bytes())
+
+    def _submit(self, path, data):
+        content_hash = hashlib.sha256(data).hexdigest()
+        metadata = store_upload(self.store_dir, data, path.name, content_hash)
+        in_flight = content_hash in {running_hash for _, running_hash in self._running.values()}
+        if metadata['parse_status'] != PARSE_PENDING or in_flight:
+            logger.info("%s sin cambios (%s), no se reprocesa", path.name, content_hash[:12])
+            return
+        # Se ingesta la copia del almacén, que no cambia aunque el archivo original se reescriba
+        source = blob_path(self.store_dir, content_hash, metadata['suffix'])
+        future = self._pool.submit(ingest_workbook, str(source), str(self.snapshot_dir), str(self.db_path), path.name)
+        self._running[future] = (path.name, content_hash)
+        logger.info("Ingestando %s (%s)", path.name, content_hash[:12])
+
+    def collect(self, block=False):
+        """Registra en el almacén el resultado de las ingestas terminadas"""
+        if block:
+            wait(list(self._running))
+        for future in [future for future in self._running if future.done()]:
+            name, content_hash = self._running.pop(future)
+            try:
+                employees, elapsed = future.result()
+            except Exception as e:
+                logger.error("Error ingesting %s: %s", name, e)
+                set_parse_status(self.store_dir, content_hash, PARSE_ERROR, e)
+            else:
+                logger.info("%s listo: %d empleados en %.2fs", name, employees, elapsed)
+                set_parse_status(self.store_dir, content_hash, PARSE_OK)
+
+    def run(self, interval=2.0, once=False):
+        try:
+            if once:
+                self.scan(settle=False)
+                self.collect(block=True)
+                return
+            while True:
+                self.scan()
+                self.collect()
+                time.sleep(interval)
+        finally:
+            self._pool.shutdown(wait=once, cancel_futures=not once)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('upload_dir', nargs='?', default='uploads')
+    parser.add_argument('--interval', type=float, default=2.0, help="Segundos entre revisiones")
+    parser.add_argument('--workers', type=int, default=2, help="Libros decodificados a la vez")
+    parser.add_argument('--once', action='store_true', help="Procesar la carpeta una vez y terminar")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    try:
+        UploadWatcher(args.upload_dir, args.workers).run(args.interval, args.once)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()